@@ -0,0 +1,131 @@
+"""
+Generate synthetic Python packages for benchmarking.
+
+Packages can be generated from the command line for reproducing reports:
+
+.. code:: sh
+
+    $ python benchmarks/generate.py out --modules 100 --names 20 --fanout 3
+"""
+import random
+
+from argparse import ArgumentParser
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Dict, List
+
+
+@dataclass
+class Shape:
+    """
+    Shape of a synthetic package.
+
+    Parameters
+    ----------
+    modules
+        number of modules
+    names
+        number of top-level names per module
+    fanout
+        number of other modules that each module imports from
+    depth
+        nesting depth of subpackages that modules are placed in
+    cycles
+        number of mutually dependent module pairs
+    hubs
+        number of hub names that every module references
+    seed
+        random seed, generated packages are deterministic
+    """
+
+    modules: int = 10
+    names: int = 10
+    fanout: int = 2
+    depth: int = 1
+    cycles: int = 0
+    hubs: int = 0
+    seed: int = 0
+
+    @property
+    def total_names(self) -> int:
+        """Total number of generated top-level names."""
+        return self.modules * self.names + self.hubs
+
+
+def module_path(index: int, depth: int) -> List[str]:
+    """Place module in a binary tree of subpackages."""
+    parts = [f'sub{(index >> level) & 1}' for level in range(depth - 1)]
+    return ['synthetic'] + parts + [f'mod{index}']
+
+
+def generate(path: Path, shape: Shape) -> Path:
+    """
+    Generate a package of modules that reference each other.
+
+    Modules import from earlier modules to form an acyclic structure,
+    except for pairs of modules that are made mutually dependent.
+
+    Parameters
+    ----------
+    path
+        directory to write the package in
+    shape
+        shape of the package
+    """
+    rng = random.Random(shape.seed)
+    names = max(shape.names, 1)
+    modules = [module_path(i, shape.depth) for i in range(shape.modules)]
+    imports: Dict[int, List[int]] = {
+        m: rng.sample(range(m), min(m, shape.fanout)) for m in range(shape.modules)
+    }
+    back_refs: Dict[int, List[int]] = {m: [] for m in range(shape.modules)}
+    for _ in range(shape.cycles if shape.modules > 1 else 0):
+        a, b = sorted(rng.sample(range(shape.modules), 2))
+        back_refs[a].append(b)
+        if a not in imports[b]:
+            imports[b].append(a)
+
+    for parts in [['synthetic', 'hubs']] + modules:
+        for i in range(1, len(parts)):
+            init = path.joinpath(*parts[:i], '__init__.py')
+            if not init.exists():
+                init.parent.mkdir(parents=True, exist_ok=True)
+                init.write_text(f'"""Synthetic package {".".join(parts[:i])}."""\n')
+
+    if shape.hubs:
+        hub_lines = ['"""Synthetic hub names."""']
+        hub_lines += [f'\n\ndef hub{h}(x):\n    return x' for h in range(shape.hubs)]
+        path.joinpath('synthetic', 'hubs.py').write_text('\n'.join(hub_lines) + '\n')
+
+    for m, parts in enumerate(modules):
+        lines = [f'"""Synthetic module {m}."""']
+        deps = []
+        for d in imports[m] + back_refs[m]:
+            lines.append(f'from {".".join(modules[d])} import name0 as dep{d}')
+            deps.append(f'dep{d}')
+        for h in range(shape.hubs):
+            lines.append(f'from synthetic.hubs import hub{h}')
+            deps.append(f'hub{h}')
+
+        for n in range(names):
+            refs = [f'name{rng.randrange(n)}(x)' for _ in range(min(n, 3))]
+            if n == 0:
+                refs += [f'{d}(x)' for d in deps]
+            body = ' + '.join(refs) or 'x'
+            lines.append(f'\n\ndef name{n}(x):\n    """Name {n}."""\n    return {body}')
+        file = path.joinpath(*parts).with_suffix('.py')
+        file.write_text('\n'.join(lines) + '\n')
+    return path / 'synthetic'
+
+
+parser = ArgumentParser(description='Generate a synthetic Python package.')
+parser.add_argument('path', help='directory to write the package in')
+for field in fields(Shape):
+    parser.add_argument(
+        '--' + field.name, type=int, default=field.default, help=f'(default: {field.default})'
+    )
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    shape = Shape(**{f.name: getattr(args, f.name) for f in fields(Shape)})
+    print(generate(Path(args.path), shape))
@@ -0,0 +1,189 @@
+"""
+Stage-level Pyfactor benchmarks.
+
+Run benchmarks and write results to a JSON file,
+then compare results against a stored baseline:
+
+.. code:: sh
+
+    $ python benchmarks/run.py run baseline.json
+    $ python benchmarks/run.py run current.json
+    $ python benchmarks/run.py compare baseline.json current.json
+"""
+import gc
+import sys
+import json
+import shutil
+import sysconfig
+import tempfile
+import tracemalloc
+
+from argparse import ArgumentParser
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, Dict, List
+
+from pyfactor import _io, _visit, _graph, _gv
+from generate import Shape, generate
+
+stdlib_packages = ['json', 'email']
+
+
+def stdlib_corpus() -> List[str]:
+    """Packages of the local standard library."""
+    stdlib = Path(sysconfig.get_paths()['stdlib'])
+    return [str(stdlib / p) for p in stdlib_packages if (stdlib / p).is_dir()]
+
+
+def generated_corpus(path: Path, shape: Shape) -> List[str]:
+    """Generated synthetic package."""
+    return [str(generate(path / f'gen-{shape.modules}-{shape.names}', shape))]
+
+
+def stages(source_paths: List[str], render_format: str) -> Dict[str, Callable]:
+    """Create pipeline stages that pass their results to the next stage."""
+    state = {}
+
+    def discover():
+        state['sources'] = _io.resolve_sources(source_paths)
+
+    def read():
+        for s in state['sources']:
+            s.content = _io.read_source(s.file)
+
+    def parse_lines():
+        state['parsed'] = [_visit.parse_lines(s) for s in state['sources']]
+
+    def merge_nodes():
+        for s, lines in zip(state['sources'], state['parsed']):
+            _graph.merge_nodes(s.name, s.file, lines)
+
+    def create_graph():
+        state['graph'] = _graph.create_graph(list(zip(state['sources'], state['parsed'])))
+
+    def emit():
+        state['dot'] = str(state['graph'].source)
+
+    def render():
+        with tempfile.TemporaryDirectory() as tmp:
+            _gv.render(state['graph'], str(Path(tmp) / 'graph'), format=render_format)
+
+    funcs = [discover, read, parse_lines, merge_nodes, create_graph, emit]
+    if shutil.which('dot') is not None:
+        funcs.append(render)
+    return {f.__name__: f for f in funcs}
+
+
+def time_stages(source_paths: List[str], repeat: int, render_format: str) -> Dict:
+    """Time stages, taking the minimum over repeats."""
+    times = {}
+    for _ in range(repeat):
+        for name, func in stages(source_paths, render_format).items():
+            gc.collect()
+            start = perf_counter()
+            func()
+            elapsed = perf_counter() - start
+            times[name] = min(times.get(name, elapsed), elapsed)
+    return times
+
+
+def memory_stages(source_paths: List[str], render_format: str) -> Dict:
+    """Record peak traced memory of stages in bytes."""
+    peaks = {}
+    tracemalloc.start()
+    try:
+        for name, func in stages(source_paths, render_format).items():
+            gc.collect()
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            else:
+                # Restarting clears the peak before Python 3.9
+                tracemalloc.stop()
+                tracemalloc.start()
+            base, _ = tracemalloc.get_traced_memory()
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+            peaks[name] = peak - base
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def run(out_path: str, repeat: int, render_format: str, corpora: List[str]) -> None:
+    """Run benchmarks on all corpora and write results."""
+    results = {'python': sys.version.split()[0], 'corpora': {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        available = {
+            'stdlib': stdlib_corpus,
+            'generated-small': lambda: generated_corpus(Path(tmp), Shape(20, 20)),
+            'generated-large': lambda: generated_corpus(
+                Path(tmp), Shape(50, 20, fanout=3, depth=3, cycles=5, hubs=3)
+            ),
+        }
+        for corpus in corpora or available:
+            source_paths = available[corpus]()
+            times = time_stages(source_paths, repeat, render_format)
+            peaks = memory_stages(source_paths, render_format)
+            results['corpora'][corpus] = {
+                name: {'time': times[name], 'peak': peaks[name]} for name in times
+            }
+            print(f'{corpus}:', file=sys.stderr)
+            for name in times:
+                print(
+                    f'  {name:<14}{times[name]:10.4f} s{peaks[name] / 2 ** 20:10.2f} MiB',
+                    file=sys.stderr,
+                )
+    Path(out_path).write_text(json.dumps(results, indent=2))
+
+
+noise_floor = {'time': 0.01, 'peak': 2 ** 20}
+
+
+def compare(base_path: str, current_path: str, threshold: float) -> int:
+    """
+    Compare results to a baseline and return the number of regressions.
+
+    Differences below :data:`noise_floor` are not flagged.
+    """
+    base = json.loads(Path(base_path).read_text())['corpora']
+    current = json.loads(Path(current_path).read_text())['corpora']
+    regressions = 0
+    for corpus, stages_ in current.items():
+        for name, result in stages_.items():
+            if name not in base.get(corpus, {}):
+                continue
+            for metric in ('time', 'peak'):
+                old = base[corpus][name][metric]
+                new = result[metric]
+                ratio = new / old if old else 1.0
+                flag = ''
+                if ratio > threshold and new - old > noise_floor[metric]:
+                    flag = '  REGRESSION'
+                    regressions += 1
+                print(f'{corpus:<16}{name:<14}{metric:<6}{ratio:8.2f}x{flag}')
+    return regressions
+
+
+parser = ArgumentParser(description='Pyfactor stage benchmarks.')
+commands = parser.add_subparsers(dest='command')
+commands.required = True
+run_parser = commands.add_parser('run', help='run benchmarks')
+run_parser.add_argument('output', help='result file to write')
+run_parser.add_argument('--repeat', type=int, default=3, help='timing repeats')
+run_parser.add_argument('--format', default='svg', help='render format')
+run_parser.add_argument('--corpus', action='append', help=(
+    'corpora to run: stdlib, generated-small or generated-large (default: all)'
+))
+compare_parser = commands.add_parser('compare', help='compare to a baseline')
+compare_parser.add_argument('baseline', help='baseline result file')
+compare_parser.add_argument('current', help='current result file')
+compare_parser.add_argument('--threshold', type=float, default=1.2, help=(
+    'ratio to baseline that is flagged as a regression'
+))
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    if args.command == 'run':
+        run(args.output, args.repeat, args.format, args.corpus)
+    else:
+        exit(1 if compare(args.baseline, args.current, args.threshold) else 0)
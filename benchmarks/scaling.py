@@ -0,0 +1,92 @@
+"""
+Scaling curves of Pyfactor stages.
+
+Run the pipeline on generated packages of increasing size
+and fit the exponent k of time ~ size^k for each stage:
+
+.. code:: sh
+
+    $ python benchmarks/scaling.py --sizes 5 10 20 40 --names 10
+
+Stages that scale worse than ``--max-exponent`` are flagged
+and the script exits with an error code.
+"""
+import math
+import sys
+import json
+import tempfile
+
+from argparse import ArgumentParser
+from dataclasses import replace
+from pathlib import Path
+from typing import Dict, List
+
+from generate import Shape, generate
+from run import time_stages
+
+
+def fit_exponent(sizes: List[float], times: List[float]) -> float:
+    """Fit the slope of a least-squares line in log-log space."""
+    xs = [math.log(s) for s in sizes]
+    ys = [math.log(max(t, 1e-9)) for t in times]
+    x_mean = sum(xs) / len(xs)
+    y_mean = sum(ys) / len(ys)
+    cov = sum((x - x_mean) * (y - y_mean) for x, y in zip(xs, ys))
+    var = sum((x - x_mean) ** 2 for x in xs)
+    return cov / var if var else 0.0
+
+
+def scale(shape: Shape, sizes: List[int], repeat: int) -> Dict[str, Dict]:
+    """Time stages for packages of each size in modules."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            sized = replace(shape, modules=size)
+            package = generate(Path(tmp) / str(size), sized)
+            times = time_stages([str(package)], repeat, 'svg')
+            print(f'{sized.total_names:>8} names', file=sys.stderr)
+            for name, elapsed in times.items():
+                result = results.setdefault(name, {'sizes': [], 'times': []})
+                result['sizes'].append(sized.total_names)
+                result['times'].append(elapsed)
+    for result in results.values():
+        result['exponent'] = fit_exponent(result['sizes'], result['times'])
+    return results
+
+
+parser = ArgumentParser(description='Fit scaling curves of Pyfactor stages.')
+parser.add_argument('--sizes', type=int, nargs='+', default=[5, 10, 20, 40], help=(
+    'numbers of modules to generate (default: %(default)s)'
+))
+parser.add_argument('--names', type=int, default=10, help='names per module')
+parser.add_argument('--fanout', type=int, default=2, help='imports per module')
+parser.add_argument('--depth', type=int, default=2, help='subpackage depth')
+parser.add_argument('--cycles', type=int, default=0, help='mutual dependencies')
+parser.add_argument('--hubs', type=int, default=0, help='hub names')
+parser.add_argument('--repeat', type=int, default=1, help='timing repeats')
+parser.add_argument('--max-exponent', type=float, default=1.5, help=(
+    'flag stages that scale worse (default: %(default)s)'
+))
+parser.add_argument('--output', help='write results as JSON')
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    shape = Shape(
+        names=args.names,
+        fanout=args.fanout,
+        depth=args.depth,
+        cycles=args.cycles,
+        hubs=args.hubs,
+    )
+    results = scale(shape, args.sizes, args.repeat)
+    flagged = 0
+    for name, result in results.items():
+        exponent = result['exponent']
+        flag = ''
+        if exponent > args.max_exponent:
+            flag = '  SUPERLINEAR'
+            flagged += 1
+        print(f'{name:<14}{result["times"][-1]:10.4f} s   O(n^{exponent:.2f}){flag}')
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    exit(1 if flagged else 0)
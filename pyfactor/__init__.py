@@ -4,16 +4,259 @@ Script dependency visualisation.
 See online documentation on `RTD <https://pyfactor.rtfd.org>`_.
 """
 import os as _os
+import json as _json
+import logging as _logging
 from sys import stderr as _stderr
 from typing import List as _List, Dict as _Dict
 from pathlib import Path as _Path
 
 _version_file = _Path(_os.path.realpath(__file__)).parent / 'VERSION'
 __version__ = _version_file.read_text().strip()
+_log = _logging.getLogger(__name__)
 
-from . import _cli, _visit, _graph, _io
+from . import _cli, _visit, _graph, _io, _export, _cache, _git, _gv, _html, _layout
 from ._graph import create_legend
 from ._gv import preprocess, render
+from ._export import export_graph, import_graph
+from ._diff import GraphDiff, diff_graphs, create_diff_graph
+from ._reach import ReachabilityIndex
+from ._index import ExportIndex
+from ._hooks import Hooks, stage as _stage
+from ._profile import MemoryProfile, Timings  # noqa: F401
+from time import perf_counter as _perf_counter
+
+
+def _parse_sources(
+    sources: list, hooks: _List[Hooks] = None, docstrings: bool = True
+) -> list:
+    if not hooks:
+        return [_visit.parse_lines(s, docstrings) for s in sources]
+
+    parsed = []
+    for s in sources:
+        start = _perf_counter()
+        lines = _visit.parse_lines(s, docstrings)
+        seconds = _perf_counter() - start
+        names = sum(len(line.names) for line in lines)
+        for hook in hooks:
+            hook.on_file_parsed(s, seconds, names)
+        parsed.append(lines)
+    return parsed
+
+
+def _fast_sources(sources: list, rules: list, hooks: _List[Hooks] = None) -> dict:
+    merged = {}
+    for s in sources:
+        mode = _io.fast_mode(s, rules)
+        if mode is None:
+            continue
+        start = _perf_counter()
+        if s.content is None:
+            s.content = _io.read_source(s.file)
+        merged[s.name] = _graph.fast_nodes(s.name, s.content, mode)
+        seconds = _perf_counter() - start
+        for hook in hooks or []:
+            hook.on_file_parsed(s, seconds, len(merged[s.name]))
+        _log.info(f'fast path {mode}: {s.name} ({len(s.content)} bytes)')
+    return merged
+
+
+def _merge_sources(
+    sources: list,
+    hooks: _List[Hooks] = None,
+    fast_rules: list = None,
+    docstrings: bool = True,
+) -> dict:
+    fast = {}
+    if fast_rules:
+        with _stage(hooks, 'fast_path'):
+            fast = _fast_sources(sources, fast_rules, hooks)
+        sources = [s for s in sources if s.name not in fast]
+    with _stage(hooks, 'read_source'):
+        for s in sources:
+            if s.content is None:
+                s.content = _io.read_source(s.file)
+    with _stage(hooks, 'parse_lines'):
+        parsed = _parse_sources(sources, hooks, docstrings)
+    with _stage(hooks, 'merge_nodes'):
+        merged = {
+            s.name: _graph.merge_nodes(s.name, s.file, lines)
+            for s, lines in zip(sources, parsed)
+        }
+    merged.update(fast)
+    return merged
+
+
+def _in_module(name: str, module: str) -> bool:
+    return name == module or name.startswith(module + '.')
+
+
+def _imported_modules(nodes: list, modules: _Dict[str, _io.Source]) -> set:
+    imported = set()
+    for node in nodes:
+        for source in node.import_sources:
+            parts = source.split('.')
+            imported.update('.'.join(parts[:i + 1]) for i in range(len(parts)))
+    return imported & modules.keys()
+
+
+def _follow_imports(
+    nodes: dict, depth: int, cache_path: str = None, hooks: _List[Hooks] = None
+) -> dict:
+    internal = {m.split('.')[0] for m in nodes}
+    cached, files = {}, {}
+    if cache_path:
+        cached, files = _cache.read_stamped_cache(cache_path)
+    followed = {}
+    frontier = list(nodes.values())
+    for _ in range(depth):
+        imports = {s for ns in frontier for n in ns for s in n.import_sources}
+        modules = {
+            m: f for m, f in _io.find_modules(imports).items()
+            if m.split('.')[0] not in internal and m not in followed
+        }
+        frontier = []
+        for module, file in sorted(modules.items()):
+            if module not in cached:
+                source = _io.Source(file, module)
+                try:
+                    source.content = _io.read_source(file)
+                    lines = _parse_sources([source], hooks)[0]
+                except (SyntaxError, UnicodeDecodeError) as e:
+                    _log.warning(f'could not parse {file}: {e}')
+                    continue
+                cached[module] = _graph.merge_nodes(module, file, lines)
+            followed[module] = cached[module]
+            files[module] = file
+            frontier.append(cached[module])
+
+    if cache_path:
+        _cache.write_cache(cache_path, cached, files)
+    _log.debug(f'followed imports to {len(followed)} external modules')
+    return followed
+
+
+def _build_graph(
+    source_paths: _List[str],
+    hooks: _List[Hooks] = None,
+    ignore: _List[str] = None,
+    namespace_packages: bool = False,
+    since: str = None,
+    parse_cache: str = None,
+    follow_imports: int = 0,
+    external_cache: str = None,
+    external_index: str = None,
+    fast_path: _List[str] = None,
+    exclude: _List[str] = None,
+    root: str = None,
+    docstrings: str = 'embed',
+    **kwargs,
+):
+    with _stage(hooks, 'resolve_sources'):
+        sources = _io.resolve_sources(source_paths, ignore, namespace_packages)
+    for hook in hooks or []:
+        for s in sources:
+            hook.on_source_resolved(s)
+
+    if since is not None and parse_cache is None:
+        msg = 'Pyfactor: a parse cache is required to parse only changed files!'
+        raise _cli.ArgumentError(msg)
+
+    fast_rules = _cli.parse_fast_rules(fast_path)
+    options = [list(r) for r in fast_rules]
+    cached = {}
+    stamped = {}
+    if since is not None and sources:
+        with _stage(hooks, 'read_cache'):
+            top = _git.repository(source_paths)
+            key = {'commit': _git.commit(since, top), 'options': options}
+            cached, stamped = _cache.read_stamped_cache(parse_cache, key)
+            changed = _git.changed_files(since, top)
+        cached = {
+            s.name: cached[s.name] for s in sources
+            if s.name in cached and s.file.resolve() not in changed
+        }
+        _log.info(
+            f'parsing {len(sources) - len(cached)} of {len(sources)} sources '
+            f'changed since {since}'
+        )
+
+    exclude = exclude or []
+    excluded = [e for e in exclude if any(_in_module(s.name, e) for s in sources)]
+    modules = {
+        s.name: s for s in sources
+        if not any(_in_module(s.name, e) for e in excluded)
+    }
+    exclude = [e for e in exclude if e not in excluded]
+
+    start = None
+    if root is not None and kwargs.get('collapse_waypoints'):
+        _log.debug('parsing all modules, waypoints depend on the whole graph')
+    elif root is not None:
+        start = max((m for m in modules if _in_module(root, m)), key=len, default=None)
+    pending = list(modules) if start is None else [start]
+    # Cached parse results are reused by later runs, so they keep docstrings
+    capture = docstrings != 'none' or parse_cache is not None
+    nodes = {}
+    while pending:
+        nodes.update(_merge_sources(
+            [modules[m] for m in pending if m not in cached],
+            hooks,
+            fast_rules,
+            capture,
+        ))
+        nodes.update({m: cached[m] for m in pending if m in cached})
+        if start is None:
+            break
+        imported = set()
+        for m in pending:
+            imported.update(_imported_modules(nodes[m], modules))
+        pending = sorted(imported - nodes.keys())
+    if start is not None:
+        _log.debug(f'parsed {len(nodes)} of {len(modules)} modules imported from {root}')
+
+    nodes = {m: nodes[m] for m in modules if m in nodes}
+    if parse_cache is not None and len(nodes) < len(modules) and since is None:
+        _log.info('parse cache not written, only some sources were parsed')
+    elif parse_cache is not None:
+        # Valid cached results of sources not parsed now are kept
+        with _stage(hooks, 'write_cache'):
+            key = {'commit': _git.head(source_paths), 'options': options}
+            written = {**cached, **nodes}
+            # Files that differ from the commit are stamped to catch later reverts
+            dirty = set()
+            if key['commit'] is not None:
+                dirty = _git.changed_files('HEAD', _git.repository(source_paths))
+            files = {m: f for m, f in stamped.items() if m in written}
+            files.update({
+                s.name: s.file for s in sources
+                if s.name in written and s.file.resolve() in dirty
+            })
+            _cache.write_cache(parse_cache, written, files, key=key)
+    if follow_imports:
+        with _stage(hooks, 'follow_imports'):
+            nodes.update(_follow_imports(nodes, follow_imports, external_cache, hooks))
+
+    resolve = None
+    if external_index is not None:
+        with _stage(hooks, 'index_external'):
+            index = ExportIndex(external_index)
+            index.update({
+                s.split('.')[0] for ns in nodes.values() for n in ns
+                for s in n.import_sources
+            } - {m.split('.')[0] for m in nodes})
+            index.write()
+        resolve = index.resolve
+    return _graph.build_graph(
+        [],
+        hooks=hooks,
+        nodes=nodes,
+        exclude=exclude,
+        root=root,
+        resolve_external_name=resolve,
+        docstrings=docstrings != 'none',
+        **kwargs,
+    )
 
 
 def parse(
@@ -25,10 +268,26 @@ def parse(
     root: str = None,
     collapse_waypoints: bool = False,
     collapse_exclude: _List[str] = None,
+    condense_cycles: bool = False,
     graph_attrs: _Dict[str, str] = None,
     node_attrs: _Dict[str, str] = None,
     edge_attrs: _Dict[str, str] = None,
-) -> None:
+    export_path: str = None,
+    export_format: str = None,
+    ignore: _List[str] = None,
+    namespace_packages: bool = False,
+    since: str = None,
+    parse_cache: str = None,
+    follow_imports: int = 0,
+    external_cache: str = None,
+    external_index: str = None,
+    fast_path: _List[str] = None,
+    engine: str = None,
+    positions: str = None,
+    compact: bool = False,
+    docstrings: str = 'embed',
+    hooks: _List[Hooks] = None,
+):
     """
     Parse source and create graph file.
 
@@ -43,37 +302,109 @@ def parse(
     imports
         import duplication/resolving mode
     exclude
-        exclude nodes in the graph
+        exclude nodes in the graph, names of modules or packages
+        exclude their modules from parsing
     root
-        only show root and its children in the graph
+        only show root and its children in the graph,
+        parsing only modules imported from the module of root
     collapse_waypoints
         collapse waypoint nodes
     collapse_exclude
         exclude nodes from being collapsed
+    condense_cycles
+        collapse dependency cycles to single nodes and log their members
     graph_attrs
         Graphviz graph attributes (overrided by Pyfactor)
     node_attrs
         Graphviz node attributes (overrided by Pyfactor)
     edge_attrs
         Graphviz edge attributes (overrided by Pyfactor)
+    export_path
+        path to machine-readable graph file to write, see :func:`export_graph`
+    export_format
+        format of the machine-readable graph file
+    ignore
+        file and directory name patterns to skip when discovering sources
+        in addition to hidden directories and .gitignore rules
+    namespace_packages
+        treat directories without an initialisation file
+        in source roots as namespace packages
+    since
+        git commit of the parse cache, only files changed since are parsed
+    parse_cache
+        path to a cache of parse results to write and to read with ``since``
+    follow_imports
+        depth of imports to follow into external modules, which are parsed
+        without parsing the rest of their packages
+    external_cache
+        path to a cache of parse results of external modules,
+        modules are parsed again when their files change
+    external_index
+        path to an :class:`ExportIndex` of installed distributions
+        for resolving imports to external definitions, disabled if None
+    fast_path
+        rules as ``mode:pattern`` or ``mode:>size`` for parsing files
+        in a cheap mode, ``names`` or ``fold`` (see ``--fast-path``)
+    engine
+        Graphviz layout engine, chosen by graph size if None
+    positions
+        path to node positions of a previous layout to pin nodes to,
+        see :func:`render`
+    compact
+        write the graph file compactly with short node identifiers
+        and shared attributes declared once
+    docstrings
+        ``embed`` docstrings as node tooltips, skip them entirely with ``none``
+        or write them to a separate ``external`` file next to the graph file
+        with the suffix ``.docs.json``, keyed by node identifier
+    hooks
+        callbacks for observing progress, see :class:`Hooks`
+
+    Returns
+    -------
+    networkx.DiGraph
+        the built graph
     """
-    sources = _io.resolve_sources(source_paths)
-    for s in sources:
-        s.content = _io.read_source(s.file)
-    parsed = [_visit.parse_lines(s) for s in sources]
-    graph = _graph.create_graph(
-        list(zip(sources, parsed)),
+    graph = _build_graph(
+        source_paths,
         skip_external=skip_external,
         imports=imports,
         exclude=exclude,
         root=root,
         collapse_waypoints=collapse_waypoints,
         collapse_exclude=collapse_exclude,
-        graph_attrs=graph_attrs,
+        condense=condense_cycles,
         node_attrs=node_attrs,
         edge_attrs=edge_attrs,
+        ignore=ignore,
+        namespace_packages=namespace_packages,
+        since=since,
+        parse_cache=parse_cache,
+        follow_imports=follow_imports,
+        external_cache=external_cache,
+        external_index=external_index,
+        fast_path=fast_path,
+        docstrings=docstrings,
+        hooks=hooks,
     )
-    _io.write_graph(graph, graph_path)
+    if export_path is not None:
+        with _stage(hooks, 'export_graph', graph):
+            export_graph(graph, export_path, export_format)
+    if docstrings == 'external':
+        with _stage(hooks, 'write_docs', graph):
+            docs = _graph.node_docs(graph)
+            if compact:
+                ids = _graph.compact_ids(graph)
+                docs = {ids[n]: d for n, d in docs.items()}
+            docs_path = _Path(graph_path).with_suffix('.docs.json')
+            docs_path.write_text(_json.dumps(docs), encoding='utf-8')
+    stored = _gv.read_positions(positions) if positions is not None else None
+    with _stage(hooks, 'to_gv', graph):
+        tooltips = docstrings != 'external'
+        gv_graph = _graph.to_gv(graph, graph_attrs, engine, stored, compact, tooltips)
+    with _stage(hooks, 'write_graph'):
+        _io.write_graph(gv_graph, graph_path)
+    return graph
 
 
 def legend(path: str, preprocess_kwargs: dict, render_kwargs: dict) -> None:
@@ -101,6 +432,11 @@ def pyfactor(
     parse_kwargs: dict = None,
     preprocess_kwargs: dict = None,
     render_kwargs: dict = None,
+    profile_memory: bool = False,
+    hooks: _List[Hooks] = None,
+    jobs: int = None,
+    cluster_layout: bool = False,
+    layout_cache: str = None,
 ) -> None:
     """
     Pyfactor Python endpoint.
@@ -121,6 +457,21 @@ def pyfactor(
         keyword arguments for :func:`preprocess`
     render_kwargs
         keyword arguments for :func:`render`
+    profile_memory
+        write a memory profile of all stages next to the graph file
+        with a ``.memory.json`` suffix, see :class:`MemoryProfile`
+    hooks
+        callbacks for observing progress, see :class:`Hooks`
+    jobs
+        number of Graphviz processes to run in parallel
+        when rendering to the interactive ``html`` format or with cluster layout
+    cluster_layout
+        lay out each module separately in parallel and compose
+        the layouts in a top-level layout of the module hierarchy,
+        only available in svg format
+    layout_cache
+        directory of cached module layouts for ``cluster_layout``,
+        layouts are not cached if None
     """
     source_paths = source_paths or []
     parse_kwargs = parse_kwargs or {}
@@ -128,17 +479,195 @@ def pyfactor(
     render_kwargs = render_kwargs or {}
 
     graph_temp = graph_path or str(_cli.infer_graph_from_sources(source_paths))
+    profile = MemoryProfile() if profile_memory else None
+    hooks = ([profile] if profile else []) + (hooks or [])
+    html = render_kwargs.get('format') == 'html'
+    if not html and 'html' in (render_kwargs.get('format') or '').split(','):
+        msg = 'Pyfactor: html format cannot be combined with other formats!'
+        raise _cli.ArgumentError(msg)
+    if (html or cluster_layout) and render_path is not None and not source_paths:
+        mode = 'html format' if html else 'cluster layout'
+        raise _cli.ArgumentError(f'Pyfactor: {mode} requires sources to parse!')
+    if cluster_layout and render_kwargs.get('format') not in (None, 'svg'):
+        raise _cli.ArgumentError('Pyfactor: cluster layout requires svg format!')
+
+    try:
+        if source_paths:
+            parse_kwargs = {'engine': render_kwargs.get('engine'), **parse_kwargs}
+            graph = parse(source_paths, graph_temp, hooks=hooks, **parse_kwargs)
+
+        if render_path is not None:
+            if html:
+                _html.write_html(
+                    graph,
+                    render_path,
+                    parse_kwargs.get('graph_attrs'),
+                    preprocess_kwargs,
+                    render_kwargs.get('engine'),
+                    jobs,
+                    render_kwargs.get('timeout'),
+                    render_kwargs.get('view', False),
+                    hooks,
+                )
+            elif cluster_layout:
+                _layout.render_clusters(
+                    graph,
+                    render_path,
+                    parse_kwargs.get('graph_attrs'),
+                    preprocess_kwargs,
+                    render_kwargs.get('engine'),
+                    jobs,
+                    layout_cache,
+                    render_kwargs.get('timeout'),
+                    render_kwargs.get('view', False),
+                    hooks,
+                )
+            else:
+                with _stage(hooks, 'read_graph'):
+                    source = _io.read_graph(graph_temp)
+                with _stage(hooks, 'preprocess'):
+                    source = preprocess(source, **preprocess_kwargs)
+                names = None
+                if source_paths and parse_kwargs.get('compact'):
+                    names = {i: n for n, i in _graph.compact_ids(graph).items()}
+                render(
+                    source,
+                    render_path,
+                    positions=parse_kwargs.get('positions'),
+                    names=names,
+                    hooks=hooks,
+                    **render_kwargs,
+                )
+
+            if graph_path is None:
+                _Path(graph_temp).unlink()
+    except BaseException:
+        if profile is not None:
+            profile.stop()
+        raise
+
+    if profile is not None:
+        profile.write(str(_Path(graph_temp).with_suffix('.memory.json')))
+
+
+def _load_graph(path: str, parse_kwargs: dict):
+    p = _Path(path)
+    if p.is_file() and p.suffix in _cli.export_suffixes.values():
+        return import_graph(path)
+    return _export.normalise(_build_graph([path], **parse_kwargs))
+
+
+def diff(
+    old_path: str,
+    new_path: str,
+    render_path: str = None,
+    context: int = 1,
+    parse_kwargs: dict = None,
+    render_kwargs: dict = None,
+) -> GraphDiff:
+    """
+    Compare two graphs and render the changed neighbourhood.
 
-    if source_paths:
-        parse(source_paths, graph_temp, **parse_kwargs)
+    Parameters
+    ----------
+    old_path
+        graph export file or source path before changes
+    new_path
+        graph export file or source path after changes
+    render_path
+        image file, rendering is disabled by default
+    context
+        levels of unchanged neighbours to show around changes
+    parse_kwargs
+        keyword arguments for parsing sources,
+        see :func:`parse` except for paths and Graphviz attributes
+    render_kwargs
+        keyword arguments for :func:`render`
+    """
+    parse_kwargs = parse_kwargs or {}
+    render_kwargs = render_kwargs or {}
+    old = _load_graph(old_path, parse_kwargs)
+    new = _load_graph(new_path, parse_kwargs)
+    result = diff_graphs(old, new)
 
     if render_path is not None:
-        source = _io.read_graph(graph_temp)
-        source = preprocess(source, **preprocess_kwargs)
-        render(source, render_path, **render_kwargs)
+        graph = create_diff_graph(old, new, result, context)
+        render(graph, render_path, **render_kwargs)
+    return result
+
+
+def diff_main(argv: _List[str] = None) -> None:
+    """Pyfactor diff CLI endpoint."""
+    _add_log_handler()
+    args = _cli.diff_parser.parse_args(argv)
+    parse_kwargs = {
+        'skip_external': args.skip_external,
+        'imports': args.imports,
+        'exclude': args.exclude,
+    }
+    render_kwargs = {'view': args.view, 'format': args.format}
+    render_path = None if args.output == '-' else args.output
+    try:
+        result = diff(
+            args.old, args.new, render_path, args.context, parse_kwargs, render_kwargs
+        )
+    except _cli.ArgumentError as e:
+        print(str(e), file=_stderr)
+        exit(1)
+    for line in result.summary():
+        print(line)
+
+
+def query(
+    graph_path: str,
+    nodes: _List[str],
+    dependencies: bool = False,
+    parse_kwargs: dict = None,
+) -> _List[str]:
+    """
+    Find transitive dependents or dependencies of nodes.
+
+    For repeated queries, build a :class:`ReachabilityIndex` directly.
+
+    Parameters
+    ----------
+    graph_path
+        graph export file or source path
+    nodes
+        nodes to query, either full names or unambiguous name suffixes
+    dependencies
+        find dependencies instead of dependents
+    parse_kwargs
+        keyword arguments for parsing sources,
+        see :func:`parse` except for paths and Graphviz attributes
+    """
+    graph = _load_graph(graph_path, parse_kwargs or {})
+    index = ReachabilityIndex(graph)
+    found = set()
+    for node in nodes:
+        if node not in index:
+            node = _graph.guess_node(graph, node)
+            if node is None:
+                continue
+        if dependencies:
+            found.update(index.dependencies(node))
+        else:
+            found.update(index.dependents(node))
+    return sorted(found)
 
-        if graph_path is None:
-            _Path(graph_temp).unlink()
+
+def query_main(argv: _List[str] = None) -> None:
+    """Pyfactor query CLI endpoint."""
+    _add_log_handler()
+    args = _cli.query_parser.parse_args(argv)
+    parse_kwargs = {'skip_external': args.skip_external, 'imports': args.imports}
+    try:
+        found = query(args.graph, args.nodes, args.dependencies, parse_kwargs)
+    except _cli.ArgumentError as e:
+        print(str(e), file=_stderr)
+        exit(1)
+    for node in found:
+        print(node)
 
 
 def _attrs_to_dict(attrs: _List[str] = None) -> _Dict[str, str]:
@@ -146,8 +675,17 @@ def _attrs_to_dict(attrs: _List[str] = None) -> _Dict[str, str]:
     return {n: v for n, v in split}
 
 
+def _add_log_handler() -> None:
+    if not _log.handlers:
+        handler = _logging.StreamHandler(_stderr)
+        handler.setFormatter(_logging.Formatter('Pyfactor: %(message)s'))
+        _log.addHandler(handler)
+        _log.setLevel(_logging.INFO)
+
+
 def main() -> None:
     """Pyfactor CLI endpoint."""
+    _add_log_handler()
     args = _cli.parser.parse_args()
 
     if args.version:
@@ -161,9 +699,24 @@ def main() -> None:
         'collapse_waypoints': args.collapse_waypoints,
         'collapse_exclude': args.collapse_exclude,
         'root': args.root,
+        'condense_cycles': args.condense_cycles,
         'graph_attrs': _attrs_to_dict(args.graph_attr),
         'node_attrs': _attrs_to_dict(args.node_attr),
         'edge_attrs': _attrs_to_dict(args.edge_attr),
+        'export_format': args.export_format,
+        'ignore': args.ignore,
+        'namespace_packages': args.namespace_packages,
+        'since': args.since,
+        'parse_cache': args.parse_cache,
+        'follow_imports': args.follow_imports,
+        'external_cache': args.external_cache or str(
+            _cli.default_cache_dir() / 'external.json'
+        ),
+        'external_index': _cli.index_path() if args.index_external else None,
+        'fast_path': args.fast_path,
+        'positions': args.positions,
+        'compact': args.compact_dot,
+        'docstrings': args.docstrings or _cli.default_docstrings(args.format),
     }
     preprocess_kwargs = {
         'stagger': args.stagger,
@@ -175,6 +728,8 @@ def main() -> None:
         'format': args.format,
         'renderer': args.renderer,
         'formatter': args.formatter,
+        'engine': args.engine,
+        'timeout': args.render_timeout,
     }
 
     if args.legend:
@@ -188,14 +743,30 @@ def main() -> None:
             print(str(e), file=_stderr)
             exit(1)
 
-        pyfactor(
-            source_paths,
-            graph_path,
-            render_path,
-            parse_kwargs,
-            preprocess_kwargs,
-            render_kwargs,
-        )
+        if args.export or args.export_format:
+            parse_kwargs['export_path'] = args.export or _cli.infer_export_name(
+                source_paths, args.export_format
+            )
+        timings = Timings() if args.timings else None
+        try:
+            pyfactor(
+                source_paths,
+                graph_path,
+                render_path,
+                parse_kwargs,
+                preprocess_kwargs,
+                render_kwargs,
+                args.profile_memory,
+                [timings] if timings else None,
+                args.jobs,
+                args.cluster_layout,
+                args.layout_cache,
+            )
+        except _cli.ArgumentError as e:
+            print(str(e), file=_stderr)
+            exit(1)
+        if timings is not None:
+            print(timings.table() if args.timings == 'table' else timings.json())
     if not args.sources and not args.legend:
         _cli.parser.print_help(_stderr)
         exit(1)
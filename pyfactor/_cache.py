@@ -0,0 +1,130 @@
+import json
+
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from ._graph import GraphNode, NodeType
+from ._io import write_atomic
+
+cache_version = 1
+
+
+def node_record(node: GraphNode) -> dict:
+    """Convert graph node to a JSON record."""
+    return {
+        'name': node.name,
+        'deps': sorted(node.deps),
+        'type': node.type.value,
+        'lineno': node.lineno_str,
+        'docstring': node.docstring,
+        'import_sources': sorted(node.import_sources),
+    }
+
+
+def record_node(record: dict) -> GraphNode:
+    """Convert JSON record to a graph node."""
+    return GraphNode(
+        record['name'],
+        set(record['deps']),
+        NodeType(record['type']),
+        record['lineno'],
+        record['docstring'],
+        set(record['import_sources']),
+    )
+
+
+def file_stamp(file: Path) -> List:
+    """Identify file contents by path, modification time and size."""
+    try:
+        stat = file.stat()
+    except OSError:
+        return [str(file), None, None]
+    return [str(file), stat.st_mtime_ns, stat.st_size]
+
+
+def read_stamped_cache(
+    path: str, key: dict = None
+) -> Tuple[Dict[str, List[GraphNode]], Dict[str, Path]]:
+    """
+    Read merged nodes and source files of modules from a parse cache.
+
+    Missing, unreadable caches and caches of other versions are treated as empty,
+    as are caches written with a different key.
+    Modules cached with a file stamp are dropped if their file has changed.
+
+    Parameters
+    ----------
+    path
+        path to cache file
+    key
+        identifier of the commit and options that the cache was written with
+    """
+    try:
+        data = json.loads(Path(path).read_text(encoding='utf-8'))
+    except (FileNotFoundError, ValueError):
+        return {}, {}
+    if not isinstance(data, dict) or data.get('version') != cache_version:
+        return {}, {}
+    if data.get('key') != key:
+        return {}, {}
+    stamps = data.get('files', {})
+    valid = {
+        module: Path(stamp[0]) for module, stamp in stamps.items()
+        if file_stamp(Path(stamp[0])) == stamp
+    }
+    modules = {
+        module: [record_node(r) for r in records]
+        for module, records in data['modules'].items()
+        if module not in stamps or module in valid
+    }
+    return modules, valid
+
+
+def read_cache(path: str, key: dict = None) -> Dict[str, List[GraphNode]]:
+    """
+    Read merged nodes of modules from a parse cache.
+
+    See :func:`read_stamped_cache` for details.
+
+    Parameters
+    ----------
+    path
+        path to cache file
+    key
+        identifier of the commit and options that the cache was written with
+    """
+    return read_stamped_cache(path, key)[0]
+
+
+def write_cache(
+    path: str,
+    modules: Dict[str, List[GraphNode]],
+    files: Dict[str, Path] = None,
+    key: dict = None,
+) -> None:
+    """
+    Write merged nodes of modules to a parse cache.
+
+    Parameters
+    ----------
+    path
+        path to cache file
+    modules
+        merged nodes by module name
+    files
+        source files by module name, stamped to invalidate changed modules
+    key
+        identifier of the commit and options that the cache is written with
+    """
+    data = {
+        'version': cache_version,
+        'key': key,
+        'modules': {
+            module: [node_record(n) for n in nodes]
+            for module, nodes in sorted(modules.items())
+        },
+        'files': {
+            module: file_stamp(file) for module, file in sorted((files or {}).items())
+        },
+    }
+    write_atomic(Path(path), json.dumps(data))
@@ -1,6 +1,10 @@
+import os
+import sys
+import hashlib
+
 from argparse import ArgumentParser
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 parser = ArgumentParser(
     allow_abbrev=False, description='Script dependency visualiser.'
@@ -8,7 +12,9 @@ parser = ArgumentParser(
 
 group_mode = parser.add_argument_group('Source and output')
 group_mode.add_argument('sources', nargs='*', help=(
-    'source file names. If sources was disabled by providing no names, '
+    'source file names, directories, importable packages or .whl, .zip '
+    'and .tar.gz archives. Directories that are not packages are source roots '
+    'containing modules and packages. If sources was disabled by providing no names, '
     '--graph is used as direct input for rendering. Disabling two or more of '
     'SOURCES, --graph and --output will return with an error code 1.'
 ))
@@ -25,9 +31,35 @@ group_mode.add_argument('--output', '-o', help=(
     'NOTE: --format is appended to the name'
 ))
 group_mode.add_argument('--format', '-f', default='svg', help=(
-    'render file format, appended to all render file names (default: %(default)s) '
-    'NOTE: displaying docstring tooltips is only available in svg and cmap formats'
+    'render file format, appended to all render file names (default: %(default)s). '
+    'Multiple comma-separated formats are rendered from a single layout '
+    '(e.g. -f svg,png,pdf) '
+    'NOTE: displaying docstring tooltips is only available in svg and cmap formats. '
+    'The html format writes an interactive page that starts from the top '
+    'module level and loads each level when it is expanded, '
+    'and cannot be combined with other formats'
+))
+group_mode.add_argument('--ignore', '-I', action='append', help=(
+    'file and directory name patterns to skip when discovering sources '
+    '(e.g. -I build -I "*_pb2.py"). Hidden directories, __pycache__, '
+    'node_modules and patterns of .gitignore files are always skipped'
+))
+group_mode.add_argument('--namespace-packages', '-np', action='store_true', help=(
+    'treat directories without __init__.py in source directories '
+    'as namespace packages, for example to combine src directories of a monorepo'
+))
+group_mode.add_argument('--export', help=(
+    'write a machine-readable graph file when parsing sources. '
+    'If only --export-format is given, the name is inferred from SOURCES'
 ))
+group_mode.add_argument(
+    '--export-format', choices=['jsonl', 'graphml', 'binary'], help=(
+        'machine-readable graph format: newline-delimited JSON, GraphML '
+        'or a compact binary edge list with a string table. '
+        'By default the format is inferred from the --export suffix '
+        '(.jsonl, .graphml or .pfg)'
+    )
+)
 group_mode.add_argument(
     '--legend', nargs='?', default=None, const='pyfactor-legend', help=(
         'render a legend, optionally specify a file name (default: %(const)s)'
@@ -51,7 +83,10 @@ group_parse.add_argument(
     )
 )
 group_parse.add_argument(
-    '--exclude', '-e', action='append', help='exclude nodes in the source'
+    '--exclude', '-e', action='append', help=(
+        'exclude nodes in the source. Names of modules or packages '
+        'exclude all of their modules and nodes, which are then not parsed'
+    )
 )
 group_parse.add_argument(
     '--collapse-waypoints', '-cw', action='store_true', help=(
@@ -64,10 +99,62 @@ group_parse.add_argument(
         'when --collapse-waypoints is set'
     )
 )
+group_parse.add_argument(
+    '--condense-cycles', '-cc', action='store_true', help=(
+        'collapse each dependency cycle to a single node listing its members '
+        'and report cycle members'
+    )
+)
+group_parse.add_argument(
+    '--parse-cache', '-pc', help=(
+        'write parse results of all sources to a file, '
+        'which is read with --since to parse only changed sources'
+    )
+)
+group_parse.add_argument(
+    '--since', help=(
+        'git commit, branch or tag that --parse-cache was written at. '
+        'Only sources changed since then, including uncommitted and untracked '
+        'files, are parsed and results of other sources are read from the cache. '
+        'Caches written at other commits or with other --fast-path rules are ignored'
+    )
+)
+group_parse.add_argument(
+    '--fast-path', '-fp', action='append', metavar='MODE:RULE', help=(
+        'parse files matching a rule in a cheap mode and report them. '
+        'Modes are "names", finding module-level names without dependencies, '
+        'and "fold", showing the module as a single node. '
+        'Rules are file or module name patterns or sizes in bytes '
+        'with an optional k or M suffix, e.g. -fp "fold:*_pb2.py" -fp names:>1M. '
+        'The first matching rule is used'
+    )
+)
+group_parse.add_argument(
+    '--follow-imports', '-fi', type=int, default=0, metavar='DEPTH', help=(
+        'parse external modules imported from sources, following their imports '
+        'to the given depth. Only imported modules are parsed, not whole packages'
+    )
+)
+group_parse.add_argument(
+    '--external-cache', help=(
+        'cache of parsed external modules for --follow-imports '
+        '(default: $XDG_CACHE_HOME/pyfactor/external.json or ~/.cache/...)'
+    )
+)
+group_parse.add_argument(
+    '--index-external', '-ix', action='store_true', help=(
+        'resolve imports to definitions in installed distributions using '
+        'an index of their top-level names and re-exports, preferring stubs. '
+        'The index is stored per environment in the user cache directory '
+        'and distributions are indexed again when their file list changes'
+    )
+)
 group_parse.add_argument(
     '--root', '-r', default=None, help=(
-        'only show root and its children in the graph '
-        'NOTE: does not affect graph coloring'
+        'only show root and its children in the graph. '
+        'Only modules imported from the module of root, directly or indirectly, '
+        'are parsed unless --collapse-waypoints is set. '
+        'NOTE: graph coloring only considers parsed modules'
     )
 )
 
@@ -84,7 +171,8 @@ group_graph.add_argument(
 group_graph.add_argument(
     '--graph-attr', '-ga', action='append', help=(
         'Graphviz graph attributes as colon-separated name-value pairs '
-        '(e.g. -ga overlap:false) NOTE: overrided by Pyfactor'
+        '(e.g. -ga overlap:false) NOTE: overrided by Pyfactor, '
+        'except for layout settings chosen by graph size'
     )
 )
 group_graph.add_argument(
@@ -99,7 +187,43 @@ group_graph.add_argument(
         '(e.g. -ea arrowsize:2) NOTE: overrided by Pyfactor'
     )
 )
-group_graph.add_argument('--engine', help='Graphviz layout engine')
+group_graph.add_argument('--compact-dot', '-cd', action='store_true', help=(
+    'write the graph file compactly with short numeric node identifiers, '
+    'common attributes declared once per module and Graphviz defaults left out, '
+    'making it faster to read for Graphviz'
+))
+group_graph.add_argument(
+    '--docstrings', choices=('embed', 'none', 'external'), help=(
+        'docstring mode: embed docstrings as node tooltips, skip them entirely, '
+        'or write them to a separate file next to the graph file with suffix '
+        '.docs.json, keyed by node identifier '
+        '(default: embed for formats that display tooltips, otherwise none)'
+    )
+)
+group_graph.add_argument('--engine', help=(
+    'Graphviz layout engine. By default the engine and layout effort '
+    'are chosen by graph size, using sfdp for the largest graphs'
+))
+group_graph.add_argument('--positions', '-p', help=(
+    'file of node positions to reuse and update. If all nodes were placed '
+    'in the previous render, its layout is reused and only edges are drawn, '
+    'keeping repeated renders stable and fast'
+))
+group_graph.add_argument('--render-timeout', type=float, help=(
+    'time limit of rendering in seconds. When exceeded, rendering is stopped '
+    'and tried again with cheaper settings and finally with sfdp. '
+    'With html format or --cluster-layout, each level or module is limited separately'
+))
+group_graph.add_argument('--cluster-layout', '-cl', action='store_true', help=(
+    'lay out each module separately in parallel and compose the layouts '
+    'in a top-level layout of the module hierarchy, routing edges between '
+    'modules at the top level. Faster for large graphs but edges connect '
+    'modules instead of names. Only available in svg format'
+))
+group_graph.add_argument('--layout-cache', help=(
+    'directory of cached module layouts for --cluster-layout, unchanged '
+    'modules are not laid out again (default: layouts are not cached)'
+))
 
 group_misc = parser.add_argument_group('Miscellaneous options')
 group_misc.add_argument('--view', action='store_true', help=(
@@ -111,10 +235,90 @@ group_misc.add_argument(
 group_misc.add_argument(
     '--formatter', help='Graphviz output formatter'
 )
+group_misc.add_argument(
+    '--profile-memory', action='store_true', help=(
+        'write peak memory and top allocation sites of each stage as JSON '
+        'to the graph file name with a .memory.json suffix'
+    )
+)
+group_misc.add_argument(
+    '--timings', nargs='?', const='table', choices=['table', 'json'], help=(
+        'print durations of each stage with graph sizes '
+        'and the slowest files to parse as a table or JSON (default: %(const)s)'
+    )
+)
+group_misc.add_argument(
+    '--jobs', '-j', type=int, help=(
+        'number of Graphviz processes to run in parallel when rendering '
+        'html output or with --cluster-layout '
+        '(default: based on the number of processors)'
+    )
+)
 group_misc.add_argument(
     '--version', '-v', action='store_true', help='display version number and exit'
 )
 
+diff_parser = ArgumentParser(
+    prog='pyfactor-diff',
+    allow_abbrev=False,
+    description=(
+        'Compare two graphs and render the changed neighbourhood. '
+        'Added nodes and edges are green and removed ones red.'
+    ),
+)
+diff_parser.add_argument('old', help=(
+    'graph before changes: a graph export file (see --export) or a source path'
+))
+diff_parser.add_argument('new', help='graph after changes, see OLD')
+diff_parser.add_argument('--output', '-o', default='pyfactor-diff', help=(
+    'render file name (default: %(default)s). '
+    'If the name is a single hyphen, only a text summary is written'
+))
+diff_parser.add_argument('--format', '-f', default='svg', help=(
+    'render file format (default: %(default)s)'
+))
+diff_parser.add_argument('--context', '-c', type=int, default=1, help=(
+    'levels of unchanged neighbours to show around changes (default: %(default)s)'
+))
+diff_parser.add_argument(
+    '--imports', '-i', default='interface', help='see pyfactor --imports'
+)
+diff_parser.add_argument(
+    '--skip-external', '-se', action='store_true', help='see pyfactor --skip-external'
+)
+diff_parser.add_argument(
+    '--exclude', '-e', action='append', help='see pyfactor --exclude'
+)
+diff_parser.add_argument('--view', action='store_true', help=(
+    'open result in default application after rendering'
+))
+
+query_parser = ArgumentParser(
+    prog='pyfactor-query',
+    allow_abbrev=False,
+    description=(
+        'Find transitive dependents or dependencies of nodes. '
+        'The union of results is written one node per line.'
+    ),
+)
+query_parser.add_argument('graph', help=(
+    'graph export file (see --export) or a source path'
+))
+query_parser.add_argument('nodes', nargs='+', help=(
+    'nodes to query, either full names or unambiguous name suffixes'
+))
+query_parser.add_argument(
+    '--dependencies', '-d', action='store_true', help=(
+        'find dependencies instead of dependents'
+    )
+)
+query_parser.add_argument(
+    '--imports', '-i', default='interface', help='see pyfactor --imports'
+)
+query_parser.add_argument(
+    '--skip-external', '-se', action='store_true', help='see pyfactor --skip-external'
+)
+
 
 class ArgumentError(RuntimeError):
     """Invalid command line arguments given."""
@@ -125,12 +329,73 @@ def make_absolute(path: Path) -> Path:
     return path if path.is_absolute() else Path.cwd() / path
 
 
+fast_modes = ('names', 'fold')
+size_units = {'': 1, 'k': 2 ** 10, 'M': 2 ** 20}
+
+
+def parse_fast_rules(rules: List[str]) -> List[Tuple[str, str, Optional[int]]]:
+    """
+    Parse fast path rules to modes, patterns and size thresholds.
+
+    Rules are formatted as ``mode:pattern`` or ``mode:>size``.
+    """
+    parsed = []
+    for rule in rules or []:
+        mode, _, pattern = rule.partition(':')
+        if mode not in fast_modes or not pattern:
+            msg = f'Pyfactor: invalid fast path rule `{rule}`! Expected MODE:RULE.'
+            raise ArgumentError(msg)
+        if not pattern.startswith('>'):
+            parsed.append((mode, pattern, None))
+            continue
+        size = pattern[1:]
+        unit = size[-1] if size[-1:] in ('k', 'M') else ''
+        try:
+            threshold = int(size[:len(size) - len(unit)]) * size_units[unit]
+        except ValueError:
+            raise ArgumentError(f'Pyfactor: invalid fast path size `{size}`!')
+        parsed.append((mode, '', threshold))
+    return parsed
+
+
+tooltip_formats = {
+    'svg', 'svgz', 'cmap', 'cmapx', 'cmapx_np', 'imap', 'imap_np', 'html'
+}
+
+
+def default_docstrings(format: str) -> str:
+    """Embed docstrings if any of comma-separated formats displays tooltips."""
+    formats = set((format or 'svg').split(','))
+    return 'embed' if formats & tooltip_formats else 'none'
+
+
+def default_cache_dir() -> Path:
+    """Find user cache directory of Pyfactor."""
+    base = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+    return Path(base) / 'pyfactor'
+
+
+def index_path() -> str:
+    """Find path to the export index of the current environment."""
+    environment = f'{sys.prefix}:{sys.version}'.encode('utf-8')
+    digest = hashlib.sha1(environment).hexdigest()[:12]
+    return str(default_cache_dir() / f'index-{digest}.json')
+
+
 def infer_graph_from_sources(sources: List[str]) -> Path:
     """Infer graph name from sources."""
     parts = [make_absolute(Path(s)).stem for s in sources]
     return Path('-'.join(parts)).with_suffix('.gv')
 
 
+export_suffixes = {'jsonl': '.jsonl', 'graphml': '.graphml', 'binary': '.pfg'}
+
+
+def infer_export_name(sources: List[str], format: str) -> str:
+    """Infer export file name from sources."""
+    return str(infer_graph_from_sources(sources).with_suffix(export_suffixes[format]))
+
+
 def parse_names(sources: List[str], graph: Optional[str], output: Optional[str]):
     """Parse file names from arguments."""
     if not sources and (not graph or graph == '-'):
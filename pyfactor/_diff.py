@@ -0,0 +1,136 @@
+import networkx as nx
+import graphviz as gv
+
+from dataclasses import dataclass
+from enum import Enum
+from typing import List, Set, Tuple
+
+from ._graph import NodeType, ConnectivityColor, type_shape, to_gv
+from ._export import module_type
+
+Edge = Tuple[str, str]
+
+
+@dataclass
+class GraphDiff:
+    """Structural difference between two graphs."""
+
+    added_nodes: Set[str]
+    removed_nodes: Set[str]
+    added_edges: Set[Edge]
+    removed_edges: Set[Edge]
+
+    @property
+    def changed_nodes(self) -> Set[str]:
+        """Nodes that were added, removed or had their edges changed."""
+        nodes = self.added_nodes | self.removed_nodes
+        for edges in (self.added_edges, self.removed_edges):
+            for u, v in edges:
+                nodes.add(u)
+                nodes.add(v)
+        return nodes
+
+    def summary(self) -> List[str]:
+        """Summarise changes as sorted lines prefixed by "+" or "-"."""
+        lines = [f'+ {n}' for n in sorted(self.added_nodes)]
+        lines += [f'- {n}' for n in sorted(self.removed_nodes)]
+        lines += [f'+ {u} -> {v}' for u, v in sorted(self.added_edges)]
+        lines += [f'- {u} -> {v}' for u, v in sorted(self.removed_edges)]
+        return lines
+
+
+def diff_graphs(old: nx.DiGraph, new: nx.DiGraph) -> GraphDiff:
+    """
+    Compute added and removed nodes and edges.
+
+    Graphs are compared by node names, which are stable between runs.
+    """
+    old_nodes = set(old.nodes)
+    new_nodes = set(new.nodes)
+    old_edges = set(old.edges)
+    new_edges = set(new.edges)
+    return GraphDiff(
+        new_nodes - old_nodes,
+        old_nodes - new_nodes,
+        new_edges - old_edges,
+        old_edges - new_edges,
+    )
+
+
+class DiffColor(Enum):
+    """Colors for graph differences."""
+
+    added = '#008800'
+    added_fill = '#CCFFCC'
+    removed = '#CC0000'
+    removed_fill = '#FFCCCC'
+    context = '#999999'
+    context_fill = '#F5F5F5'
+
+
+type_shapes = {t.value: type_shape[t] for t in NodeType}
+type_shapes[module_type] = 'tab'
+
+
+def create_diff_graph(
+    old: nx.DiGraph, new: nx.DiGraph, diff: GraphDiff, levels: int = 1
+) -> gv.Source:
+    """
+    Create a graph of the changed neighbourhood.
+
+    Parameters
+    ----------
+    old
+        normalised graph before changes
+    new
+        normalised graph after changes
+    diff
+        difference between the graphs
+    levels
+        number of unchanged neighbour levels to include around changes
+    """
+    added, removed = DiffColor.added, DiffColor.removed
+    added_fill, removed_fill = DiffColor.added_fill, DiffColor.removed_fill
+    context, context_fill = DiffColor.context, DiffColor.context_fill
+
+    union = nx.compose(old, new)
+    changed = diff.changed_nodes
+    shown = set(changed)
+    frontier = set(shown)
+    for _ in range(levels):
+        frontier = {
+            n for f in frontier
+            for n in (*union.predecessors(f), *union.successors(f))
+            if n not in shown
+        }
+        shown.update(frontier)
+
+    graph = nx.DiGraph()
+    for node in shown:
+        data = union.nodes[node]
+        name = node.split('.')[-1].center(12, ' ')
+        attrs = {
+            'label': f'{name}\\n{data["type"]}:{data["lineno"]}',
+            'shape': type_shapes.get(data['type'], 'ellipse'),
+            'style': 'filled',
+            'fillcolor': ConnectivityColor.default.value,
+            'tooltip': node,
+        }
+        if node in diff.added_nodes:
+            attrs.update(color=added.value, fillcolor=added_fill.value)
+        elif node in diff.removed_nodes:
+            attrs.update(color=removed.value, fillcolor=removed_fill.value)
+        elif node not in changed:
+            attrs.update(color=context.value, fillcolor=context_fill.value)
+        graph.add_node(node, **attrs)
+
+    for u, v, data in union.subgraph(shown).edges.data():
+        attrs = {'style': 'dashed'} if data.get('kind') == 'import' else {}
+        if (u, v) in diff.added_edges:
+            attrs.update(color=added.value, penwidth='2.5')
+        elif (u, v) in diff.removed_edges:
+            attrs.update(color=removed.value, penwidth='2.5')
+        else:
+            attrs.update(color=context.value)
+        graph.add_edge(u, v, **attrs)
+    return gv.Source(to_gv(graph).source)
@@ -0,0 +1,342 @@
+import sys
+import json
+import struct
+import networkx as nx
+
+from array import array
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Tuple
+from xml.sax.saxutils import escape
+
+from ._cli import ArgumentError, export_suffixes
+from ._graph import MiscColor, cluster_invis_node
+
+module_type = 'M'
+binary_magic = b'PYFG'
+binary_version = 1
+
+
+def node_records(graph: nx.DiGraph) -> Iterator[Tuple[str, Dict[str, str]]]:
+    """
+    Generate exported names and metadata of graph nodes.
+
+    Invisible cluster nodes are exported as module nodes.
+    """
+    for node, data in graph.nodes.items():
+        if node.endswith('.' + cluster_invis_node):
+            name = node[:-len(cluster_invis_node) - 1]
+            type_ = module_type
+            lineno = ''
+        else:
+            name = node
+            type_ = data.get('type', '?')
+            lineno = data.get('lineno', '')
+        module = '.'.join(name.split('.')[:-1])
+        yield node, {'name': name, 'module': module, 'type': type_, 'lineno': lineno}
+
+
+def node_ids(graph: nx.DiGraph) -> Tuple[Dict[str, int], List[Dict[str, str]]]:
+    """Assign integer ids to exported nodes, one for each graph node."""
+    ids = {}
+    records = []
+    for node, record in node_records(graph):
+        ids[node] = len(records)
+        records.append(record)
+    return ids, records
+
+
+def add_record(graph: nx.DiGraph, name: str, attrs: Dict[str, str]) -> None:
+    """
+    Add a node read from an exported record.
+
+    A module node does not replace the metadata of another node of the same name.
+    """
+    if attrs['type'] == module_type and name in graph:
+        return
+    graph.add_node(name, **attrs)
+
+
+def edge_records(
+    graph: nx.DiGraph, ids: Dict[str, int]
+) -> Iterator[Tuple[int, int, str, bool]]:
+    """Generate exported edges as source, target, kind and bridge status."""
+    bridge = MiscColor.bridge.value
+    for u, v, data in graph.edges.data():
+        kind = data.get('kind', 'reference')
+        yield ids[u], ids[v], kind, data.get('color') == bridge
+
+
+def normalise(graph: nx.DiGraph) -> nx.DiGraph:
+    """Convert a built graph to the form that is read from exported files."""
+    ids, records = node_ids(graph)
+    names = [r['name'] for r in records]
+    norm = nx.DiGraph()
+    for r in records:
+        attrs = {'module': r['module'], 'type': r['type'], 'lineno': r['lineno']}
+        add_record(norm, r['name'], attrs)
+    norm.add_edges_from(
+        (names[u], names[v], {'kind': kind, 'bridge': is_bridge})
+        for u, v, kind, is_bridge in edge_records(graph, ids)
+    )
+    return norm
+
+
+def split_lineno(lineno: str) -> List[int]:
+    """Split line number string to integers."""
+    return [int(n) for n in lineno.split(',') if n]
+
+
+def write_jsonl(graph: nx.DiGraph, path: str) -> None:
+    """
+    Write graph as newline-delimited JSON.
+
+    All node records are written before edge records,
+    which refer to nodes by their integer ids.
+    """
+    ids, records = node_ids(graph)
+    with open(path, 'w', encoding='utf-8') as f:
+        for i, r in enumerate(records):
+            line = {
+                'record': 'node',
+                'id': i,
+                'name': r['name'],
+                'module': r['module'],
+                'type': r['type'],
+                'lineno': split_lineno(r['lineno']),
+            }
+            f.write(json.dumps(line) + '\n')
+        for u, v, kind, is_bridge in edge_records(graph, ids):
+            line = {
+                'record': 'edge',
+                'source': u,
+                'target': v,
+                'kind': kind,
+                'bridge': is_bridge,
+            }
+            f.write(json.dumps(line) + '\n')
+
+
+def read_jsonl(path: str) -> nx.DiGraph:
+    """Read graph from newline-delimited JSON."""
+    graph = nx.DiGraph()
+    names = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            r = json.loads(line)
+            if r['record'] == 'node':
+                names[r['id']] = r['name']
+                add_record(graph, r['name'], {
+                    'module': r['module'],
+                    'type': r['type'],
+                    'lineno': ','.join(str(n) for n in r['lineno']),
+                })
+            else:
+                graph.add_edge(
+                    names[r['source']],
+                    names[r['target']],
+                    kind=r['kind'],
+                    bridge=r['bridge'],
+                )
+    return graph
+
+
+graphml_keys = [
+    ('name', 'node', 'string'),
+    ('module', 'node', 'string'),
+    ('type', 'node', 'string'),
+    ('lineno', 'node', 'string'),
+    ('kind', 'edge', 'string'),
+    ('bridge', 'edge', 'boolean'),
+]
+
+
+def write_graphml(graph: nx.DiGraph, path: str) -> None:
+    """Write graph as GraphML."""
+    ids, records = node_ids(graph)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+        )
+        for name, domain, type_ in graphml_keys:
+            f.write(
+                f'<key id="{name}" for="{domain}" '
+                f'attr.name="{name}" attr.type="{type_}"/>\n'
+            )
+        f.write('<graph edgedefault="directed">\n')
+        for i, r in enumerate(records):
+            data = ''.join(
+                f'<data key="{k}">{escape(r[k])}</data>'
+                for k in ('name', 'module', 'type', 'lineno')
+            )
+            f.write(f'<node id="n{i}">{data}</node>\n')
+        for u, v, kind, is_bridge in edge_records(graph, ids):
+            f.write(
+                f'<edge source="n{u}" target="n{v}">'
+                f'<data key="kind">{escape(kind)}</data>'
+                f'<data key="bridge">{str(is_bridge).lower()}</data></edge>\n'
+            )
+        f.write('</graph>\n</graphml>\n')
+
+
+def read_graphml(path: str) -> nx.DiGraph:
+    """Read graph from GraphML."""
+    raw = nx.read_graphml(path)
+    graph = nx.DiGraph()
+    for _, data in raw.nodes.items():
+        add_record(graph, data['name'], {
+            'module': data.get('module', ''),
+            'type': data.get('type', '?'),
+            'lineno': data.get('lineno', ''),
+        })
+    for u, v, data in raw.edges.data():
+        graph.add_edge(
+            raw.nodes[u]['name'],
+            raw.nodes[v]['name'],
+            kind=data.get('kind', 'reference'),
+            bridge=data.get('bridge', False),
+        )
+    return graph
+
+
+edge_kinds = ['reference', 'import']
+
+
+def write_binary(graph: nx.DiGraph, path: str) -> None:
+    """
+    Write graph as a compact binary edge list.
+
+    The layout is a header of magic bytes and version,
+    a table of edge kinds and a table of other strings
+    as length-prefixed UTF-8,
+    node records of string indices for name, module, type and line numbers
+    and edge records of source and target node ids and an edge kind.
+    All integers are unsigned 32-bit little-endian.
+    Bridge edges have the highest bit of their kind set.
+    """
+    ids, records = node_ids(graph)
+    kinds = list(edge_kinds)
+    strings = {}
+
+    def intern(s: str) -> int:
+        if s not in strings:
+            strings[s] = len(strings)
+        return strings[s]
+
+    nodes = array('I')
+    for r in records:
+        nodes.extend(intern(r[k]) for k in ('name', 'module', 'type', 'lineno'))
+    edges = array('I')
+    for u, v, kind, is_bridge in edge_records(graph, ids):
+        if kind not in kinds:
+            kinds.append(kind)
+        edges.extend((u, v, kinds.index(kind) | (is_bridge << 31)))
+
+    with open(path, 'wb') as f:
+        f.write(binary_magic + struct.pack('<B', binary_version))
+        f.write(struct.pack('<I', len(kinds)))
+        for kind in kinds:
+            encoded = kind.encode('utf-8')
+            f.write(struct.pack('<I', len(encoded)) + encoded)
+        f.write(struct.pack('<I', len(strings)))
+        for s in strings:
+            encoded = s.encode('utf-8')
+            f.write(struct.pack('<I', len(encoded)) + encoded)
+        f.write(struct.pack('<II', len(records), len(edges) // 3))
+        for arr in (nodes, edges):
+            if sys.byteorder == 'big':
+                arr.byteswap()
+            arr.tofile(f)
+
+
+def _read_strings(f) -> List[str]:
+    count, = struct.unpack('<I', f.read(4))
+    strings = []
+    for _ in range(count):
+        length, = struct.unpack('<I', f.read(4))
+        strings.append(f.read(length).decode('utf-8'))
+    return strings
+
+
+def read_binary(path: str) -> nx.DiGraph:
+    """Read graph from a compact binary edge list."""
+    with open(path, 'rb') as f:
+        header = f.read(len(binary_magic) + 1)
+        if header[:-1] != binary_magic or header[-1] != binary_version:
+            raise ArgumentError(f'Pyfactor: `{path}` is not a binary graph export!')
+        kinds = _read_strings(f)
+        strings = _read_strings(f)
+        n_nodes, n_edges = struct.unpack('<II', f.read(8))
+        nodes = array('I')
+        nodes.fromfile(f, n_nodes * 4)
+        edges = array('I')
+        edges.fromfile(f, n_edges * 3)
+    if sys.byteorder == 'big':
+        nodes.byteswap()
+        edges.byteswap()
+
+    graph = nx.DiGraph()
+    names = [strings[i] for i in nodes[::4]]
+    for n, m, t, ln in zip(names, nodes[1::4], nodes[2::4], nodes[3::4]):
+        add_record(
+            graph, n, {'module': strings[m], 'type': strings[t], 'lineno': strings[ln]}
+        )
+    graph.add_edges_from(
+        (names[u], names[v], {
+            'kind': kinds[k & 0x7FFFFFFF], 'bridge': bool(k >> 31)
+        })
+        for u, v, k in zip(edges[::3], edges[1::3], edges[2::3])
+    )
+    return graph
+
+
+formats: Dict[str, Tuple[str, Callable, Callable]] = {
+    'jsonl': (export_suffixes['jsonl'], write_jsonl, read_jsonl),
+    'graphml': (export_suffixes['graphml'], write_graphml, read_graphml),
+    'binary': (export_suffixes['binary'], write_binary, read_binary),
+}
+
+
+def format_from_path(path: str) -> str:
+    """Infer export format from file suffix."""
+    suffix = Path(path).suffix
+    for name, (s, _, _) in formats.items():
+        if s == suffix:
+            return name
+    raise ArgumentError(f'Pyfactor: unknown graph export suffix `{suffix}`!')
+
+
+def export_graph(graph: nx.DiGraph, path: str, format: str = None) -> None:
+    """
+    Write graph in a machine-readable format.
+
+    Parameters
+    ----------
+    graph
+        graph to export
+    path
+        path to export file to write
+    format
+        export format, one of :data:`formats`, by default inferred from path
+    """
+    format = format or format_from_path(path)
+    if format not in formats:
+        raise ArgumentError(f'Pyfactor: invalid export format `{format}`!')
+    formats[format][1](graph, path)
+
+
+def import_graph(path: str, format: str = None) -> nx.DiGraph:
+    """
+    Read a graph written by :func:`export_graph`.
+
+    Parameters
+    ----------
+    path
+        path to export file to read
+    format
+        export format, one of :data:`formats`, by default inferred from path
+    """
+    format = format or format_from_path(path)
+    if format not in formats:
+        raise ArgumentError(f'Pyfactor: invalid export format `{format}`!')
+    return formats[format][2](path)
@@ -0,0 +1,74 @@
+import subprocess
+
+from pathlib import Path
+from typing import List, Optional, Set
+
+from ._cli import ArgumentError, make_absolute
+
+
+def run_git(args: List[str], cwd: Path) -> str:
+    """Run a git command and return its output."""
+    try:
+        result = subprocess.run(
+            ['git'] + args,
+            cwd=cwd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            check=True,
+        )
+    except FileNotFoundError:
+        raise ArgumentError('Pyfactor: git executable was not found!')
+    except subprocess.CalledProcessError as e:
+        msg = f'Pyfactor: `git {" ".join(args)}` failed! {e.stderr.strip()}'
+        raise ArgumentError(msg)
+    return result.stdout
+
+
+def toplevel(path: Path) -> Path:
+    """Find the top directory of the repository containing path."""
+    directory = path if path.is_dir() else path.parent
+    return Path(run_git(['rev-parse', '--show-toplevel'], directory).strip())
+
+
+def changed_files(ref: str, path: Path) -> Set[Path]:
+    """
+    Find files that changed since a commit in the repository containing path.
+
+    Changes are compared to the working tree, so uncommitted
+    and untracked files are included. Deleted files are included too.
+
+    Parameters
+    ----------
+    ref
+        commit, branch or tag to compare to
+    path
+        file or directory in the repository
+    """
+    top = toplevel(path)
+    diff = run_git(['diff', '--name-only', '--no-renames', ref, '--'], top)
+    untracked = run_git(['ls-files', '--others', '--exclude-standard'], top)
+    names = diff.splitlines() + untracked.splitlines()
+    return {(top / name).resolve() for name in names if name}
+
+
+def repository(paths: List[str]) -> Path:
+    """Find the top directory of the single repository containing all paths."""
+    tops = {toplevel(make_absolute(Path(p))) for p in paths}
+    if len(tops) > 1:
+        msg = 'Pyfactor: sources in multiple git repositories cannot be compared!'
+        raise ArgumentError(msg)
+    return tops.pop()
+
+
+def commit(ref: str, path: Path) -> str:
+    """Resolve a commit, branch or tag to a commit hash."""
+    return run_git(['rev-parse', '--verify', f'{ref}^{{commit}}'], path).strip()
+
+
+def head(paths: List[str]) -> Optional[str]:
+    """Find the current commit of the repository of paths, or None if there is not one."""
+    try:
+        return commit('HEAD', repository(paths))
+    except ArgumentError:
+        return None
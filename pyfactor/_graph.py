@@ -1,17 +1,24 @@
+import re
 import ast
+import logging
 
 import networkx as nx
 import graphviz as gv
 
+from collections import Counter
 from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
 from textwrap import dedent
 from warnings import warn
-from typing import List, Dict, Set, Optional, Tuple
+from typing import Callable, List, Dict, Set, Optional, Tuple
 from ._visit import Line
 from ._io import Source
 from ._cli import ArgumentError
+from ._hooks import Hooks, stage
+from ._gv import layout_policy, pinned_layout
+
+log = logging.getLogger(__name__)
 
 
 class NodeType(Enum):
@@ -23,6 +30,8 @@ class NodeType(Enum):
     import_ = 'I'
     unknown = '?'
     multiple = '+'
+    cycle = 'O'
+    module = 'M'
 
 
 def get_type(node: ast.AST) -> NodeType:
@@ -101,6 +110,64 @@ def merge_nodes(location: str, file: Path, lines: List[Line]) -> List[GraphNode]
     return [node for node, _ in nodes.values()]
 
 
+definition_pattern = re.compile(r'(?:async\s+def|def|class)\s+(\w+)')
+assignment_pattern = re.compile(r'(\w+)\s*(?::[^=]*)?=(?!=)')
+
+
+def fast_nodes(location: str, text: str, mode: str) -> List[GraphNode]:
+    """
+    Create graph nodes of a module without analysing dependencies.
+
+    In ``names`` mode, definitions and assignments starting
+    at the beginning of a line are found with regular expressions.
+    In ``fold`` mode, the module is represented by its cluster node,
+    to which all imports from the module are redirected.
+
+    Parameters
+    ----------
+    location
+        fully qualified name of the module
+    text
+        module source code
+    mode
+        ``names`` or ``fold``
+    """
+    lines = text.splitlines()
+    if mode == 'fold':
+        doc = f'{location} - folded module of {len(lines)} lines'
+        return [GraphNode(cluster_invis_node, set(), NodeType.module, '1', doc, set())]
+
+    nodes = {}
+    for lineno, line in enumerate(lines, 1):
+        if not line or line[0] in ' \t#)]}\'"':
+            continue
+        match = definition_pattern.match(line)
+        if match:
+            type_ = NodeType.class_ if line.startswith('class') else NodeType.func
+        else:
+            match = assignment_pattern.match(line)
+            type_ = NodeType.var
+        if not match:
+            continue
+        name = match.group(1)
+        if name in nodes:
+            nodes[name].lineno_str += f',{lineno}'
+        else:
+            nodes[name] = GraphNode(name, set(), type_, str(lineno), None, set())
+    return list(nodes.values())
+
+
+def folded_module(graph: nx.DiGraph, name: str) -> Optional[str]:
+    """Find the folded module that contains a name, or return None."""
+    parts = name.split('.')
+    for i in range(1, len(parts) + 1):
+        module = '.'.join(parts[:i])
+        data = graph.nodes.get(module + '.' + cluster_invis_node)
+        if data and data.get('type') == NodeType.module.value:
+            return module
+    return None
+
+
 class MiscColor(Enum):
     """Colors for miscellaneous attributes."""
 
@@ -124,6 +191,8 @@ type_shape = {
     NodeType.import_: 'note',
     NodeType.unknown: 'ellipse',
     NodeType.multiple: 'ellipse',
+    NodeType.cycle: 'component',
+    NodeType.module: 'tab',
 }
 centrality_color = {
     0.997: '#FF3030',
@@ -146,6 +215,8 @@ def create_legend() -> gv.Source:
             ('import', NodeType.import_),
             ('unknown', NodeType.unknown),
             ('multiple', NodeType.multiple),
+            ('cycle', NodeType.cycle),
+            ('folded module', NodeType.module),
         ]
         for name, t in types:
             s.node(f'{name} ({t.value})', shape=type_shape[t])
@@ -221,58 +292,110 @@ def gen_cluster_nodes(graph: nx.DiGraph, levels: str) -> None:
             graph.add_node(node, shape='point', style='invis')
 
 
-def create_graph(
-    sources: List[Tuple[Source, List[Line]]],
-    skip_external: bool = False,
-    imports: str = 'interface',
-    exclude: List[str] = None,
-    root: str = None,
-    collapse_waypoints: bool = False,
-    collapse_exclude: List[str] = None,
-    graph_attrs: Dict[str, str] = None,
-    node_attrs: Dict[str, str] = None,
-    edge_attrs: Dict[str, str] = None,
-) -> gv.Digraph:
-    """Create and populate a graph from references."""
-    exclude = set(exclude or [])
-    collapse_exclude = set(collapse_exclude or [])
-    graph_attrs = graph_attrs or {}
-    node_attrs = node_attrs or {}
-    edge_attrs = edge_attrs or {}
-    graph_attrs.update({
-        'compound': 'true',
-        'newrank': 'true',
-        'mclimit': '10.0',
-        'searchsize': '300',
-    })
+meta_attrs = {'type', 'lineno', 'kind'}
 
-    graph = nx.DiGraph()
-    prefix_nodes = {
-        s.name + '.': merge_nodes(s.name, s.file, ln) for s, ln in sources
-    }
+
+def gv_attrs(data: Dict[str, str]) -> Dict[str, str]:
+    """Filter Pyfactor metadata out of Graphviz attributes."""
+    return {k: v for k, v in data.items() if k not in meta_attrs}
+
+
+def condense_cycles(graph: nx.DiGraph) -> List[List[str]]:
+    """
+    Collapse strongly connected components to single nodes.
+
+    Each component of more than one node is replaced with a node
+    in the innermost module that contains all of its members.
+    Edges to and from members are redirected to the new node.
+    Returns the sorted members of each component.
+    """
+    components = nx.strongly_connected_components(graph)
+    cycles = sorted(sorted(c) for c in components if len(c) > 1)
+    for i, members in enumerate(cycles):
+        locations = [m.split('.')[:-1] for m in members]
+        location = []
+        for parts in zip(*locations):
+            if any(p != parts[0] for p in parts):
+                break
+            location.append(parts[0])
+        name = '.'.join(location + [f'cycle-{i}'])
+        prefix = len('.'.join(location)) + 1 if location else 0
+        lines = '\\n'.join(m[prefix:] for m in members)
+        graph.add_node(
+            name,
+            label=f'cycle-{i}\\n{NodeType.cycle.value}:{lines}',
+            shape=type_shape[NodeType.cycle],
+            style='filled',
+            tooltip=', '.join(members),
+            type=NodeType.cycle.value,
+            lineno='',
+        )
+
+        member_set = set(members)
+        for u, v, data in list(graph.in_edges(members, data=True)):
+            if u not in member_set and not graph.has_edge(u, name):
+                graph.add_edge(u, name, **data)
+        for u, v, data in list(graph.out_edges(members, data=True)):
+            if v not in member_set and not graph.has_edge(name, v):
+                graph.add_edge(name, v, **data)
+        graph.remove_nodes_from(members)
+    return cycles
+
+
+def cycle_summary(cycles: List[List[str]]) -> str:
+    """Summarise cycle members in text."""
+    lines = [f'Found {len(cycles)} dependency cycles']
+    for i, members in enumerate(cycles):
+        lines.append(f'cycle-{i} ({len(members)} names): ' + ', '.join(members))
+    return '\n'.join(lines)
+
+
+def add_references(
+    graph: nx.DiGraph,
+    prefix_nodes: Dict[str, List[GraphNode]],
+    node_attrs: Dict[str, str],
+    edge_attrs: Dict[str, str],
+    docstrings: bool = True,
+) -> None:
+    """Add definitions and references between them, optionally with docstrings."""
     for prefix, nodes in prefix_nodes.items():
         for node in nodes:
-            name = node.name.center(12, ' ')
-            doc = node.docstring or f'{node.name} - no docstring'
-            doc = dedent(doc).replace('\n', '\\n')
+            if node.name == cluster_invis_node:
+                name = prefix[:-1].split('.')[-1].center(12, ' ')
+            else:
+                name = node.name.center(12, ' ')
             attrs = {
                 'label': f'{name}\\n{node.type.value}:{node.lineno_str}',
                 'shape': type_shape[node.type],
                 'style': 'filled',
-                'tooltip': doc,
+                'type': node.type.value,
+                'lineno': node.lineno_str,
             }
+            if docstrings:
+                doc = node.docstring or f'{node.name} - no docstring'
+                attrs['tooltip'] = dedent(doc).replace('\n', '\\n')
             n_attrs = node_attrs.copy()
             n_attrs.update(attrs)
             graph.add_node(prefix + node.name, **n_attrs)
             graph.add_edges_from([
                 (prefix + node.name, prefix + d) for d in node.deps
-            ], **edge_attrs)
+            ], **edge_attrs, kind='reference')
         gen_cluster_nodes(graph, prefix[:-1])
 
+
+def add_imports(
+    graph: nx.DiGraph,
+    prefix_nodes: Dict[str, List[GraphNode]],
+    edge_attrs: Dict[str, str],
+) -> None:
+    """Add import edges to modules and imported names."""
     import_sources = set()
     for _, nodes in prefix_nodes.items():
         for node in nodes:
             import_sources.update(node.import_sources)
+    folded = {s: folded_module(graph, s) for s in import_sources}
+    folded = {s: m for s, m in folded.items() if m is not None}
+    import_sources = {folded.get(s, s) for s in import_sources}
     for source in import_sources:
         if '.' in source:
             source = '.'.join(source.split('.')[:-1])
@@ -283,8 +406,10 @@ def create_graph(
             if not node.import_sources:
                 continue
             for s in node.import_sources:
+                s = folded.get(s, s)
                 e_attrs = edge_attrs.copy()
                 e_attrs['style'] = 'dashed'
+                e_attrs['kind'] = 'import'
                 if graph.has_node(s + '.' + cluster_invis_node):
                     e_attrs.update({'lhead': 'cluster_' + s})
                     graph.add_edge(
@@ -294,31 +419,79 @@ def create_graph(
 
                 if not graph.has_node(s):
                     graph.add_node(
-                        s, label=s.split('.')[-1], shape=type_shape[NodeType.import_]
+                        s,
+                        label=s.split('.')[-1],
+                        shape=type_shape[NodeType.import_],
+                        type=NodeType.import_.value,
+                        lineno='',
                     )
                 graph.add_edge(prefix + node.name, s, **e_attrs)
 
+
+def resolve_external(
+    graph: nx.DiGraph,
+    resolve: Callable[[str], Optional[Tuple[str, str, int]]],
+    node_attrs: Dict[str, str],
+) -> None:
+    """
+    Move external import targets to the definitions they refer to.
+
+    Import nodes without dependencies are looked up with ``resolve``,
+    which returns the name, type and line number of a definition.
+    Found nodes are renamed to the definition in its module.
+    """
+    mapping = {}
+    for node, data in graph.nodes.items():
+        if data.get('type') != NodeType.import_.value or graph.out_degree(node):
+            continue
+        found = resolve(node)
+        if found is None:
+            continue
+        name, type_, lineno = found
+        attrs = node_attrs.copy()
+        attrs.update({
+            'label': f'{name.split(".")[-1].center(12, " ")}\\n{type_}:{lineno}',
+            'shape': type_shape[NodeType(type_)],
+            'style': 'filled',
+            'tooltip': f'{name} - external definition',
+            'type': type_,
+            'lineno': str(lineno),
+        })
+        data.update(attrs)
+        mapping[node] = name
+
+    nx.relabel_nodes(graph, mapping, copy=False)
+    for name in sorted(set(mapping.values())):
+        gen_cluster_nodes(graph, '.'.join(name.split('.')[:-1]))
+
+
+def exclude_nodes(graph: nx.DiGraph, exclude: Set[str]) -> None:
+    """Remove excluded nodes."""
     for name in exclude:
         resolved = guess_node(graph, name)
         if resolved:
             graph.remove_node(resolved)
 
-    if skip_external:
-        internal = {p.split('.')[0] for p in prefix_nodes.keys()}
-        removed = set()
-        for node, data in graph.nodes.items():
-            if not data['shape'] == type_shape[NodeType.import_]:
-                continue
-            if all(v.split('.')[0] not in internal for _, v in graph.out_edges(node)):
-                removed.add(node)
-        graph.remove_nodes_from(removed)
 
-        removed = set()
-        for node in graph.nodes:
-            if node.split('.')[0] not in internal:
-                removed.add(node)
-        graph.remove_nodes_from(removed)
+def skip_external_nodes(graph: nx.DiGraph, internal: Set[str]) -> None:
+    """Remove imports to and nodes in external modules."""
+    removed = set()
+    for node, data in graph.nodes.items():
+        if not data['shape'] == type_shape[NodeType.import_]:
+            continue
+        if all(v.split('.')[0] not in internal for _, v in graph.out_edges(node)):
+            removed.add(node)
+    graph.remove_nodes_from(removed)
 
+    removed = set()
+    for node in graph.nodes:
+        if node.split('.')[0] not in internal:
+            removed.add(node)
+    graph.remove_nodes_from(removed)
+
+
+def resolve_imports(graph: nx.DiGraph, imports: str) -> None:
+    """Duplicate or resolve import nodes."""
     if imports == 'duplicate':
         pass
     elif imports in ('resolve', 'interface'):
@@ -348,6 +521,9 @@ def create_graph(
     else:
         raise ArgumentError(f'Pyfactor: invalid imports mode `{imports}`!')
 
+
+def color_connectivity(graph: nx.DiGraph) -> Dict[str, Tuple[int, int]]:
+    """Color nodes by connectivity and centrality, return in and out degrees."""
     conn = {}
     for node in graph.nodes:
         in_deg = len([0 for u, v in graph.in_edges(node) if u != node])
@@ -375,7 +551,11 @@ def create_graph(
             if central > level:
                 append_color(graph.nodes[node], color)
                 break
+    return conn
+
 
+def color_bridges(graph: nx.DiGraph) -> None:
+    """Color bridge edges."""
     undirected = graph.to_undirected()
     bridge = MiscColor.bridge.value
     for from_, to in nx.bridges(undirected):
@@ -383,6 +563,14 @@ def create_graph(
             from_, to = to, from_
         graph.edges[from_, to]['color'] = bridge
 
+
+def mark_waypoints(
+    graph: nx.DiGraph,
+    conn: Dict[str, Tuple[int, int]],
+    collapse_waypoints: bool,
+    collapse_exclude: Set[str],
+) -> None:
+    """Color waypoint nodes and optionally collapse their children."""
     i = -1
     graph_nodes = list(graph.nodes)
     removed_nodes = set()
@@ -413,34 +601,188 @@ def create_graph(
                         removed_nodes = removed_nodes | comp
                         graph.remove_nodes_from(comp)
 
+
+def select_root(graph: nx.DiGraph, root: str) -> None:
+    """Remove nodes that are not root or its descendants."""
+    root_ref = guess_node(graph, root)
+    if root_ref:
+        done = set()
+        potential = {root_ref}
+        while potential:
+            n = potential.pop()
+            done.add(n)
+            succ = graph.successors(n)
+            potential.update({s for s in succ if s not in done})
+        graph.remove_nodes_from([n for n in graph.nodes if n not in done])
+
+
+def build_graph(
+    sources: List[Tuple[Source, List[Line]]],
+    skip_external: bool = False,
+    imports: str = 'interface',
+    exclude: List[str] = None,
+    root: str = None,
+    collapse_waypoints: bool = False,
+    collapse_exclude: List[str] = None,
+    condense: bool = False,
+    node_attrs: Dict[str, str] = None,
+    edge_attrs: Dict[str, str] = None,
+    hooks: List[Hooks] = None,
+    nodes: Dict[str, List[GraphNode]] = None,
+    resolve_external_name: Callable[[str], Optional[Tuple[str, str, int]]] = None,
+    docstrings: bool = True,
+) -> nx.DiGraph:
+    """
+    Create and populate a NetworkX graph from references.
+
+    In addition to Graphviz attributes, nodes have :data:`meta_attrs`
+    ``type`` and ``lineno`` and edges have ``kind``.
+    Each pass is run as a stage of the given hooks.
+    Already merged ``nodes`` of modules, keyed by module name,
+    are added to the nodes merged from ``sources``.
+    External import targets are moved to their definitions
+    with ``resolve_external_name``, see :func:`resolve_external`.
+    Docstrings are added as tooltips if ``docstrings`` is set.
+    """
+    exclude = set(exclude or [])
+    collapse_exclude = set(collapse_exclude or [])
+    node_attrs = node_attrs or {}
+    edge_attrs = edge_attrs or {}
+
+    graph = nx.DiGraph()
+    prefix_nodes = {}
+    if sources:
+        with stage(hooks, 'merge_nodes'):
+            prefix_nodes = {
+                s.name + '.': merge_nodes(s.name, s.file, ln) for s, ln in sources
+            }
+    for module, module_nodes in (nodes or {}).items():
+        prefix_nodes[module + '.'] = module_nodes
+    with stage(hooks, 'add_references', graph):
+        add_references(graph, prefix_nodes, node_attrs, edge_attrs, docstrings)
+    with stage(hooks, 'add_imports', graph):
+        add_imports(graph, prefix_nodes, edge_attrs)
+    if resolve_external_name is not None:
+        with stage(hooks, 'resolve_external', graph):
+            resolve_external(graph, resolve_external_name, node_attrs)
+    with stage(hooks, 'exclude', graph):
+        exclude_nodes(graph, exclude)
+
+    if skip_external:
+        internal = {p.split('.')[0] for p in prefix_nodes.keys()}
+        with stage(hooks, 'skip_external', graph):
+            skip_external_nodes(graph, internal)
+
+    with stage(hooks, 'resolve_imports', graph):
+        resolve_imports(graph, imports)
+
+    if condense:
+        with stage(hooks, 'condense_cycles', graph):
+            cycles = condense_cycles(graph)
+        log.info(cycle_summary(cycles))
+
+    with stage(hooks, 'color_connectivity', graph):
+        conn = color_connectivity(graph)
+    with stage(hooks, 'color_bridges', graph):
+        color_bridges(graph)
+    with stage(hooks, 'mark_waypoints', graph):
+        mark_waypoints(graph, conn, collapse_waypoints, collapse_exclude)
+
     if root:
-        root_ref = guess_node(graph, root)
-        if root_ref:
-            done = set()
-            potential = {root_ref}
-            while potential:
-                n = potential.pop()
-                done.add(n)
-                succ = graph.successors(n)
-                potential.update({s for s in succ if s not in done})
-            graph = graph.subgraph(done)
-
-    # Construct module hierarchy
-    hierarchy = Level({}, {})
-    for node, data in graph.nodes.items():
-        parts = node.split('.')
-        tmp = hierarchy
-        for part in parts[:-1]:
-            if part not in tmp.sub:
-                tmp.sub[part] = Level({}, {})
-            tmp = tmp.sub[part]
-        tmp.names[parts[-1]] = data
+        with stage(hooks, 'select_root', graph):
+            select_root(graph, root)
+    return graph
+
+
+def create_graph(
+    sources: List[Tuple[Source, List[Line]]],
+    skip_external: bool = False,
+    imports: str = 'interface',
+    exclude: List[str] = None,
+    root: str = None,
+    collapse_waypoints: bool = False,
+    collapse_exclude: List[str] = None,
+    condense: bool = False,
+    graph_attrs: Dict[str, str] = None,
+    node_attrs: Dict[str, str] = None,
+    edge_attrs: Dict[str, str] = None,
+    engine: str = None,
+    hooks: List[Hooks] = None,
+) -> gv.Digraph:
+    """Create and populate a graph from references."""
+    graph = build_graph(
+        sources,
+        skip_external=skip_external,
+        imports=imports,
+        exclude=exclude,
+        root=root,
+        collapse_waypoints=collapse_waypoints,
+        collapse_exclude=collapse_exclude,
+        condense=condense,
+        node_attrs=node_attrs,
+        edge_attrs=edge_attrs,
+        hooks=hooks,
+    )
+    with stage(hooks, 'to_gv', graph):
+        return to_gv(graph, graph_attrs, engine)
+
+
+def to_gv(
+    graph: nx.DiGraph,
+    graph_attrs: Dict[str, str] = None,
+    engine: str = None,
+    positions: Dict = None,
+    compact: bool = False,
+    tooltips: bool = True,
+) -> gv.Digraph:
+    """
+    Convert a built graph to a Graphviz graph with a module hierarchy.
+
+    Layout engine and effort are chosen by graph size with :func:`layout_policy`
+    unless given in graph attributes.
+    Nodes are placed at stored positions with :func:`pinned_layout`.
+    A compact graph identifies nodes with :func:`compact_ids`,
+    declares common attributes as defaults and leaves out Graphviz defaults.
+    Edges with the same attributes are grouped with their attributes as defaults.
+    Node tooltips are left out unless ``tooltips`` is set.
+    """
+    policy = layout_policy(graph.number_of_nodes(), graph.number_of_edges(), engine)
+    graph_attrs = {**policy, **(graph_attrs or {})}
+    graph_attrs.update({'compound': 'true', 'newrank': 'true'})
+
+    hierarchy = module_hierarchy(graph, tooltips)
+    clusters = {}
+    if positions is not None:
+        pins, clusters, pin_attrs = pinned_layout(list(graph.nodes), positions)
+        graph_attrs.update(pin_attrs)
+        for node, attrs in pins.items():
+            *path, name = node.split('.')
+            level = hierarchy
+            for part in path:
+                level = level.sub[part]
+            level.names[name].update(attrs)
 
     gv_graph = gv.Digraph()
     gv_graph.attr(**graph_attrs)
-    make_subgraphs(gv_graph, hierarchy, [])
+    if not compact:
+        make_subgraphs(gv_graph, hierarchy, [], clusters)
+        for from_, to, data in graph.edges.data():
+            gv_graph.edge(from_, to, **gv_attrs(data))
+        return gv_graph
+
+    ids = compact_ids(graph)
+    make_subgraphs(gv_graph, hierarchy, [], clusters, ids)
+    groups: Dict[Tuple, List[Tuple[str, str]]] = {}
     for from_, to, data in graph.edges.data():
-        gv_graph.edge(from_, to, **data)
+        attrs = compact_attrs(gv_attrs(data), {}, graphviz_defaults['edge'])
+        groups.setdefault(tuple(sorted(attrs.items())), []).append((ids[from_], ids[to]))
+    for attrs, edges in groups.items():
+        if not attrs:
+            gv_graph.edges(edges)
+            continue
+        with gv_graph.subgraph() as subgraph:
+            subgraph.attr('edge', **dict(attrs))
+            subgraph.edges(edges)
     return gv_graph
 
 
@@ -452,12 +794,39 @@ class Level:
     names: Dict[str, Dict]
 
 
+def module_hierarchy(graph: nx.DiGraph, tooltips: bool = True) -> Level:
+    """Construct module hierarchy of nodes with their Graphviz attributes."""
+    hierarchy = Level({}, {})
+    for node, data in graph.nodes.items():
+        parts = node.split('.')
+        tmp = hierarchy
+        for part in parts[:-1]:
+            if part not in tmp.sub:
+                tmp.sub[part] = Level({}, {})
+            tmp = tmp.sub[part]
+        tmp.names[parts[-1]] = gv_attrs(data)
+        if not tooltips:
+            tmp.names[parts[-1]].pop('tooltip', None)
+    return hierarchy
+
+
 def make_subgraphs(
-    graph: gv.Digraph, hierarchy: Level, location: List
+    graph: gv.Digraph,
+    hierarchy: Level,
+    location: List,
+    clusters: Dict[str, Dict] = None,
+    ids: Dict[str, str] = None,
 ) -> None:
-    """Recursively construct subgraph hierarchy."""
-    for name, data in hierarchy.names.items():
-        graph.node('.'.join(location + [name]), **data)
+    """
+    Recursively construct subgraph hierarchy with optional cluster attributes.
+
+    If node identifiers are given, nodes are written compactly with them
+    and the most common attributes of each level are declared as defaults.
+    Sublevels are then written before the defaults so that they do not inherit them.
+    """
+    if ids is None:
+        for name, data in hierarchy.names.items():
+            graph.node('.'.join(location + [name]), **data)
 
     for name, sub in hierarchy.sub.items():
         new_loc = location + [name]
@@ -466,5 +835,77 @@ def make_subgraphs(
         attrs = {
             'label': loc_str.center(12, ' '), 'fontsize': '22.0', 'penwidth': '2.5'
         }
+        attrs.update((clusters or {}).get(name, {}))
         with graph.subgraph(name=name, graph_attr=attrs) as subgraph:
-            make_subgraphs(subgraph, sub, new_loc)
+            make_subgraphs(subgraph, sub, new_loc, clusters, ids)
+
+    if ids is not None:
+        defaults = level_defaults(hierarchy.names)
+        if defaults:
+            graph.attr('node', **defaults)
+        for name, data in hierarchy.names.items():
+            attrs = compact_attrs(data, defaults, graphviz_defaults['node'])
+            graph.node(ids['.'.join(location + [name])], **attrs)
+
+
+# Default values of attributes set by Pyfactor, see graphviz.org/doc/info/attrs
+graphviz_defaults = {
+    'node': {
+        'shape': 'ellipse',
+        'style': '',
+        'color': 'black',
+        'fillcolor': 'lightgrey',
+        'gradientangle': '0',
+        'penwidth': '1.0',
+        'fontsize': '14.0',
+        'fontcolor': 'black',
+    },
+    'edge': {
+        'style': '',
+        'color': 'black',
+        'penwidth': '1.0',
+        'arrowhead': 'normal',
+        'arrowsize': '1.0',
+    },
+}
+
+
+def node_docs(graph: nx.DiGraph) -> Dict[str, str]:
+    """Collect docstring tooltips of nodes, unescaping line breaks."""
+    return {
+        node: data['tooltip'].replace('\\n', '\n')
+        for node, data in graph.nodes.items() if 'tooltip' in data
+    }
+
+
+def compact_ids(graph: nx.DiGraph) -> Dict[str, str]:
+    """Assign short numeric identifiers to nodes."""
+    return {node: str(i) for i, node in enumerate(graph.nodes)}
+
+
+def level_defaults(names: Dict[str, Dict]) -> Dict[str, str]:
+    """Choose the most common value of attributes shared by nodes of a level."""
+    known = graphviz_defaults['node']
+    counts = Counter(
+        (k, v) for data in names.values() for k, v in data.items() if k in known
+    )
+    defaults = {}
+    for (k, v), count in counts.most_common():
+        if k not in defaults and count > 1 and v != known[k]:
+            defaults[k] = v
+    return defaults
+
+
+def compact_attrs(
+    data: Dict[str, str], defaults: Dict[str, str], graphviz: Dict[str, str]
+) -> Dict[str, str]:
+    """
+    Remove attributes of an element that equal the defaults in effect.
+
+    Attributes missing from the element are reset to Graphviz defaults,
+    except for invisible elements.
+    """
+    attrs = {k: v for k, v in data.items() if defaults.get(k, graphviz.get(k)) != v}
+    if data.get('style') != 'invis':
+        attrs.update({k: graphviz[k] for k in defaults if k not in data})
+    return attrs
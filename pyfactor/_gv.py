@@ -1,6 +1,145 @@
+import re
+import json
+import logging
+import subprocess
+
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
 import graphviz as gv
 
+from ._hooks import Hooks, stage
+
+log = logging.getLogger(__name__)
+
+# Largest node and edge counts of each tier and the layout settings used,
+# larger graphs than in any tier are laid out with the final settings
+layout_tiers = [
+    (500, 1000, {'mclimit': '10.0', 'searchsize': '300'}),
+    (3000, 8000, {'mclimit': '1.0', 'nslimit': '5.0', 'searchsize': '100'}),
+    (15000, 40000, {
+        'mclimit': '0.1', 'nslimit': '1.0', 'searchsize': '30', 'splines': 'line'
+    }),
+]
+huge_layout = {'layout': 'sfdp', 'splines': 'line'}
+# Settings applied in turn when rendering exceeds its time limit
+fallback_layouts = [
+    {'mclimit': '0.1', 'nslimit': '1.0', 'nslimit1': '1.0', 'searchsize': '30',
+     'splines': 'line'},
+    {'layout': 'sfdp', 'splines': 'line'},
+]
+# Settings that only affect the dot engine
+dot_settings = {'mclimit', 'nslimit', 'nslimit1', 'searchsize'}
+
+
+def layout_policy(nodes: int, edges: int, engine: str = None) -> Dict[str, str]:
+    """
+    Choose layout engine and effort by graph size.
+
+    Crossing minimisation and network simplex effort is reduced for
+    larger graphs, and the largest graphs are laid out with ``sfdp``.
+    The engine is set with the ``layout`` graph attribute
+    if it is not the default ``dot``.
+
+    Parameters
+    ----------
+    nodes
+        number of nodes in the graph
+    edges
+        number of edges in the graph
+    engine
+        Graphviz layout engine to use regardless of size
+    """
+    for max_nodes, max_edges, settings in layout_tiers:
+        if nodes <= max_nodes and edges <= max_edges:
+            settings = settings.copy()
+            break
+    else:
+        settings = huge_layout.copy()
+    if engine is not None:
+        settings['layout'] = engine
+    if settings.get('layout') == 'dot':
+        del settings['layout']
+    chosen = ' '.join(f'{k}={v}' for k, v in settings.items())
+    log.info(f'layout for {nodes} nodes and {edges} edges: {chosen}')
+    return settings
+
+
+positions_version = 1
+
+
+def read_positions(path: str) -> Optional[Dict]:
+    """Read stored positions, or None if the file is missing, unreadable or outdated."""
+    try:
+        data = json.loads(Path(path).read_text(encoding='utf-8'))
+    except (FileNotFoundError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get('version') != positions_version:
+        return None
+    return data
+
+
+def write_positions(path: str, layout: str, names: Dict[str, str] = None) -> None:
+    """
+    Store positions of nodes and clusters from Graphviz JSON output.
+
+    Node positions are keyed by node name, mapped from node identifiers
+    with optional names, and clusters by their subgraph name
+    with their bounding box and label.
+    """
+    names = names or {}
+    data = {'version': positions_version, 'nodes': {}, 'clusters': {}}
+    for obj in json.loads(layout).get('objects', []):
+        if 'pos' in obj:
+            data['nodes'][names.get(obj['name'], obj['name'])] = obj['pos']
+        elif 'bb' in obj and obj['name'].startswith('cluster'):
+            data['clusters'][obj['name']] = {
+                k: obj[k] for k in ('bb', 'lp') if k in obj
+            }
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    Path(path).write_text(json.dumps(data), encoding='utf-8')
+
+
+def pinned_layout(
+    nodes: List[str], positions: Dict
+) -> Tuple[Dict[str, Dict], Dict[str, Dict], Dict[str, str]]:
+    """
+    Pin nodes to stored positions.
+
+    If all nodes have a stored position, the previous layout is reused
+    with the ``nop`` engine, only routing edges again.
+    Otherwise the graph is laid out normally, because pinning only some nodes
+    would require an engine that ignores the ranks and clusters of ``dot``.
+
+    Parameters
+    ----------
+    nodes
+        names of nodes in the graph
+    positions
+        stored positions, see :func:`read_positions`
+
+    Returns
+    -------
+    tuple
+        node attributes, cluster attributes and graph attributes
+    """
+    stored = positions['nodes']
+    new = [n for n in nodes if n not in stored]
+    if new:
+        log.info(f'{len(new)} of {len(nodes)} nodes are new, laying out again')
+        return {}, {}, {}
+    log.info(f'reusing positions of all {len(nodes)} nodes')
+    node_attrs = {n: {'pos': stored[n]} for n in nodes}
+    return node_attrs, positions['clusters'], {'layout': 'nop'}
+
+
+def with_graph_attrs(source: str, attrs: Dict[str, str]) -> str:
+    """Override graph attributes of DOT source by appending them to the graph."""
+    end = source.rindex('}')
+    line = ' '.join(f'{k}="{v}"' for k, v in attrs.items())
+    return f'{source[:end]}\tgraph [{line}]\n{source[end:]}'
+
 
 def preprocess(
     source: gv.Source,
@@ -25,6 +164,102 @@ def preprocess(
     return source.unflatten(stagger=stagger, fanout=fanout, chain=chain)
 
 
+def render_command(
+    out_path: Optional[str],
+    format: str,
+    engine: str = None,
+    renderer: str = None,
+    formatter: str = None,
+) -> List[str]:
+    """
+    Create a Graphviz command that reads DOT from stdin and writes a file.
+
+    If no file is given, the output is written to stdout instead.
+    """
+    spec = ':'.join([format] + [f for f in (renderer, formatter) if f])
+    command = ['dot', f'-K{engine or "dot"}', f'-T{spec}']
+    if out_path is not None:
+        command += ['-o', str(out_path)]
+    return command
+
+
+def run_graphviz(command: List[str], source: str, timeout: float = None) -> bytes:
+    """
+    Run a Graphviz command with DOT source as input and return its output.
+
+    If a timeout in seconds is given, the command is killed when exceeding it
+    and :class:`subprocess.TimeoutExpired` is raised.
+    Warnings of Graphviz are logged, and its error message is raised
+    as :class:`RuntimeError` if the command fails.
+    """
+    try:
+        result = subprocess.run(
+            command,
+            input=source.encode(),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            check=True,
+            timeout=timeout,
+        )
+    except FileNotFoundError as e:
+        raise gv.ExecutableNotFound(command) from e
+    except subprocess.CalledProcessError as e:
+        msg = e.stderr.decode(errors='replace').strip()
+        raise RuntimeError(f'Pyfactor: `{" ".join(command)}` failed! {msg}') from e
+    for line in result.stderr.decode(errors='replace').splitlines():
+        log.warning(line)
+    return result.stdout
+
+
+def has_setting(source: str, name: str, value: str) -> bool:
+    """Check if DOT source sets an attribute to a value."""
+    pattern = rf'\b{re.escape(name)}="?{re.escape(value)}"?(?![\w.])'
+    return re.search(pattern, source) is not None
+
+
+def fallback_attempts(command: List[str], source: str) -> List[Dict[str, str]]:
+    """
+    Choose the settings of :data:`fallback_layouts` that change a render.
+
+    Settings already used by the command and source are skipped,
+    as are settings of the dot engine when another engine is used.
+    """
+    layouts = re.findall(r'\blayout="?(\w+)', source)
+    engines = [c[2:] for c in command if c.startswith('-K')]
+    current = layouts[-1] if layouts else (engines[-1] if engines else 'dot')
+    attempts = []
+    for attrs in fallback_layouts:
+        layout = attrs.get('layout', current)
+        changed = [
+            k for k, v in attrs.items()
+            if not (k in dot_settings and layout != 'dot')
+            and not (k == 'layout' and v == current)
+            and not has_setting(source, k, v)
+        ]
+        if changed:
+            attempts.append(attrs)
+    return attempts
+
+
+def run_with_fallback(command: List[str], source: str, timeout: float = None) -> bytes:
+    """
+    Run a Graphviz command, retrying with cheaper settings when exceeding a timeout.
+
+    The settings of :func:`fallback_attempts` are tried in turn,
+    the last of which is not limited in time.
+    """
+    fallbacks = fallback_attempts(command, source) if timeout is not None else []
+    attempts = [{}] + fallbacks
+    for i, attrs in enumerate(attempts):
+        text = with_graph_attrs(source, attrs) if attrs else source
+        limit = timeout if i < len(attempts) - 1 else None
+        try:
+            return run_graphviz(command, text, limit)
+        except subprocess.TimeoutExpired:
+            retry = ' '.join(f'{k}={v}' for k, v in attempts[i + 1].items())
+            log.warning(f'rendering exceeded {timeout} seconds, retrying with {retry}')
+
+
 def render(
     source: gv.Source,
     out_path: str,
@@ -33,18 +268,31 @@ def render(
     renderer: str = None,
     formatter: str = None,
     view: bool = False,
+    timeout: float = None,
+    positions: str = None,
+    names: Dict[str, str] = None,
+    hooks: List[Hooks] = None,
 ) -> None:
     """
     Render source with Graphviz.
 
+    Graphviz writes the image files directly,
+    so images are never held in memory.
+    Multiple comma-separated formats are rendered from a single layout:
+    the graph is laid out once to DOT with positions,
+    and each format is then rendered concurrently without a new layout.
+    When rendering exceeds the timeout, Graphviz is stopped
+    and rendering is tried again with the settings of :func:`fallback_attempts`
+    in turn, the last of which is not limited in time.
+
     Parameters
     ----------
     source
         Graphviz source to render
     out_path
-        path to visualisation file to write
+        path to visualisation file to write, suffixed with each format
     format
-        Graphviz render file format
+        Graphviz render file format or comma-separated formats
     engine
         Graphviz layout engine
     renderer
@@ -53,16 +301,48 @@ def render(
         Graphviz output formatter
     view
         after rendering, display with the default application
+    timeout
+        time limit of layout in seconds before trying cheaper settings
+    positions
+        path to write node positions of the layout to, see :func:`pinned_layout`
+    names
+        node names by their identifiers in the source for storing positions
+    hooks
+        hooks to call
     """
-    image_bytes = gv.pipe(
-        engine or source.engine,
-        format,
-        str(source).encode(),
-        renderer=renderer,
-        formatter=formatter,
-    )
-    out_path = Path(out_path).with_suffix('.' + format)
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    out_path.write_bytes(image_bytes)
+    start = perf_counter()
+    engine = engine or source.engine
+    formats = format.split(',')
+    out_paths = [Path(out_path).with_suffix('.' + f) for f in formats]
+    out_paths[0].parent.mkdir(parents=True, exist_ok=True)
+    store = []
+    if positions is not None:
+        layout = Path(positions).with_name(Path(positions).name + '.layout')
+        layout.parent.mkdir(parents=True, exist_ok=True)
+        store = ['-Tjson', '-o', str(layout)]
+    with stage(hooks, 'render'):
+        if len(formats) == 1:
+            command = render_command(out_paths[0], format, engine, renderer, formatter)
+            run_with_fallback(command + store, str(source), timeout)
+        else:
+            command = render_command(None, 'dot', engine) + store
+            positioned = run_with_fallback(command, str(source), timeout).decode()
+            positioned = with_graph_attrs(positioned, {'layout': 'neato'})
+            commands = [
+                render_command(out, f, 'neato', renderer, formatter) + ['-n2']
+                for out, f in zip(out_paths, formats)
+            ]
+            with ThreadPoolExecutor(max_workers=len(commands)) as executor:
+                futures = [
+                    executor.submit(run_graphviz, c, positioned) for c in commands
+                ]
+                for future in futures:
+                    future.result()
+    if positions is not None:
+        write_positions(positions, layout.read_text(encoding='utf-8'), names)
+        layout.unlink()
+    for hook in hooks or []:
+        for out in out_paths:
+            hook.on_render_done(str(out), perf_counter() - start)
     if view:
-        gv.view(str(out_path))
+        gv.view(str(out_paths[0]))
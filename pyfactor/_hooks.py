@@ -0,0 +1,66 @@
+import networkx as nx
+
+from contextlib import contextmanager
+from time import perf_counter
+from typing import List, Optional
+
+from ._io import Source
+
+
+class Hooks:
+    """
+    Callbacks for observing Pyfactor runs.
+
+    Subclass and override the callbacks of interest.
+    All callbacks do nothing by default.
+    Stages are named after the functions that perform them,
+    e.g. ``parse_lines``, ``resolve_imports`` or ``render``.
+    """
+
+    def on_source_resolved(self, source: Source) -> None:
+        """Source file was found."""
+
+    def on_file_parsed(self, source: Source, seconds: float, names: int) -> None:
+        """Source file was parsed, producing a number of names."""
+
+    def on_stage_start(self, name: str) -> None:
+        """Stage is about to start."""
+
+    def on_stage_end(
+        self, name: str, seconds: float, graph: Optional[nx.DiGraph]
+    ) -> None:
+        """Stage ended, optionally providing the graph it operated on."""
+
+    def on_render_done(self, path: str, seconds: float) -> None:
+        """Image file was rendered."""
+
+
+@contextmanager
+def stage(hooks: Optional[List[Hooks]], name: str, graph: nx.DiGraph = None):
+    """
+    Run a stage in a context, calling stage hooks if any are given.
+
+    Stage end hooks are called even if the stage raises an exception.
+
+    Parameters
+    ----------
+    hooks
+        hooks to call
+    name
+        name of the stage
+    graph
+        NetworkX graph that the stage operates on
+    """
+    if not hooks:
+        yield
+        return
+
+    for hook in hooks:
+        hook.on_stage_start(name)
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        seconds = perf_counter() - start
+        for hook in reversed(hooks):
+            hook.on_stage_end(name, seconds, graph)
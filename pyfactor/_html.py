@@ -0,0 +1,355 @@
+import json
+import math
+import html
+import networkx as nx
+import graphviz as gv
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from string import Template
+from time import perf_counter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from ._graph import (
+    Level, cluster_invis_node, gv_attrs, module_hierarchy, node_docs
+)
+from ._gv import preprocess, render_command, run_with_fallback
+from ._hooks import Hooks, stage
+
+root_fragment = '__root__'
+docs_script = '__docs__'
+cluster_prefix = 'cluster_'
+
+
+def walk_levels(
+    level: Level, location: List[str] = None
+) -> Iterator[Tuple[List[str], Level]]:
+    """Generate all levels of a hierarchy with their locations."""
+    location = location or []
+    yield location, level
+    for name, sub in level.sub.items():
+        yield from walk_levels(sub, location + [name])
+
+
+def level_size(level: Level) -> int:
+    """Count names in a level and its sublevels."""
+    names = sum(1 for n in level.names if n != cluster_invis_node)
+    return names + sum(level_size(sub) for sub in level.sub.values())
+
+
+def node_path(node: str) -> Tuple[List[str], bool]:
+    """Split node to its level parts, also returning whether it is a name."""
+    parts = node.split('.')
+    if parts[-1] == cluster_invis_node:
+        return parts[:-1], False
+    return parts, True
+
+
+def representative(parts: List[str], is_name: bool, depth: int) -> Optional[str]:
+    """Find the node that represents a node in a fragment of a given depth."""
+    if len(parts) <= depth:
+        return None
+    name = '.'.join(parts[:depth + 1])
+    if is_name and len(parts) == depth + 1:
+        return name
+    return cluster_prefix + name
+
+
+def fragment_edges(graph: nx.DiGraph) -> Dict[str, Dict[Tuple[str, str], List]]:
+    """
+    Aggregate edges between the nodes shown in each fragment.
+
+    Edges between sublevels are aggregated to a single edge with a count.
+    Edges between names keep their Graphviz attributes.
+    """
+    edges: Dict[str, Dict[Tuple[str, str], List]] = {}
+    for from_, to, data in graph.edges.data():
+        from_parts, from_name = node_path(from_)
+        to_parts, to_name = node_path(to)
+        for depth in range(min(len(from_parts), len(to_parts)) + 1):
+            if from_parts[:depth] != to_parts[:depth]:
+                break
+            u = representative(from_parts, from_name, depth)
+            v = representative(to_parts, to_name, depth)
+            if u is None or v is None or u == v:
+                continue
+            fragment = edges.setdefault('.'.join(from_parts[:depth]), {})
+            if (u, v) in fragment:
+                fragment[u, v][0] += 1
+            else:
+                fragment[u, v] = [1, gv_attrs(data)]
+    return edges
+
+
+def edge_attrs(u: str, v: str, count: int, attrs: Dict) -> Dict[str, str]:
+    """Graphviz attributes of a possibly aggregated edge."""
+    if not u.startswith(cluster_prefix) and not v.startswith(cluster_prefix):
+        return attrs
+    return {
+        'penwidth': str(round(1 + math.log2(count), 1)),
+        'tooltip': f'{count} dependencies',
+    }
+
+
+def cluster_fragments(
+    graph: nx.DiGraph, graph_attrs: Dict[str, str] = None
+) -> Dict[str, gv.Digraph]:
+    """
+    Create a Graphviz graph of the direct contents of each module level.
+
+    Sublevels are shown as single nodes linking to their own fragments.
+    The fragment of the top level is named :data:`root_fragment`.
+    Docstring tooltips are left out of the fragments.
+
+    Parameters
+    ----------
+    graph
+        built graph
+    graph_attrs
+        Graphviz graph attributes
+    """
+    hierarchy = module_hierarchy(graph)
+    edges = fragment_edges(graph)
+    fragments = {}
+    for location, level in walk_levels(hierarchy):
+        gv_graph = gv.Digraph()
+        gv_graph.attr(**(graph_attrs or {}))
+        for name, data in level.names.items():
+            if name == cluster_invis_node:
+                continue
+            attrs = {k: v for k, v in data.items() if k != 'tooltip'}
+            gv_graph.node('.'.join(location + [name]), **attrs)
+        for name, sub in level.sub.items():
+            loc_str = '.'.join(location + [name])
+            gv_graph.node(
+                cluster_prefix + loc_str,
+                label=f'{name}\\n{level_size(sub)} names',
+                shape='folder',
+                fontsize='22.0',
+                penwidth='2.5',
+                href='#' + loc_str,
+            )
+        loc_str = '.'.join(location)
+        for (u, v), (count, attrs) in edges.get(loc_str, {}).items():
+            gv_graph.edge(u, v, **edge_attrs(u, v, count, attrs))
+        fragments[loc_str or root_fragment] = gv_graph
+    return fragments
+
+
+def script(callback: str, *args) -> str:
+    """Create a script that passes JSON data to a page callback."""
+    return f'pyfactor.{callback}({", ".join(json.dumps(a) for a in args)});\n'
+
+
+page = Template('''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>$title</title>
+<style>
+body { margin: 0; font-family: sans-serif; }
+#path { padding: 8px; border-bottom: 1px solid #ccc; }
+#view { padding: 8px; }
+#view svg { max-width: 100%; height: auto; }
+#doc {
+  position: fixed; display: none; max-width: 40em; padding: 6px;
+  white-space: pre-wrap; font-family: monospace; font-size: 12px;
+  background: #ffe; border: 1px solid #999; pointer-events: none;
+}
+</style>
+</head>
+<body>
+<div id="path"></div>
+<div id="view"></div>
+<div id="doc"></div>
+<script>
+var pyfactor = (function () {
+  var files = $files;
+  var root = $root;
+  var docsScript = $docs;
+  var fragments = {};
+  var docs = null;
+  var shown = null;
+  var hovered = null;
+  var view = document.getElementById('view');
+  var path = document.getElementById('path');
+  var tip = document.getElementById('doc');
+
+  function load(src, failed) {
+    var element = document.createElement('script');
+    element.src = src;
+    element.onerror = failed;
+    document.head.appendChild(element);
+  }
+
+  function link(href, text) {
+    var a = document.createElement('a');
+    a.href = href;
+    a.textContent = text;
+    path.appendChild(a);
+  }
+
+  function show(name) {
+    shown = name;
+    path.innerHTML = '';
+    link('#', '(all)');
+    var parts = name ? name.split('.') : [];
+    for (var i = 0; i < parts.length; i++) {
+      path.appendChild(document.createTextNode(' / '));
+      link('#' + parts.slice(0, i + 1).join('.'), parts[i]);
+    }
+    if (fragments.hasOwnProperty(name)) {
+      view.innerHTML = fragments[name];
+      return;
+    }
+    view.textContent = 'Loading...';
+    load(files + '/' + (name || root) + '.js', function () {
+      view.textContent = 'No module level ' + name;
+    });
+  }
+
+  function fragment(name, svg) {
+    fragments[name] = svg;
+    if (name === shown) {
+      view.innerHTML = svg;
+    }
+  }
+
+  function update() {
+    var text = docs && hovered !== null ? docs[hovered] : null;
+    tip.textContent = text || '';
+    tip.style.display = text ? 'block' : 'none';
+  }
+
+  function receiveDocs(data) {
+    docs = data;
+    update();
+  }
+
+  view.addEventListener('mouseover', function (event) {
+    var node = event.target.closest('g.node');
+    hovered = node ? node.querySelector('title').textContent : null;
+    if (hovered !== null && docs === null) {
+      docs = {};
+      load(files + '/' + docsScript + '.js');
+    }
+    update();
+  });
+  view.addEventListener('mousemove', function (event) {
+    tip.style.left = (event.clientX + 12) + 'px';
+    tip.style.top = (event.clientY + 12) + 'px';
+  });
+  window.addEventListener('hashchange', function () {
+    show(decodeURIComponent(location.hash.slice(1)));
+  });
+  show(decodeURIComponent(location.hash.slice(1)));
+  return {fragment: fragment, docs: receiveDocs};
+})();
+</script>
+</body>
+</html>
+''')
+
+
+def render_fragment(
+    name: str,
+    source: gv.Digraph,
+    path: Path,
+    preprocess_kwargs: dict,
+    engine: str = None,
+    timeout: float = None,
+) -> None:
+    """Render fragment to an SVG script file, see :func:`run_with_fallback`."""
+    source = preprocess(source, **preprocess_kwargs)
+    svg = run_with_fallback(render_command(None, 'svg', engine), str(source), timeout)
+    svg = svg.decode()
+    svg = svg[svg.find('<svg'):]
+    key = '' if name == root_fragment else name
+    path.joinpath(name + '.js').write_text(script('fragment', key, svg), 'utf-8')
+
+
+def write_html(
+    graph: nx.DiGraph,
+    out_path: str,
+    graph_attrs: Dict[str, str] = None,
+    preprocess_kwargs: dict = None,
+    engine: str = None,
+    jobs: int = None,
+    timeout: float = None,
+    view: bool = False,
+    hooks: List[Hooks] = None,
+) -> str:
+    """
+    Write an interactive HTML page of a graph.
+
+    The page first shows the top level of the module hierarchy.
+    Each level is rendered separately in parallel to a small SVG file
+    that is loaded when the level is expanded.
+    Docstrings are written to a separate file loaded on demand.
+    The files are placed in a directory named after the page,
+    and are loaded as scripts, so the page can be opened from disk.
+
+    Parameters
+    ----------
+    graph
+        built graph
+    out_path
+        path to page to write, without suffix
+    graph_attrs
+        Graphviz graph attributes
+    preprocess_kwargs
+        keyword arguments for :func:`preprocess`
+    engine
+        Graphviz layout engine
+    jobs
+        number of Graphviz processes to run in parallel
+    timeout
+        time limit of rendering each level in seconds,
+        after which it is rendered again with cheaper settings
+    view
+        after writing, display with the default application
+    hooks
+        hooks to call
+
+    Returns
+    -------
+    str
+        path to the written page
+    """
+    start = perf_counter()
+    page_path = Path(out_path).with_suffix('.html')
+    files = page_path.with_name(page_path.stem + '_files')
+    with stage(hooks, 'cluster_fragments', graph):
+        fragments = cluster_fragments(graph, graph_attrs)
+    with stage(hooks, 'render_fragments'):
+        files.mkdir(parents=True, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = [
+                executor.submit(
+                    render_fragment,
+                    name,
+                    source,
+                    files,
+                    preprocess_kwargs or {},
+                    engine,
+                    timeout,
+                )
+                for name, source in fragments.items()
+            ]
+            for future in futures:
+                future.result()
+    with stage(hooks, 'write_html'):
+        docs = script('docs', node_docs(graph))
+        files.joinpath(docs_script + '.js').write_text(docs, 'utf-8')
+        text = page.substitute(
+            title=html.escape(page_path.stem),
+            files=json.dumps(files.name),
+            root=json.dumps(root_fragment),
+            docs=json.dumps(docs_script),
+        )
+        page_path.write_text(text, 'utf-8')
+    for hook in hooks or []:
+        hook.on_render_done(str(page_path), perf_counter() - start)
+    if view:
+        gv.view(str(page_path))
+    return str(page_path)
@@ -0,0 +1,240 @@
+import ast
+import json
+
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+try:
+    from importlib import metadata
+except ImportError:  # pragma: no cover
+    import importlib_metadata as metadata
+
+from ._cache import file_stamp
+from ._graph import get_type
+from ._io import write_atomic
+
+index_version = 2
+reexport = '>'
+
+
+def absolute_import(
+    module: Optional[str], level: int, location: str, is_package: bool
+) -> str:
+    """Resolve a potentially relative import from a module."""
+    if level == 0:
+        return module
+    parts = location.split('.')
+    if not is_package:
+        parts = parts[:-1]
+    parts = parts[:len(parts) - level + 1]
+    return '.'.join(parts + ([module] if module else []))
+
+
+def index_statements(
+    body: List[ast.stmt], location: str, is_package: bool, entry: Dict
+) -> None:
+    """Record names defined and imported by module-level statements."""
+    names = entry['names']
+    for node in body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names[node.name] = [get_type(node).value, node.lineno]
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            for target in targets:
+                for name in ast.walk(target):
+                    if isinstance(name, ast.Name):
+                        names[name.id] = [get_type(node).value, node.lineno]
+        elif isinstance(node, ast.ImportFrom):
+            base = absolute_import(node.module, node.level, location, is_package)
+            for alias in node.names:
+                if alias.name == '*':
+                    entry['stars'].append(base)
+                else:
+                    names[alias.asname or alias.name] = [
+                        reexport, f'{base}.{alias.name}'
+                    ]
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.asname:
+                    names[alias.asname] = [reexport, alias.name]
+        elif isinstance(node, (ast.If, ast.Try)):
+            for block in ('body', 'orelse', 'handlers', 'finalbody'):
+                index_statements(getattr(node, block, []), location, is_package, entry)
+        elif isinstance(node, ast.ExceptHandler):
+            index_statements(node.body, location, is_package, entry)
+
+
+def index_module(source: str, location: str, is_package: bool) -> Dict:
+    """
+    Index top-level names of a module without analysing dependencies.
+
+    Definitions are recorded with their type and line number,
+    imported names as re-exports of their fully qualified name.
+    Star imports are recorded separately.
+
+    Parameters
+    ----------
+    source
+        module source code
+    location
+        fully qualified name of the module
+    is_package
+        whether the module is a package initialisation file
+    """
+    entry = {'names': {}, 'stars': []}
+    index_statements(ast.parse(source).body, location, is_package, entry)
+    return entry
+
+
+def distribution_modules(
+    dist: 'metadata.Distribution',
+) -> Iterator[Tuple[str, bool, Path]]:
+    """
+    Generate modules of an installed distribution from its file list.
+
+    Stub files are preferred over source files of the same module.
+    Stub-only packages are named after the packages they annotate.
+    """
+    files = {}
+    for file in dist.files or []:
+        if file.suffix not in ('.py', '.pyi'):
+            continue
+        parts = list(file.parts)
+        if any(p.endswith(('.dist-info', '.egg-info', '.data')) for p in parts):
+            continue
+        if parts[0].endswith('-stubs'):
+            parts[0] = parts[0][:-len('-stubs')]
+        parts[-1] = parts[-1].rsplit('.', 1)[0]
+        is_package = parts[-1] == '__init__'
+        if is_package:
+            parts = parts[:-1]
+        if not parts or not all(p.isidentifier() for p in parts):
+            continue
+        module = '.'.join(parts)
+        if module in files and file.suffix == '.py':
+            continue
+        files[module] = (is_package, Path(dist.locate_file(file)))
+    for module, (is_package, path) in files.items():
+        yield module, is_package, path
+
+
+def record_stamp(dist: 'metadata.Distribution') -> Optional[List]:
+    """
+    Stamp the file list of an installed distribution.
+
+    The RECORD file is looked up at its standard location first,
+    so that the file list is only read if the distribution does not use it.
+    """
+    name = (dist.metadata['Name'] or '').replace('-', '_')
+    record = Path(dist.locate_file(f'{name}-{dist.version}.dist-info/RECORD'))
+    if record.is_file():
+        return file_stamp(record)
+    for file in dist.files or []:
+        if file.name in ('RECORD', 'installed-files.txt', 'SOURCES.txt'):
+            return file_stamp(Path(dist.locate_file(file)))
+    return None
+
+
+class ExportIndex:
+    """
+    Top-level names and re-exports of modules in installed distributions.
+
+    Distributions are indexed on demand when their modules are imported,
+    and indexed again when their file list changes.
+    The top-level modules of all distributions are stored as well,
+    so that the file lists of unchanged distributions are not read again.
+    Names can then be resolved to the modules that define them,
+    following re-exports, without parsing the distributions again.
+
+    Parameters
+    ----------
+    path
+        path to index file to read and write, the index is not stored if None
+    """
+
+    def __init__(self, path: str = None):
+        """Read stored index."""
+        self.path = path
+        self.distributions: Dict[str, Dict] = {}
+        if path is not None:
+            try:
+                data = json.loads(Path(path).read_text(encoding='utf-8'))
+            except (FileNotFoundError, ValueError):
+                data = {}
+            if isinstance(data, dict) and data.get('version') == index_version:
+                self.distributions = data['distributions']
+        self._collect()
+
+    def _collect(self) -> None:
+        self.modules: Dict[str, Dict] = {}
+        for dist in self.distributions.values():
+            self.modules.update(dist.get('modules', {}))
+
+    def update(self, top_levels: Set[str]) -> None:
+        """Index distributions that provide top-level modules if they changed."""
+        for dist in metadata.distributions():
+            name = dist.metadata['Name']
+            entry = self.distributions.get(name)
+            stamp = record_stamp(dist)
+            if entry is None or entry.get('record') != stamp or stamp is None:
+                tops = {
+                    f.parts[0].replace('-stubs', '').rsplit('.', 1)[0]
+                    for f in dist.files or [] if f.suffix in ('.py', '.pyi')
+                }
+                entry = {'version': dist.version, 'record': stamp, 'tops': sorted(tops)}
+                self.distributions[name] = entry
+            if 'modules' in entry or not top_levels.intersection(entry['tops']):
+                continue
+
+            modules = {}
+            for module, is_package, path in distribution_modules(dist):
+                try:
+                    source = path.read_text(encoding='utf-8')
+                    modules[module] = index_module(source, module, is_package)
+                except (OSError, SyntaxError, UnicodeDecodeError, ValueError):
+                    continue
+            entry['modules'] = modules
+        self._collect()
+
+    def write(self) -> None:
+        """Write index to its file."""
+        if self.path is None:
+            return
+        data = {'version': index_version, 'distributions': self.distributions}
+        write_atomic(Path(self.path), json.dumps(data))
+
+    def resolve(
+        self, name: str, seen: Set[str] = None
+    ) -> Optional[Tuple[str, str, int]]:
+        """
+        Resolve a fully qualified name to its definition.
+
+        Returns the name of the definition, its type and line number,
+        or None if the name is not a definition in an indexed module.
+        """
+        seen = seen or set()
+        if name in seen:
+            return None
+        seen.add(name)
+
+        parts = name.split('.')
+        for i in range(len(parts) - 1, 0, -1):
+            module = '.'.join(parts[:i])
+            if module in self.modules:
+                break
+        else:
+            return None
+        entry = self.modules[module]
+        attr = parts[i]
+        rest = parts[i + 1:]
+
+        if attr in entry['names']:
+            kind, value = entry['names'][attr]
+            if kind == reexport:
+                return self.resolve('.'.join([value] + rest), seen)
+            return f'{module}.{attr}', kind, value
+        for star in entry['stars']:
+            found = self.resolve('.'.join([star, attr] + rest), seen)
+            if found is not None:
+                return found
+        return None
@@ -1,12 +1,24 @@
+import os
+import logging
+import tempfile
+import tarfile
+import zipfile
 import graphviz as gv
 
+from fnmatch import fnmatch
 from dataclasses import dataclass
-from typing import List
-from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from pathlib import Path, PurePosixPath
 from importlib.util import find_spec
+from importlib.machinery import PathFinder
 
 from ._cli import ArgumentError, make_absolute
 
+log = logging.getLogger(__name__)
+default_ignore = ['.*', '__pycache__', 'node_modules', '*.egg-info']
+archive_suffixes = ('.whl', '.zip', '.tar.gz', '.tgz')
+archive_ignore = ['*.dist-info', '*.data']
+
 
 @dataclass
 class Source:
@@ -15,66 +27,332 @@ class Source:
     content: str = None
 
 
-def find_package_top(file: Path):
-    """Find package top directory."""
-    while True:
-        if len(file.parts) == 1:
-            raise ValueError('Package top was not found!')
-        if not file.with_name('__init__.py').exists():
-            break
-        file = file.parent
-    return file
+def read_gitignore(directory: Path) -> List[Tuple[str, bool]]:
+    """
+    Read ignore patterns of a .gitignore file if it exists.
+
+    A subset of the syntax is supported: comments, anchored patterns
+    and directory-only patterns. Negated patterns are skipped.
+    Patterns are returned with a flag for matching only directories.
+    """
+    try:
+        text = (directory / '.gitignore').read_text(encoding='utf-8')
+    except OSError:
+        return []
+    patterns = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith(('#', '!')):
+            continue
+        dir_only = line.endswith('/')
+        patterns.append((line.strip('/'), dir_only))
+    return patterns
+
+
+class SourceWalker:
+    """
+    Walk package directories with :func:`os.scandir`.
+
+    Each directory is listed once and whether it is a package
+    is cached from the listing. Directories matching ignore patterns
+    or rules of .gitignore files are pruned before descending.
+
+    Parameters
+    ----------
+    ignore
+        file and directory name patterns to skip
+    """
+
+    def __init__(self, ignore: List[str] = None):
+        """Initialise walker with empty caches."""
+        self.ignore = default_ignore + (ignore or [])
+        self.visited = 0
+        self._packages: Dict[Path, bool] = {}
+
+    def is_package(self, directory: Path) -> bool:
+        """Check if directory contains an initialisation file."""
+        if directory not in self._packages:
+            self._packages[directory] = (directory / '__init__.py').is_file()
+        return self._packages[directory]
+
+    def package_top(self, directory: Path) -> Path:
+        """Find top package directory containing directory."""
+        while self.is_package(directory.parent) and directory.parent != directory:
+            directory = directory.parent
+        return directory
+
+    def ignored(
+        self, name: str, rel: str, is_dir: bool, rules: List[Tuple[str, bool]]
+    ) -> bool:
+        """Check if an entry matches ignore patterns or .gitignore rules."""
+        if any(fnmatch(name, p) for p in self.ignore):
+            return True
+        for pattern, dir_only in rules:
+            if dir_only and not is_dir:
+                continue
+            if fnmatch(rel if '/' in pattern else name, pattern):
+                return True
+        return False
+
+    def walk(self, package: Path) -> Iterator[Tuple[Path, str]]:
+        """Generate Python files of a package tree and their module names."""
+        top = self.package_top(package).parent
+        prefix = package.relative_to(top).parts
+        yield from self._walk(package, prefix, package, [])
+
+    def walk_root(
+        self, root: Path, namespaces: bool = False
+    ) -> Iterator[Tuple[Path, str]]:
+        """
+        Generate Python files of a source root and their module names.
+
+        Modules and packages directly in the root are included.
+        If ``namespaces`` is set, other directories are treated as
+        namespace packages and searched for modules and packages.
+        """
+        yield from self._walk(root, (), root, [], namespaces)
+
+    def _walk(
+        self,
+        directory: Path,
+        prefix: Tuple[str, ...],
+        root: Path,
+        rules: List[Tuple[str, bool]],
+        namespaces: bool = False,
+    ) -> Iterator[Tuple[Path, str]]:
+        with os.scandir(directory) as it:
+            entries = list(it)
+        self.visited += len(entries)
+        names = {e.name for e in entries}
+        is_package = '__init__.py' in names
+        self._packages[directory] = is_package
+        if '.gitignore' in names:
+            rules = rules + [
+                ('/'.join(directory.relative_to(root).parts + (p,)), d)
+                if '/' in p else (p, d)
+                for p, d in read_gitignore(directory)
+            ]
+        has_modules = is_package or namespaces or directory == root
+
+        subdirs = []
+        for entry in sorted(entries, key=lambda e: e.name):
+            rel = '/'.join(directory.relative_to(root).parts + (entry.name,))
+            is_dir = entry.is_dir()
+            if self.ignored(entry.name, rel, is_dir, rules):
+                continue
+            if is_dir:
+                if namespaces or self.is_package(Path(entry.path)):
+                    subdirs.append(entry)
+            elif has_modules and entry.name.endswith('.py'):
+                path = Path(entry.path)
+                if entry.name == '__init__.py':
+                    yield path, '.'.join(prefix)
+                else:
+                    yield path, '.'.join(prefix + (path.stem,))
+        for entry in subdirs:
+            yield from self._walk(
+                Path(entry.path),
+                prefix + (entry.name,),
+                root,
+                rules,
+                namespaces,
+            )
+
+
+def archive_members(path: Path) -> Iterator[Tuple[str, bytes]]:
+    """Read Python files of a zip or gzipped tar archive member by member."""
+    if path.name.endswith(('.tar.gz', '.tgz')):
+        with tarfile.open(path, 'r|gz') as tar:
+            for member in tar:
+                if member.isfile() and member.name.endswith('.py'):
+                    yield member.name, tar.extractfile(member).read()
+    else:
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and info.filename.endswith('.py'):
+                    yield info.filename, archive.read(info)
+
+
+def archive_sources(path: Path, walker: SourceWalker) -> List[Source]:
+    """
+    Resolve sources in a wheel, sdist or zip archive without extracting it.
+
+    Module names are derived from the archive layout like for directories.
+    A single top directory that is not a package, as in sdists, is skipped.
+    Packages are named from their top package and other modules are
+    only included in the archive root. Sources are read while resolving.
+    """
+    files = {}
+    for name, data in archive_members(path):
+        parts = PurePosixPath(name).parts
+        if any(fnmatch(p, i) for p in parts for i in walker.ignore + archive_ignore):
+            continue
+        files[parts] = data
+
+    dirs = {parts[:-1] for parts in files if parts[-1] == '__init__.py'} - {()}
+    tops = {parts[0] for parts in files if len(parts) > 1}
+    root = ()
+    if len(tops) == 1 and not any(len(parts) == 1 for parts in files):
+        root = (tops.pop(),)
+        if root in dirs:
+            root = ()
+
+    sources = []
+    for parts, data in sorted(files.items()):
+        directory = parts[:-1]
+        stem = PurePosixPath(parts[-1]).stem
+        if directory in dirs:
+            top = directory
+            while top[:-1] in dirs:
+                top = top[:-1]
+            module = directory[len(top) - 1:]
+            if stem != '__init__':
+                module += (stem,)
+        elif directory == root:
+            module = (stem,)
+        else:
+            continue
+        file = path.joinpath(*parts)
+        sources.append(Source(file, '.'.join(module), data.decode('utf-8')))
+    return sources
 
 
-def resolve_sources(paths: List[str]) -> List[Source]:
-    """Resolve sources from paths and importable modules."""
+def resolve_sources(
+    paths: List[str], ignore: List[str] = None, namespaces: bool = False
+) -> List[Source]:
+    """
+    Resolve sources from paths, archives and importable modules.
+
+    Directories that are not packages are source roots,
+    from which top-level modules and packages are resolved.
+    Sources can be in different directories, for example
+    multiple ``src`` directories of a monorepo.
+    When module names are found in multiple places, the first one is used.
+
+    Parameters
+    ----------
+    paths
+        files, directories, archives or importable module names
+    ignore
+        file and directory name patterns to skip when walking directories
+    namespaces
+        treat directories without an initialisation file
+        in source roots as namespace packages
+    """
+    walker = SourceWalker(ignore)
     singles = []
     packages = []
-    importable = []
+    roots = []
+    archives = []
     for path in paths:
         p = make_absolute(Path(path).resolve())
-        if p.is_dir():
-            packages.append(p)
+        if p.is_file() and p.name.endswith(archive_suffixes):
+            archives.append(p)
+        elif p.is_dir():
+            if walker.is_package(p):
+                packages.append(p)
+            else:
+                roots.append(p)
         elif p.exists():
             singles.append(p)
         elif find_spec(str(path)):
-            importable.append(path)
+            spec = find_spec(str(path))
+            if spec.submodule_search_locations is None:
+                singles.append(Path(spec.origin))
+            else:
+                packages.extend([Path(p) for p in spec.submodule_search_locations])
         else:
             msg = (
                 f'Pyfactor: could not find `{path}`! '
-                'Expected a file, a directory or an importable package.'
+                'Expected a file, a directory, an archive or an importable package.'
             )
             raise ArgumentError(msg)
 
-    if len(singles) == 0 and len(packages) == 1:
-        if not (packages[0] / '__init__.py').exists():
-            folder = packages[0]
-            singles = list(folder.glob('*.py'))
-            packages = [path.parent for path in folder.glob('*/__init__.py')]
+    sources = [Source(s, s.stem) for s in singles]
+    for root in roots:
+        found = walker.walk_root(root, namespaces)
+        sources.extend(Source(path, name) for path, name in found)
+    for package in packages:
+        sources.extend(Source(path, name) for path, name in walker.walk(package))
+    for archive in archives:
+        sources.extend(archive_sources(archive, walker))
+    log.debug(f'visited {walker.visited} files and directories')
 
-    local_sources = singles + packages
-    if not all(p.parent == local_sources[0].parent for p in local_sources[1:]):
-        raise ArgumentError('Pyfactor: sources are in different directories!')
+    unique = {}
+    for source in sources:
+        if source.name in unique:
+            log.warning(
+                f'module {source.name} was found in multiple places, '
+                f'using {unique[source.name].file}'
+            )
+            continue
+        unique[source.name] = source
+    return list(unique.values())
 
-    for i in importable:
-        spec = find_spec(i)
-        if spec.submodule_search_locations is None:
-            singles.append(Path(spec.origin))
-        else:
-            packages.extend([Path(p) for p in spec.submodule_search_locations])
 
-    sources = [Source(s, s.stem) for s in singles]
-    for package in packages:
-        for path in package.glob('**/*.py'):
-            if not path.with_name('__init__.py').exists():
-                continue
-            rel = path.relative_to(find_package_top(package).parent)
-            if path.stem == '__init__':
-                name = '.'.join(rel.parent.parts)
+def find_modules(imports: Set[str]) -> Dict[str, Path]:
+    """
+    Find source files of imported modules without importing them.
+
+    For each import, the top-level module and all submodules
+    along the import path are found, for example for ``a.b.c``
+    the files of ``a``, ``a.b`` and ``a.b.c`` if they are modules.
+    Compiled and built-in modules are skipped.
+
+    Parameters
+    ----------
+    imports
+        fully qualified names of imported modules or names
+    """
+    specs = {}
+
+    def spec_of(name: str, locations: Optional[List[str]]):
+        if name not in specs:
+            specs[name] = PathFinder.find_spec(name, locations)
+        return specs[name]
+
+    found = {}
+    for import_ in imports:
+        parts = import_.split('.')
+        locations = None
+        for i in range(len(parts)):
+            name = '.'.join(parts[:i + 1])
+            spec = spec_of(name, locations)
+            if spec is None:
+                break
+            if spec.origin and spec.origin.endswith('.py'):
+                found[name] = Path(spec.origin)
+            locations = spec.submodule_search_locations
+            if not locations:
+                break
+    return found
+
+
+def fast_mode(
+    source: Source, rules: List[Tuple[str, str, Optional[int]]]
+) -> Optional[str]:
+    """
+    Find the fast path mode of the first rule that matches a source.
+
+    Patterns are matched against the file path and module name,
+    and size thresholds against the file size or the length of read content.
+    """
+    size = None
+    for mode, pattern, threshold in rules:
+        if threshold is None:
+            if fnmatch(str(source.file), pattern) or fnmatch(source.name, pattern):
+                return mode
+            if fnmatch(source.file.name, pattern):
+                return mode
+            continue
+        if size is None:
+            if source.content is not None:
+                size = len(source.content)
             else:
-                name = '.'.join(rel.with_suffix('').parts)
-            sources.append(Source(path, name))
-    return sources
+                size = source.file.stat().st_size
+        if size > threshold:
+            return mode
+    return None
 
 
 def read_source(path: Path) -> str:
@@ -82,6 +360,24 @@ def read_source(path: Path) -> str:
     return path.read_text(encoding='utf-8')
 
 
+def write_atomic(path: Path, text: str) -> None:
+    """
+    Write text to a file by replacing it with a complete temporary file.
+
+    Interrupted or concurrent writes never leave a partially written file.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        'w', encoding='utf-8', dir=str(path.parent), suffix='.tmp', delete=False
+    ) as f:
+        f.write(text)
+    try:
+        os.replace(f.name, str(path))
+    except OSError:
+        os.unlink(f.name)
+        raise
+
+
 def write_graph(graph: gv.Digraph, path: str) -> None:
     """Write graph to Graphviz dot file."""
     with open(path, 'w') as f:
@@ -0,0 +1,326 @@
+import re
+import json
+import hashlib
+import logging
+import networkx as nx
+import graphviz as gv
+import xml.etree.ElementTree as ET
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
+
+from ._graph import Level, gv_attrs, make_subgraphs, module_hierarchy
+from ._gv import preprocess, render_command, run_with_fallback
+from ._hooks import Hooks, stage
+from ._io import write_atomic
+
+log = logging.getLogger(__name__)
+unit_node = 'cluster-layout'
+svg_ns = 'http://www.w3.org/2000/svg'
+xlink_ns = 'http://www.w3.org/1999/xlink'
+ET.register_namespace('', svg_ns)
+ET.register_namespace('xlink', xlink_ns)
+
+
+def unit_of(node: str) -> str:
+    """Find the module level that a node is laid out in."""
+    return node.rpartition('.')[0]
+
+
+def unit_sources(
+    graph: nx.DiGraph, graph_attrs: Dict[str, str] = None
+) -> Dict[str, gv.Digraph]:
+    """
+    Create a Graphviz graph of the names directly in each module level.
+
+    Only edges between names of the same level are included.
+
+    Parameters
+    ----------
+    graph
+        built graph
+    graph_attrs
+        Graphviz graph attributes
+    """
+    sources = {}
+    for node, data in graph.nodes.items():
+        unit = unit_of(node)
+        if unit not in sources:
+            sources[unit] = gv.Digraph()
+            sources[unit].attr(**(graph_attrs or {}))
+        sources[unit].node(node, **gv_attrs(data))
+    for from_, to, data in graph.edges.data():
+        if unit_of(from_) == unit_of(to):
+            sources[unit_of(from_)].edge(from_, to, **gv_attrs(data))
+    return sources
+
+
+def unit_name(unit: str) -> str:
+    """Name of the node that represents a unit in the top-level layout."""
+    return f'{unit}.{unit_node}' if unit else unit_node
+
+
+def element_size(element: ET.Element) -> Tuple[float, float]:
+    """Read width and height of an SVG element in points."""
+    return tuple(
+        float(re.sub('[a-z]+$', '', element.get(dim))) for dim in ('width', 'height')
+    )
+
+
+def svg_size(svg: str) -> Tuple[float, float]:
+    """Read width and height of an SVG image in points."""
+    return element_size(ET.fromstring(svg))
+
+
+def box_hierarchy(
+    level: Level, sizes: Dict[str, Tuple[float, float]], location: List[str] = None
+) -> Level:
+    """Replace names of each level with a single box of its unit size."""
+    location = location or []
+    unit = '.'.join(location)
+    names = {}
+    if unit in sizes:
+        width, height = sizes[unit]
+        names[unit_node] = {
+            'shape': 'box',
+            'fixedsize': 'true',
+            'width': str(width / 72),
+            'height': str(height / 72),
+            'label': '',
+            'color': 'transparent',
+        }
+    sub = {
+        name: box_hierarchy(s, sizes, location + [name])
+        for name, s in level.sub.items()
+    }
+    return Level(sub, names)
+
+
+def top_source(
+    graph: nx.DiGraph,
+    sizes: Dict[str, Tuple[float, float]],
+    graph_attrs: Dict[str, str] = None,
+) -> gv.Digraph:
+    """
+    Create a Graphviz graph of fixed-size unit boxes in the module hierarchy.
+
+    Edges between names of different units are aggregated to single edges
+    between the unit boxes.
+
+    Parameters
+    ----------
+    graph
+        built graph
+    sizes
+        width and height of the layout of each unit in points
+    graph_attrs
+        Graphviz graph attributes
+    """
+    edges: Dict[Tuple[str, str], List] = {}
+    for from_, to, data in graph.edges.data():
+        u, v = unit_of(from_), unit_of(to)
+        if u == v:
+            continue
+        if (u, v) in edges:
+            edges[u, v][0] += 1
+        else:
+            edges[u, v] = [1, gv_attrs(data)]
+
+    gv_graph = gv.Digraph()
+    gv_graph.attr(**(graph_attrs or {}))
+    gv_graph.attr(compound='true', newrank='true')
+    make_subgraphs(gv_graph, box_hierarchy(module_hierarchy(graph), sizes), [])
+    for (u, v), (count, attrs) in edges.items():
+        if count > 1:
+            attrs = dict(attrs, penwidth=str(count ** 0.5), tooltip=f'{count} edges')
+        gv_graph.edge(unit_name(u), unit_name(v), **attrs)
+    return gv_graph
+
+
+def cache_key(source: str, preprocess_kwargs: dict, engine: Optional[str]) -> str:
+    """Hash a unit source together with the settings used to lay it out."""
+    content = json.dumps([source, preprocess_kwargs, engine], sort_keys=True)
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+def layout_unit(
+    source: gv.Digraph,
+    preprocess_kwargs: dict,
+    engine: str = None,
+    cache: Path = None,
+    timeout: float = None,
+) -> str:
+    """
+    Lay out a unit to SVG, reusing a cached layout of the same source.
+
+    Cached layouts that cannot be read are laid out again.
+    Layouts exceeding the timeout are retried, see :func:`run_with_fallback`.
+    """
+    key = cache_key(str(source), preprocess_kwargs, engine)
+    cached = cache / f'{key}.svg' if cache is not None else None
+    if cached is not None and cached.exists():
+        try:
+            svg = cached.read_text(encoding='utf-8')
+            ET.fromstring(svg)
+            return svg
+        except (ET.ParseError, ValueError):
+            log.debug(f'laying out again unreadable cached layout {cached}')
+
+    source = preprocess(source, **preprocess_kwargs)
+    command = render_command(None, 'svg', engine)
+    svg = run_with_fallback(command, str(source), timeout).decode()
+    if cached is not None:
+        write_atomic(cached, svg)
+    return svg
+
+
+def polygon_box(group: ET.Element) -> Optional[Tuple[float, float]]:
+    """Find the top left corner of a node polygon."""
+    polygon = group.find(f'{{{svg_ns}}}polygon')
+    if polygon is None:
+        return None
+    points = [p.split(',') for p in polygon.get('points').split()]
+    return min(float(x) for x, _ in points), min(float(y) for _, y in points)
+
+
+def prefix_ids(svg: ET.Element, prefix: str) -> None:
+    """Prefix element identifiers and local references to them."""
+    for element in svg.iter():
+        for attr, value in list(element.attrib.items()):
+            if attr == 'id':
+                value = prefix + value
+            elif attr in ('href', f'{{{xlink_ns}}}href') and value.startswith('#'):
+                value = '#' + prefix + value[1:]
+            else:
+                value = re.sub(r'url\(#', f'url(#{prefix}', value)
+            element.set(attr, value)
+
+
+def compose(top_svg: str, unit_svgs: Dict[str, str]) -> str:
+    """
+    Compose unit layouts into the boxes of the top-level layout.
+
+    Unit images are nested as SVG elements positioned at their boxes.
+    Element identifiers of units and references to them
+    are prefixed with the unit name to keep them unique.
+
+    Parameters
+    ----------
+    top_svg
+        SVG of the top-level layout
+    unit_svgs
+        SVG of the layout of each unit
+    """
+    root = ET.fromstring(top_svg)
+    for group in root.iter(f'{{{svg_ns}}}g'):
+        title = group.find(f'{{{svg_ns}}}title')
+        if group.get('class') != 'node' or title is None:
+            continue
+        name = title.text or ''
+        if name != unit_node and not name.endswith('.' + unit_node):
+            continue
+        unit = unit_of(name)
+        corner = polygon_box(group)
+        if unit not in unit_svgs or corner is None:
+            continue
+
+        nested = ET.fromstring(unit_svgs[unit])
+        prefix_ids(nested, f'{unit}:')
+        width, height = element_size(nested)
+        nested.set('x', str(corner[0]))
+        nested.set('y', str(corner[1]))
+        nested.set('width', str(width))
+        nested.set('height', str(height))
+        group.remove(title)
+        group.append(nested)
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n'
+        + ET.tostring(root, encoding='unicode')
+    )
+
+
+def render_clusters(
+    graph: nx.DiGraph,
+    out_path: str,
+    graph_attrs: Dict[str, str] = None,
+    preprocess_kwargs: dict = None,
+    engine: str = None,
+    jobs: int = None,
+    cache: str = None,
+    timeout: float = None,
+    view: bool = False,
+    hooks: List[Hooks] = None,
+) -> str:
+    """
+    Lay out each module level separately and compose them to an SVG image.
+
+    The names of each module level are laid out in parallel
+    in separate Graphviz processes.
+    The layouts are then placed in the module hierarchy as fixed-size boxes,
+    and edges between modules are routed in a final top-level layout.
+
+    Parameters
+    ----------
+    graph
+        built graph
+    out_path
+        path to image file to write, without suffix
+    graph_attrs
+        Graphviz graph attributes
+    preprocess_kwargs
+        keyword arguments for :func:`preprocess`
+    engine
+        Graphviz layout engine
+    jobs
+        number of Graphviz processes to run in parallel
+    cache
+        directory of layouts keyed by the hash of their source,
+        layouts are not cached if None
+    timeout
+        time limit of each layout in seconds,
+        after which it is laid out again with cheaper settings
+    view
+        after rendering, display with the default application
+    hooks
+        hooks to call
+
+    Returns
+    -------
+    str
+        path to the written image
+    """
+    start = perf_counter()
+    preprocess_kwargs = preprocess_kwargs or {}
+    cache_dir = Path(cache) if cache is not None else None
+    if cache_dir is not None:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+
+    with stage(hooks, 'unit_sources', graph):
+        sources = unit_sources(graph, graph_attrs)
+    with stage(hooks, 'layout_units'):
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = {
+                unit: executor.submit(
+                    layout_unit, source, preprocess_kwargs, engine, cache_dir, timeout
+                )
+                for unit, source in sources.items()
+            }
+            svgs = {unit: future.result() for unit, future in futures.items()}
+    with stage(hooks, 'layout_top'):
+        sizes = {unit: svg_size(svg) for unit, svg in svgs.items()}
+        top = top_source(graph, sizes, graph_attrs)
+        command = render_command(None, 'svg', engine)
+        top_svg = run_with_fallback(command, str(top), timeout)
+    with stage(hooks, 'compose'):
+        out = Path(out_path).with_suffix('.svg')
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(compose(top_svg.decode(), svgs), encoding='utf-8')
+    log.debug(f'laid out {len(sources)} modules separately')
+
+    for hook in hooks or []:
+        hook.on_render_done(str(out), perf_counter() - start)
+    if view:
+        gv.view(str(out))
+    return str(out)
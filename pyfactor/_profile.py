@@ -0,0 +1,135 @@
+import json
+import tracemalloc
+import networkx as nx
+
+from typing import Dict, List, Optional
+
+from ._hooks import Hooks
+from ._io import Source
+
+ignored_traces = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+]
+
+
+class MemoryProfile(Hooks):
+    """
+    Record traced memory of pipeline stages.
+
+    Tracing is started when entering the first stage and stopped on :meth:`write`
+    or :meth:`stop` if the run fails.
+    After each stage, the memory currently traced, the peak during the stage
+    and the allocation sites holding the most memory are recorded.
+    Peaks are reset between stages on Python 3.9 and above.
+
+    Parameters
+    ----------
+    top
+        number of allocation sites to record after each stage
+    """
+
+    def __init__(self, top: int = 10):
+        """Initialise empty profile."""
+        self.top = top
+        self.stages: List[Dict] = []
+
+    def on_stage_start(self, name: str) -> None:
+        """Start tracing and reset peak."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+
+    def on_stage_end(
+        self, name: str, seconds: float, graph: Optional[nx.DiGraph]
+    ) -> None:
+        """Record memory and allocation sites."""
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces(ignored_traces)
+        sites = [
+            {
+                'site': f'{s.traceback[0].filename}:{s.traceback[0].lineno}',
+                'size': s.size,
+                'count': s.count,
+            }
+            for s in snapshot.statistics('lineno')[:self.top]
+        ]
+        self.stages.append({
+            'stage': name, 'current': current, 'peak': peak, 'top': sites
+        })
+
+    def stop(self) -> None:
+        """Stop tracing."""
+        tracemalloc.stop()
+
+    def write(self, path: str) -> None:
+        """Stop tracing and write profile as JSON."""
+        self.stop()
+        with open(path, 'w') as f:
+            json.dump({'stages': self.stages}, f, indent=2)
+
+
+class Timings(Hooks):
+    """
+    Record durations of pipeline stages and parsing of individual files.
+
+    Graph node and edge counts are recorded after stages that provide a graph.
+
+    Parameters
+    ----------
+    slowest
+        number of slowest files to report
+    """
+
+    def __init__(self, slowest: int = 10):
+        """Initialise empty timings."""
+        self.slowest = slowest
+        self.stages: List[Dict] = []
+        self.files: List[Dict] = []
+
+    def on_stage_end(
+        self, name: str, seconds: float, graph: Optional[nx.DiGraph]
+    ) -> None:
+        """Record stage duration and graph size."""
+        record = {'stage': name, 'seconds': seconds}
+        if graph is not None:
+            record['nodes'] = graph.number_of_nodes()
+            record['edges'] = graph.number_of_edges()
+        self.stages.append(record)
+
+    def on_file_parsed(self, source: Source, seconds: float, names: int) -> None:
+        """Record parsing duration and number of names of a file."""
+        self.files.append({'file': source.name, 'seconds': seconds, 'names': names})
+
+    def report(self) -> Dict:
+        """Create a report with total duration and slowest files."""
+        files = sorted(self.files, key=lambda f: f['seconds'], reverse=True)
+        return {
+            'total': sum(s['seconds'] for s in self.stages),
+            'stages': self.stages,
+            'files': len(self.files),
+            'slowest_files': files[:self.slowest],
+        }
+
+    def table(self) -> str:
+        """Format timing report as a text table."""
+        report = self.report()
+        lines = [f'{"stage":<20}{"seconds":>10}{"nodes":>10}{"edges":>10}']
+        for s in report['stages']:
+            lines.append(
+                f'{s["stage"]:<20}{s["seconds"]:>10.4f}'
+                f'{s.get("nodes", ""):>10}{s.get("edges", ""):>10}'
+            )
+        lines.append(f'{"total":<20}{report["total"]:>10.4f}')
+        lines.append('')
+        lines.append(f'{"slowest files":<40}{"seconds":>10}{"names":>10}')
+        for f in report['slowest_files']:
+            lines.append(f'{f["file"]:<40}{f["seconds"]:>10.4f}{f["names"]:>10}')
+        return '\n'.join(lines)
+
+    def json(self) -> str:
+        """Format timing report as JSON."""
+        return json.dumps(self.report(), indent=2)
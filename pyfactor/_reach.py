@@ -0,0 +1,84 @@
+import networkx as nx
+
+from typing import Dict, Iterable, List, Set
+
+
+def _bit_indices(bits: int) -> Iterable[int]:
+    """Generate indices of set bits."""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class ReachabilityIndex:
+    """
+    Precomputed transitive dependencies and dependents of graph nodes.
+
+    The graph is condensed to its strongly connected components,
+    and for each component the components reachable from it
+    are stored as integer bitsets in both edge directions.
+    Reachability checks are then single bit tests
+    and queries take time proportional to their results.
+    Nodes with an edge to themselves depend on themselves
+    like members of larger cycles.
+
+    Parameters
+    ----------
+    graph
+        graph to index, edges point from nodes to their dependencies
+    """
+
+    def __init__(self, graph: nx.DiGraph):
+        """Condense graph and compute reachable components."""
+        condensed = nx.condensation(graph)
+        self._component: Dict[str, int] = condensed.graph['mapping']
+        self._members: List[Set[str]] = [
+            condensed.nodes[c]['members'] for c in range(len(condensed))
+        ]
+        self._loops = set(nx.nodes_with_selfloops(graph))
+        self._forward = [0] * len(condensed)
+        self._reverse = [0] * len(condensed)
+
+        order = list(nx.topological_sort(condensed))
+        for c in reversed(order):
+            bits = 1 << c
+            for s in condensed.successors(c):
+                bits |= self._forward[s]
+            self._forward[c] = bits
+        for c in order:
+            bits = 1 << c
+            for p in condensed.predecessors(c):
+                bits |= self._reverse[p]
+            self._reverse[c] = bits
+
+    def __contains__(self, node: str) -> bool:
+        """Check if node is in the index."""
+        return node in self._component
+
+    def _collect(self, node: str, bitsets: List[int]) -> Set[str]:
+        component = self._component[node]
+        bits = bitsets[component]
+        if len(self._members[component]) == 1:
+            bits ^= 1 << component
+        found = set()
+        for i in _bit_indices(bits):
+            found.update(self._members[i])
+        found.discard(node)
+        return found
+
+    def dependencies(self, node: str) -> Set[str]:
+        """Find all nodes that node depends on directly or transitively."""
+        return self._collect(node, self._forward)
+
+    def dependents(self, node: str) -> Set[str]:
+        """Find all nodes that depend on node directly or transitively."""
+        return self._collect(node, self._reverse)
+
+    def depends_on(self, node: str, target: str) -> bool:
+        """Check if node depends on target directly or transitively."""
+        if node == target:
+            in_cycle = len(self._members[self._component[node]]) > 1
+            return in_cycle or node in self._loops
+        c = self._component[target]
+        return bool(self._forward[self._component[node]] >> c & 1)
@@ -371,11 +371,14 @@ def maybe_get_docstring(node: ast.AST):
         return node.value.s
 
 
-def parse_scoped(visitor: Visitor, scope: Scope) -> Tuple[List[Name], Optional[str]]:
+def parse_scoped(
+    visitor: Visitor, scope: Scope, docstring: bool = False
+) -> Tuple[List[Name], Optional[str]]:
     """
     Parse nodes in a scope with shortcuts.
 
-    Returns parsed names and possible docstring for parent visitor.
+    Returns parsed names and possible docstring for parent visitor
+    if ``docstring`` is set.
     """
     if not visitor.breaks_scope:
         # Was called on an arbitrary node
@@ -383,7 +386,7 @@ def parse_scoped(visitor: Visitor, scope: Scope) -> Tuple[List[Name], Optional[s
 
     parent_doc = None
     children = visitor.children()
-    if children:
+    if children and docstring:
         parent_doc = maybe_get_docstring(children[0])
 
     for child in children:
@@ -408,12 +411,12 @@ def parse_scoped(visitor: Visitor, scope: Scope) -> Tuple[List[Name], Optional[s
     return visitor.parse_names(), parent_doc
 
 
-def parse_no_scope(visitor: Visitor) -> List[Line]:
-    """Fully parse nodes as in outermost scope."""
+def parse_no_scope(visitor: Visitor, docstrings: bool = True) -> List[Line]:
+    """Fully parse nodes as in outermost scope, optionally with docstrings."""
     names = [n for n in visitor.parse_names() if n.name is not None]
     self_line = Line(visitor.node, names, docstring=None)
     lines = []
-    previous = visitor
+    previous = visitor if docstrings else None
     for child in visitor.children():
         if previous is visitor:
             self_line.docstring = maybe_get_docstring(child)
@@ -428,7 +431,7 @@ def parse_no_scope(visitor: Visitor) -> List[Line]:
 
         if child.breaks_scope:
             scope = child.create_scope()
-            c_names, doc = parse_scoped(child, scope)
+            c_names, doc = parse_scoped(child, scope, docstrings)
             c_names = [n for n in c_names if n.name is not None]
             merged = Scope()
             child.merge_scopes(merged, scope)
@@ -437,9 +440,9 @@ def parse_no_scope(visitor: Visitor) -> List[Line]:
                 name.deps = name.deps | deps
             line = Line(child.node, c_names, docstring=doc)
             lines.append(line)
-            previous = line if doc is None else None
+            previous = line if doc is None and docstrings else None
         else:
-            lines.extend(parse_no_scope(child))
+            lines.extend(parse_no_scope(child, docstrings))
             previous = None
 
     forward = visitor.forward_deps()
@@ -451,10 +454,10 @@ def parse_no_scope(visitor: Visitor) -> List[Line]:
     return [line for line in lines if line.names or line.docstring]
 
 
-def parse_lines(source: Source) -> List[Line]:
+def parse_lines(source: Source, docstrings: bool = True) -> List[Line]:
     """Parse name definitions and references on lines from source."""
     tree = ast.parse(source.content)
-    lines = parse_no_scope(cast(tree))
+    lines = parse_no_scope(cast(tree), docstrings)
     defined_names = {n.name for line in lines for n in line.names}
 
     for line in lines:
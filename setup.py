@@ -62,12 +62,17 @@ setuptools.setup(
         'pyfactor': ['VERSION']
     },
     entry_points={
-        'console_scripts': ['pyfactor=pyfactor:main']
+        'console_scripts': [
+            'pyfactor=pyfactor:main',
+            'pyfactor-diff=pyfactor:diff_main',
+            'pyfactor-query=pyfactor:query_main',
+        ]
     },
 
     python_requires='>=3.6',
     install_requires=[
         'dataclasses;python_version<"3.7"',
+        'importlib-metadata;python_version<"3.8"',
         'pydot',
         'networkx',
         'graphviz',
@@ -0,0 +1,30 @@
+import networkx as nx
+from pyfactor import Hooks
+
+
+def make_graph(edges) -> nx.DiGraph:
+    graph = nx.DiGraph()
+    for u, v in edges:
+        graph.add_node(u, type='F', lineno='1')
+        graph.add_node(v, type='F', lineno='1')
+        graph.add_edge(u, v, kind='reference')
+    return graph
+
+
+def module_graph() -> nx.DiGraph:
+    graph = nx.DiGraph([
+        ('p.a.f', 'p.a.g'),
+        ('p.a.f', 'p.b.h'),
+        ('p.a.g', 'p.b.h'),
+        ('p.a.g', 'p.b.cluster-invis-node'),
+    ])
+    graph.nodes['p.a.f'].update(label='f', tooltip='Docs\\nof f.', type='F')
+    return graph
+
+
+class Parsed(Hooks):
+    def __init__(self):
+        self.names = []
+
+    def on_file_parsed(self, source, seconds, names):
+        self.names.append(source.name)
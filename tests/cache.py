@@ -0,0 +1,117 @@
+import subprocess
+import pytest
+from pathlib import Path
+from pyfactor import parse
+from pyfactor._cli import ArgumentError
+from pyfactor._cache import read_cache, write_cache
+from pyfactor._graph import GraphNode, NodeType
+from ._util import Parsed
+
+
+def git(path: Path, *args) -> None:
+    subprocess.run(
+        ['git', '-c', 'user.name=t', '-c', 'user.email=t@t', *args],
+        cwd=path, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+
+
+class TestParseCache:
+    def test_round_trip(self, tmp_path):
+        node = GraphNode('a', {'b', 'c'}, NodeType.func, '1,3', 'doc', {'os'})
+        path = str(tmp_path / 'cache.json')
+        write_cache(path, {'mod': [node]})
+        assert read_cache(path) == {'mod': [node]}
+
+    def test_missing_is_empty(self, tmp_path):
+        assert read_cache(str(tmp_path / 'cache.json')) == {}
+
+    def test_truncated_is_empty(self, tmp_path):
+        path = tmp_path / 'cache.json'
+        path.write_text('{"version": 1, "modules": {"mod')
+        assert read_cache(str(path)) == {}
+
+    def test_no_temporary_files_left(self, tmp_path):
+        write_cache(str(tmp_path / 'cache.json'), {})
+        assert [p.name for p in tmp_path.iterdir()] == ['cache.json']
+
+    def make_repo(self, root: Path) -> Path:
+        pkg = root / 'pkg'
+        pkg.mkdir(parents=True)
+        (pkg / '__init__.py').write_text('')
+        (pkg / 'a.py').write_text('def f():\n    pass\n')
+        (pkg / 'b.py').write_text('from pkg.a import f\nx = f()\n')
+        git(root, 'init', '-q')
+        git(root, 'add', '.')
+        git(root, 'commit', '-qm', 'init')
+        return pkg
+
+    def test_since_parses_changed(self, tmp_path):
+        pkg = self.make_repo(tmp_path)
+        cache = str(tmp_path / 'cache.json')
+        parse([str(pkg)], str(tmp_path / 'first.gv'), parse_cache=cache)
+        (pkg / 'b.py').write_text('from pkg.a import f\ny = f()\n')
+        (pkg / 'c.py').write_text('z = 1\n')
+
+        parsed = Parsed()
+        since = str(tmp_path / 'since.gv')
+        parse([str(pkg)], since, since='HEAD', parse_cache=cache, hooks=[parsed])
+        assert sorted(parsed.names) == ['pkg.b', 'pkg.c']
+
+        full = str(tmp_path / 'full.gv')
+        parse([str(pkg)], full)
+        assert Path(since).read_text() == Path(full).read_text()
+
+    def test_reverted_file_parsed_again(self, tmp_path):
+        pkg = self.make_repo(tmp_path)
+        cache = str(tmp_path / 'cache.json')
+        (pkg / 'b.py').write_text('from pkg.a import f\nyy = f()\n')
+        parse([str(pkg)], str(tmp_path / 'first.gv'), parse_cache=cache)
+        git(tmp_path, 'checkout', '--', 'pkg/b.py')
+
+        parsed = Parsed()
+        out = str(tmp_path / 'since.gv')
+        parse([str(pkg)], out, since='HEAD', parse_cache=cache, hooks=[parsed])
+        assert parsed.names == ['pkg.b']
+        assert 'pkg.b.x' in Path(out).read_text()
+
+    def test_other_commit_ignored(self, tmp_path):
+        pkg = self.make_repo(tmp_path)
+        cache = str(tmp_path / 'cache.json')
+        parse([str(pkg)], str(tmp_path / 'first.gv'), parse_cache=cache)
+        (pkg / 'c.py').write_text('z = 1\n')
+        git(tmp_path, 'add', '.')
+        git(tmp_path, 'commit', '-qm', 'second')
+
+        parsed = Parsed()
+        out = str(tmp_path / 'since.gv')
+        parse([str(pkg)], out, since='HEAD', parse_cache=cache, hooks=[parsed])
+        assert len(parsed.names) == 4
+
+    def test_other_options_ignored(self, tmp_path):
+        pkg = self.make_repo(tmp_path)
+        cache = str(tmp_path / 'cache.json')
+        parse([str(pkg)], str(tmp_path / 'first.gv'), parse_cache=cache)
+
+        parsed = Parsed()
+        out = str(tmp_path / 'since.gv')
+        parse(
+            [str(pkg)],
+            out,
+            since='HEAD',
+            parse_cache=cache,
+            fast_path=['names:a.py'],
+            hooks=[parsed],
+        )
+        assert len(parsed.names) == 3
+
+    def test_multiple_repositories_rejected(self, tmp_path):
+        first = self.make_repo(tmp_path / 'first')
+        second = self.make_repo(tmp_path / 'second')
+        cache = str(tmp_path / 'cache.json')
+        with pytest.raises(ArgumentError):
+            parse(
+                [str(first), str(second)],
+                str(tmp_path / 'g.gv'),
+                since='HEAD',
+                parse_cache=cache,
+            )
@@ -1,5 +1,7 @@
 import pytest
-from pyfactor._cli import parse_names, ArgumentError
+from pyfactor._cli import (
+    parse_names, parse_fast_rules, default_docstrings, ArgumentError
+)
 
 
 class TestCLI:
@@ -80,3 +82,28 @@ class TestCLI:
     def test_disabled_source_output_infer_graph(self):
         with pytest.raises(ArgumentError):
             parse_names([], None, '-')
+
+
+class TestFastRules:
+    def test_pattern_and_size(self):
+        rules = parse_fast_rules(['fold:*_pb2.py', 'names:>2k', 'names:>100'])
+        assert rules == [
+            ('fold', '*_pb2.py', None), ('names', '', 2048), ('names', '', 100)
+        ]
+
+    def test_invalid_mode(self):
+        with pytest.raises(ArgumentError):
+            parse_fast_rules(['skip:*.py'])
+
+    def test_invalid_size(self):
+        with pytest.raises(ArgumentError):
+            parse_fast_rules(['names:>big'])
+
+
+class TestDefaultDocstrings:
+    def test_embedded_for_tooltip_formats(self):
+        assert default_docstrings('svg') == 'embed'
+        assert default_docstrings('png,cmapx') == 'embed'
+
+    def test_skipped_for_other_formats(self):
+        assert default_docstrings('png,pdf') == 'none'
@@ -0,0 +1,53 @@
+from pathlib import Path
+from pyfactor import diff, diff_main
+from pyfactor._diff import diff_graphs, create_diff_graph
+from ._util import make_graph
+
+
+class TestDiff:
+    def test_unchanged(self):
+        old = make_graph([('m.a', 'm.b')])
+        diff = diff_graphs(old, old.copy())
+        assert diff.summary() == []
+
+    def test_added_removed(self):
+        old = make_graph([('m.a', 'm.b'), ('m.b', 'm.c')])
+        new = make_graph([('m.a', 'm.b'), ('m.a', 'm.d')])
+        diff = diff_graphs(old, new)
+        assert diff.added_nodes == {'m.d'}
+        assert diff.removed_nodes == {'m.c'}
+        assert diff.added_edges == {('m.a', 'm.d')}
+        assert diff.removed_edges == {('m.b', 'm.c')}
+        assert diff.changed_nodes == {'m.a', 'm.b', 'm.c', 'm.d'}
+
+    def test_render_neighbourhood(self):
+        old = make_graph([('m.x', 'm.a'), ('m.y', 'm.x'), ('m.a', 'm.b')])
+        new = make_graph([('m.x', 'm.a'), ('m.y', 'm.x'), ('m.a', 'm.c')])
+        diff = diff_graphs(old, new)
+        source = create_diff_graph(old, new, diff, levels=1).source
+        assert 'm.x' in source
+        assert 'm.y' not in source
+
+
+def make_tree(root: Path, content: str) -> str:
+    root.mkdir()
+    (root / 'mod.py').write_text(content)
+    return str(root / 'mod.py')
+
+
+class TestDiffSources:
+    old = 'def a():\n    pass\n'
+    new = 'def a():\n    pass\n\n\ndef b():\n    a()\n'
+
+    def test_added_definition(self, tmp_path):
+        old = make_tree(tmp_path / 'old', self.old)
+        new = make_tree(tmp_path / 'new', self.new)
+        result = diff(old, new)
+        assert result.added_nodes == {'mod.b'}
+        assert result.added_edges == {('mod.b', 'mod.a')}
+
+    def test_cli_summary(self, tmp_path, capsys):
+        old = make_tree(tmp_path / 'old', self.old)
+        new = make_tree(tmp_path / 'new', self.new)
+        diff_main([old, new, '--output', '-'])
+        assert 'mod.b' in capsys.readouterr().out
@@ -0,0 +1,52 @@
+import pytest
+import networkx as nx
+from pathlib import Path
+from pyfactor._io import Source
+from pyfactor._visit import parse_lines
+from pyfactor._graph import build_graph
+from pyfactor._export import export_graph, import_graph, formats, node_ids
+
+source = '''
+import os
+from . import b
+
+def f():
+    return os.path
+
+def g():
+    return f() + b.c
+'''
+
+module = Source(Path('./nonfile'), 'pkg.a', source)
+graph = build_graph([(module, parse_lines(module))], imports='duplicate')
+
+
+class TestExport:
+    @pytest.mark.parametrize('format', list(formats))
+    def test_roundtrip(self, format, tmp_path):
+        path = tmp_path / ('graph' + formats[format][0])
+        export_graph(graph, str(path))
+        read = import_graph(str(path))
+
+        assert set(read.nodes) == {
+            'pkg', 'pkg.a', 'pkg.a.os', 'pkg.a.b', 'pkg.a.f', 'pkg.a.g', 'pkg.b', 'os'
+        }
+        assert read.nodes['pkg.a.f']['type'] == 'F'
+        assert read.nodes['pkg.a.f']['lineno'] == '5'
+        assert read.nodes['pkg.a.f']['module'] == 'pkg.a'
+        assert read.nodes['pkg.b']['type'] == 'I'
+        assert read.nodes['pkg.a']['type'] == 'M'
+        assert read.edges['pkg.a.g', 'pkg.a.f']['kind'] == 'reference'
+        assert read.edges['pkg.a.os', 'os']['kind'] == 'import'
+        assert read.number_of_edges() == graph.number_of_edges()
+
+    @pytest.mark.parametrize('format', list(formats))
+    def test_module_named_like_node(self, format, tmp_path):
+        graph = nx.DiGraph([('m.x.cluster-invis-node', 'm.x')])
+        graph.nodes['m.x'].update(type='V', lineno='1')
+        assert len(node_ids(graph)[1]) == 2
+
+        path = tmp_path / ('graph' + formats[format][0])
+        export_graph(graph, str(path))
+        read = import_graph(str(path))
+        assert read.nodes['m.x']['type'] == 'V'
@@ -0,0 +1,171 @@
+import json
+import networkx as nx
+from pathlib import Path
+from pyfactor import parse
+from pyfactor._graph import (
+    NodeType, cluster_invis_node, condense_cycles, fast_nodes, resolve_external,
+    to_gv,
+)
+
+
+class TestCondenseCycles:
+    def test_no_cycles(self):
+        graph = nx.DiGraph([('m.a', 'm.b'), ('m.b', 'm.c')])
+        assert condense_cycles(graph) == []
+        assert set(graph.nodes) == {'m.a', 'm.b', 'm.c'}
+
+    def test_cycle_collapsed(self):
+        graph = nx.DiGraph([
+            ('m.x', 'm.a'), ('m.a', 'm.b'), ('m.b', 'm.a'), ('m.b', 'm.y'),
+        ])
+        cycles = condense_cycles(graph)
+        assert cycles == [['m.a', 'm.b']]
+        assert set(graph.nodes) == {'m.x', 'm.y', 'm.cycle-0'}
+        assert set(graph.edges) == {('m.x', 'm.cycle-0'), ('m.cycle-0', 'm.y')}
+
+    def test_cycle_across_modules(self):
+        graph = nx.DiGraph([('p.m.a', 'p.n.b'), ('p.n.b', 'p.m.a')])
+        condense_cycles(graph)
+        assert set(graph.nodes) == {'p.cycle-0'}
+
+    def test_self_loop_not_collapsed(self):
+        graph = nx.DiGraph([('m.a', 'm.a')])
+        assert condense_cycles(graph) == []
+
+
+class TestResolveExternal:
+    def test_import_target_moved(self):
+        graph = nx.DiGraph([('m.f', 'ext.g')])
+        graph.nodes['ext.g'].update(type='I', shape='note')
+        graph.nodes['m.f'].update(type='F')
+        resolve_external(graph, {'ext.g': ('ext.impl.g', 'F', 5)}.get, {})
+        assert set(graph.edges) == {('m.f', 'ext.impl.g')}
+        assert graph.nodes['ext.impl.g']['lineno'] == '5'
+        assert 'ext.impl.cluster-invis-node' in graph
+
+    def test_unresolved_kept(self):
+        graph = nx.DiGraph([('m.f', 'ext.g')])
+        graph.nodes['ext.g'].update(type='I', shape='note')
+        resolve_external(graph, {}.get, {})
+        assert set(graph.edges) == {('m.f', 'ext.g')}
+
+
+class TestFastNodes:
+    source = (
+        'import os\n'
+        'X: int = 1\n'
+        'if X == 1:\n'
+        '    Y = 2\n'
+        'class C:\n'
+        '    a = 1\n'
+        'async def f(a=1):\n'
+        '    pass\n'
+        'X = 3\n'
+    )
+
+    def test_names(self):
+        nodes = fast_nodes('m', self.source, 'names')
+        found = {n.name: (n.type, n.lineno_str) for n in nodes}
+        assert found == {
+            'X': (NodeType.var, '2,9'),
+            'C': (NodeType.class_, '5'),
+            'f': (NodeType.func, '7'),
+        }
+        assert all(not n.deps and not n.import_sources for n in nodes)
+
+    def test_fold(self):
+        node, = fast_nodes('m', self.source, 'fold')
+        assert node.name == cluster_invis_node
+        assert node.type == NodeType.module
+
+
+class TestToGv:
+    def test_layout_settings_by_size(self):
+        source = to_gv(nx.DiGraph([('m.a', 'm.b')])).source
+        assert 'mclimit=10.0' in source
+
+    def test_graph_attrs_override_settings(self):
+        source = to_gv(nx.DiGraph([('m.a', 'm.b')]), {'mclimit': '2.0'}).source
+        assert 'mclimit=2.0' in source
+        assert 'mclimit=10.0' not in source
+
+    def test_positions_reused(self):
+        positions = {'nodes': {'m.a': '1,2', 'm.b': '3,4'}, 'clusters': {}}
+        source = to_gv(nx.DiGraph([('m.a', 'm.b')]), positions=positions).source
+        assert 'pos="1,2"' in source
+        assert 'layout=nop' in source
+
+    def test_new_node_keeps_dot(self):
+        positions = {'nodes': {'m.a': '1,2'}, 'clusters': {}}
+        source = to_gv(nx.DiGraph([('m.a', 'm.b')]), positions=positions).source
+        assert 'pos=' not in source
+        assert 'layout=' not in source
+
+
+def compact_graph() -> nx.DiGraph:
+    graph = nx.DiGraph()
+    for name in ('m.a', 'm.b', 'm.c'):
+        graph.add_node(name, label=name, shape='box', style='filled')
+    graph.nodes['m.c'].update(shape='ellipse', color='black')
+    graph.add_node('m.' + cluster_invis_node, shape='point', style='invis')
+    graph.add_edge('m.a', 'm.b', style='dashed')
+    graph.add_edge('m.a', 'm.c', style='dashed')
+    graph.add_edge('m.b', 'm.c')
+    return graph
+
+
+compact_source = to_gv(compact_graph(), compact=True).source
+
+
+class TestCompactGv:
+    def test_numeric_ids(self):
+        assert '0 [label="m.a"]' in compact_source
+        assert '"m.a"' not in compact_source.replace('label="m.a"', '')
+
+    def test_common_attributes_declared_once(self):
+        assert 'node [shape=box style=filled]' in compact_source
+        assert compact_source.count('style=filled') == 1
+
+    def test_defaults_dropped(self):
+        assert 'color=black' not in compact_source
+        assert '2 [label="m.c" shape=ellipse]' in compact_source
+
+    def test_invisible_not_reset(self):
+        assert '3 [shape=point style=invis]' in compact_source
+
+    def test_edges_grouped(self):
+        assert 'edge [style=dashed]' in compact_source
+        assert compact_source.count('style=dashed') == 1
+
+
+def write_script(tmp_path: Path) -> str:
+    script = tmp_path / 'script.py'
+    script.write_text('def f():\n    """Docs of f."""\n')
+    return str(script)
+
+
+class TestDocstrings:
+    def test_none_leaves_tooltips_out(self, tmp_path):
+        graph = parse([write_script(tmp_path)], str(tmp_path / 'g.gv'), docstrings='none')
+        assert 'tooltip' not in graph.nodes['script.f']
+        assert 'tooltip' not in (tmp_path / 'g.gv').read_text()
+
+    def test_external_written_to_file(self, tmp_path):
+        graph = parse(
+            [write_script(tmp_path)], str(tmp_path / 'g.gv'), docstrings='external'
+        )
+        docs = json.loads((tmp_path / 'g.docs.json').read_text())
+        assert docs == {'script.f': 'Docs of f.'}
+        assert 'Docs of f.' not in (tmp_path / 'g.gv').read_text()
+        assert graph.nodes['script.f']['tooltip'] == 'Docs of f.'
+
+    def test_external_keyed_by_compact_id(self, tmp_path):
+        parse(
+            [write_script(tmp_path)],
+            str(tmp_path / 'g.gv'),
+            docstrings='external',
+            compact=True,
+        )
+        docs = json.loads((tmp_path / 'g.docs.json').read_text())
+        assert list(docs.values()) == ['Docs of f.']
+        assert list(docs) != ['script.f']
@@ -0,0 +1,160 @@
+import sys
+import shutil
+import pytest
+import graphviz as gv
+import json
+from pyfactor._gv import (
+    fallback_attempts,
+    fallback_layouts,
+    layout_policy,
+    pinned_layout,
+    read_positions,
+    render,
+    render_command,
+    run_graphviz,
+    with_graph_attrs,
+    write_positions,
+)
+
+has_dot = shutil.which('dot') is not None
+
+
+class TestRenderCommand:
+    def test_output_file(self):
+        command = render_command('out.svg', 'svg')
+        assert command == ['dot', '-Kdot', '-Tsvg', '-o', 'out.svg']
+
+    def test_renderer_formatter(self):
+        command = render_command('out.png', 'png', 'neato', 'cairo', 'gd')
+        assert command[1:3] == ['-Kneato', '-Tpng:cairo:gd']
+
+
+class TestLayoutPolicy:
+    def test_small_graph_full_effort(self):
+        settings = layout_policy(10, 10)
+        assert settings == {'mclimit': '10.0', 'searchsize': '300'}
+
+    def test_effort_reduced(self):
+        small = layout_policy(100, 100)
+        large = layout_policy(10000, 20000)
+        assert float(large['mclimit']) < float(small['mclimit'])
+        assert large['splines'] == 'line'
+
+    def test_huge_graph_sfdp(self):
+        assert layout_policy(100000, 100000)['layout'] == 'sfdp'
+
+    def test_many_edges_reduce_effort(self):
+        assert layout_policy(100, 100000)['layout'] == 'sfdp'
+
+    def test_engine_overrides(self):
+        assert layout_policy(100000, 100000, 'neato')['layout'] == 'neato'
+        assert 'layout' not in layout_policy(100000, 100000, 'dot')
+
+
+def test_graph_attrs_appended():
+    source = with_graph_attrs('digraph {\n\ta -> b\n}\n', {'layout': 'sfdp'})
+    assert source == 'digraph {\n\ta -> b\n\tgraph [layout="sfdp"]\n}\n'
+
+
+layout_json = json.dumps({'objects': [
+    {'name': 'cluster_m', 'bb': '0,0,100,100', 'lp': '50,90', 'nodes': [1]},
+    {'name': 'm.a', 'pos': '27,18'},
+    {'name': 'm.b', 'pos': '27,72'},
+]})
+
+
+class TestFallbackAttempts:
+    def test_all_for_dot(self):
+        attempts = fallback_attempts(['dot', '-Kdot'], 'digraph {\n}')
+        assert attempts == fallback_layouts
+
+    def test_sfdp_not_repeated(self):
+        source = 'digraph {\n\tgraph [layout=sfdp splines=line]\n}'
+        assert fallback_attempts(['dot', '-Kdot'], source) == []
+
+    def test_sfdp_engine_not_repeated(self):
+        source = 'digraph {\n\tgraph [splines=line]\n}'
+        assert fallback_attempts(['dot', '-Ksfdp'], source) == []
+
+
+class TestRunGraphviz:
+    def command(self, code: str) -> list:
+        return [sys.executable, '-c', f'import sys; {code}']
+
+    def test_error_message_raised(self):
+        command = self.command('sys.stderr.write("Error: bad format"); sys.exit(1)')
+        with pytest.raises(RuntimeError, match='bad format'):
+            run_graphviz(command, '')
+
+    def test_warnings_logged(self, caplog):
+        command = self.command('sys.stderr.write("Warning: odd"); print("out")')
+        assert run_graphviz(command, '').strip() == b'out'
+        assert 'Warning: odd' in caplog.text
+
+
+class TestPositions:
+    def test_round_trip(self, tmp_path):
+        path = str(tmp_path / 'positions.json')
+        write_positions(path, layout_json)
+        positions = read_positions(path)
+        assert positions['nodes'] == {'m.a': '27,18', 'm.b': '27,72'}
+        assert positions['clusters'] == {'cluster_m': {'bb': '0,0,100,100', 'lp': '50,90'}}
+
+    def test_identifiers_mapped_to_names(self, tmp_path):
+        path = str(tmp_path / 'positions.json')
+        write_positions(path, layout_json, {'m.a': 'pkg.m.a'})
+        assert set(read_positions(path)['nodes']) == {'pkg.m.a', 'm.b'}
+
+    def test_missing(self, tmp_path):
+        assert read_positions(str(tmp_path / 'positions.json')) is None
+
+    def test_truncated(self, tmp_path):
+        path = tmp_path / 'positions.json'
+        path.write_text('{"version": 1, "nod')
+        assert read_positions(str(path)) is None
+
+    def test_outdated(self, tmp_path):
+        path = tmp_path / 'positions.json'
+        path.write_text('{"version": 0}')
+        assert read_positions(str(path)) is None
+
+
+class TestPinnedLayout:
+    positions = {'nodes': {'m.a': '1,2', 'm.b': '3,4'}, 'clusters': {'cluster_m': {}}}
+
+    def test_all_known_reused(self):
+        nodes, clusters, attrs = pinned_layout(['m.a', 'm.b'], self.positions)
+        assert nodes == {'m.a': {'pos': '1,2'}, 'm.b': {'pos': '3,4'}}
+        assert clusters == {'cluster_m': {}}
+        assert attrs == {'layout': 'nop'}
+
+    def test_new_nodes_laid_out_again(self):
+        assert pinned_layout(['m.a', 'm.c'], self.positions) == ({}, {}, {})
+
+    def test_no_known_nodes(self):
+        assert pinned_layout(['m.c'], self.positions) == ({}, {}, {})
+
+
+@pytest.mark.skipif(not has_dot, reason='Graphviz is not installed')
+class TestRender:
+    def test_file_written(self, tmp_path):
+        source = gv.Source('digraph { a -> b }')
+        render(source, str(tmp_path / 'graph'), format='svg')
+        assert (tmp_path / 'graph.svg').read_text().startswith('<?xml')
+
+    def test_timeout_falls_back(self, tmp_path):
+        source = gv.Source('digraph { a -> b }')
+        render(source, str(tmp_path / 'graph'), format='svg', timeout=0)
+        assert (tmp_path / 'graph.svg').exists()
+
+    def test_multiple_formats(self, tmp_path):
+        source = gv.Source('digraph { a -> b }')
+        render(source, str(tmp_path / 'graph'), format='svg,dot')
+        assert (tmp_path / 'graph.svg').exists()
+        assert 'pos=' in (tmp_path / 'graph.dot').read_text()
+
+    def test_positions_written(self, tmp_path):
+        source = gv.Source('digraph { a -> b }')
+        positions = str(tmp_path / 'positions.json')
+        render(source, str(tmp_path / 'graph'), format='svg', positions=positions)
+        assert set(read_positions(positions)['nodes']) == {'a', 'b'}
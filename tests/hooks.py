@@ -0,0 +1,45 @@
+import pytest
+from pyfactor import parse, Hooks
+from pyfactor._hooks import stage
+
+
+class Recorder(Hooks):
+    def __init__(self):
+        self.events = []
+
+    def on_source_resolved(self, source):
+        self.events.append(('source', source.name))
+
+    def on_file_parsed(self, source, seconds, names):
+        self.events.append(('file', source.name, names))
+
+    def on_stage_start(self, name):
+        self.events.append(('start', name))
+
+    def on_stage_end(self, name, seconds, graph):
+        self.events.append(('end', name))
+
+
+class TestHooks:
+    def test_parse_events(self, tmp_path):
+        source = tmp_path / 'script.py'
+        source.write_text('a = 1\nb = a\n')
+        recorder = Recorder()
+        parse([str(source)], str(tmp_path / 'script.gv'), hooks=[recorder])
+
+        events = recorder.events
+        assert events[:2] == [('start', 'resolve_sources'), ('end', 'resolve_sources')]
+        assert ('source', 'script') in events
+        assert ('file', 'script', 2) in events
+        starts = [e[1] for e in events if e[0] == 'start']
+        ends = [e[1] for e in events if e[0] == 'end']
+        assert starts == ends
+        assert 'mark_waypoints' in starts
+        assert starts[-1] == 'write_graph'
+
+    def test_stage_ended_on_error(self):
+        recorder = Recorder()
+        with pytest.raises(ValueError):
+            with stage([recorder], 'failing'):
+                raise ValueError
+        assert recorder.events == [('start', 'failing'), ('end', 'failing')]
@@ -0,0 +1,71 @@
+import shutil
+import pytest
+import networkx as nx
+from pyfactor import pyfactor
+from pyfactor._cli import ArgumentError
+from pyfactor._html import (
+    cluster_fragments, fragment_edges, node_docs, root_fragment, write_html
+)
+from ._util import module_graph
+
+has_dot = shutil.which('dot') is not None
+graph = module_graph()
+edges = fragment_edges(graph)
+fragments = cluster_fragments(graph)
+
+
+class TestFragmentEdges:
+    def test_aggregated_between_levels(self):
+        assert edges['p'] == {('cluster_p.a', 'cluster_p.b'): [3, {}]}
+
+    def test_names_in_level(self):
+        assert list(edges['p.a']) == [('p.a.f', 'p.a.g')]
+
+    def test_internal_edges_not_shown(self):
+        assert '' not in edges
+
+
+class TestClusterFragments:
+    def test_fragment_per_level(self):
+        assert set(fragments) == {root_fragment, 'p', 'p.a', 'p.b'}
+
+    def test_sublevel_links_to_fragment(self):
+        source = str(fragments['p'])
+        assert 'href="#p.a"' in source
+        assert 'a\\n2 names' in source
+
+    def test_tooltip_and_metadata_left_out(self):
+        source = str(fragments['p.a'])
+        assert 'tooltip' not in source
+        assert 'type=' not in source
+        assert 'cluster-invis-node' not in source
+
+
+def test_docs_unescaped():
+    assert node_docs(graph) == {'p.a.f': 'Docs\nof f.'}
+
+
+def test_combined_formats_rejected(tmp_path):
+    with pytest.raises(ArgumentError):
+        pyfactor(
+            [str(tmp_path)],
+            str(tmp_path / 'graph.gv'),
+            str(tmp_path / 'graph'),
+            render_kwargs={'format': 'svg,html'},
+        )
+
+
+@pytest.mark.skipif(not has_dot, reason='Graphviz is not installed')
+def test_page_written(tmp_path):
+    page = write_html(graph, str(tmp_path / 'graph'), jobs=2)
+    files = tmp_path / 'graph_files'
+    assert page == str(tmp_path / 'graph.html')
+    assert (files / 'p.a.js').read_text().startswith('pyfactor.fragment("p.a"')
+    assert (files / '__docs__.js').exists()
+
+
+@pytest.mark.skipif(not has_dot, reason='Graphviz is not installed')
+def test_package_named_docs_kept(tmp_path):
+    write_html(nx.DiGraph([('docs.a.f', 'docs.b.g')]), str(tmp_path / 'graph'))
+    fragment = (tmp_path / 'graph_files' / 'docs.js').read_text()
+    assert fragment.startswith('pyfactor.fragment("docs"')
@@ -0,0 +1,87 @@
+from pyfactor._index import ExportIndex, index_module
+
+
+def make_index(modules: dict) -> ExportIndex:
+    index = ExportIndex()
+    index.distributions['dist'] = {'version': '1', 'tops': [], 'modules': modules}
+    index._collect()
+    return index
+
+
+class TestIndexModule:
+    def test_definitions(self):
+        source = 'import os as o\nx = 1\n\n\ndef f():\n    pass\n\n\nclass C:\n    pass\n'
+        names = index_module(source, 'm', False)['names']
+        assert names == {
+            'o': ['>', 'os'], 'x': ['V', 2], 'f': ['F', 5], 'C': ['C', 9]
+        }
+
+    def test_relative_reexport(self):
+        source = 'from .sub import f\nfrom . import mod\nfrom .other import *\n'
+        entry = index_module(source, 'pkg', True)
+        assert entry['names'] == {'f': ['>', 'pkg.sub.f'], 'mod': ['>', 'pkg.mod']}
+        assert entry['stars'] == ['pkg.other']
+
+    def test_conditional_definitions(self):
+        source = 'try:\n    import a\nexcept ImportError:\n    a = None\n'
+        assert index_module(source, 'm', False)['names'] == {'a': ['V', 4]}
+
+
+class TestExportIndex:
+    def test_reexport_chain(self):
+        index = make_index({
+            'pkg': {'names': {'f': ['>', 'pkg.sub.f']}, 'stars': []},
+            'pkg.sub': {'names': {'f': ['>', 'pkg.sub.impl.f']}, 'stars': []},
+            'pkg.sub.impl': {'names': {'f': ['F', 3]}, 'stars': []},
+        })
+        assert index.resolve('pkg.f') == ('pkg.sub.impl.f', 'F', 3)
+
+    def test_star_import(self):
+        index = make_index({
+            'pkg': {'names': {}, 'stars': ['pkg.impl']},
+            'pkg.impl': {'names': {'C': ['C', 1]}, 'stars': []},
+        })
+        assert index.resolve('pkg.C') == ('pkg.impl.C', 'C', 1)
+        assert index.resolve('pkg.missing') is None
+
+    def test_reexport_cycle(self):
+        index = make_index({
+            'a': {'names': {'f': ['>', 'b.f']}, 'stars': []},
+            'b': {'names': {'f': ['>', 'a.f']}, 'stars': []},
+        })
+        assert index.resolve('a.f') is None
+
+    def test_installed_distribution(self, tmp_path):
+        path = str(tmp_path / 'index.json')
+        index = ExportIndex(path)
+        index.update({'networkx'})
+        index.write()
+        name, type_, _ = ExportIndex(path).resolve('networkx.DiGraph')
+        assert name.endswith('.DiGraph') and name != 'networkx.DiGraph'
+        assert type_ == 'C'
+
+    def test_unchanged_distribution_not_read(self, tmp_path):
+        path = str(tmp_path / 'index.json')
+        index = ExportIndex(path)
+        index.update({'networkx'})
+        index.write()
+        index = ExportIndex(path)
+        index.distributions['networkx']['modules'] = {}
+        index.update({'networkx'})
+        assert index.distributions['networkx']['modules'] == {}
+
+    def test_changed_record_read_again(self, tmp_path):
+        path = str(tmp_path / 'index.json')
+        index = ExportIndex(path)
+        index.update({'networkx'})
+        index.write()
+        index = ExportIndex(path)
+        entry = index.distributions['networkx']
+        entry.update(record=[entry['record'][0], 0, 0], modules={})
+        index.update({'networkx'})
+        assert index.distributions['networkx']['modules'] != {}
+
+    def test_truncated_is_empty(self, tmp_path):
+        path = tmp_path / 'index.json'
+        path.write_text('{"version": 2, "distrib')
+        assert ExportIndex(str(path)).distributions == {}
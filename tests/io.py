@@ -0,0 +1,267 @@
+import io
+import tarfile
+import zipfile
+from pathlib import Path
+from pyfactor import _build_graph
+from pyfactor._cache import read_cache
+from pyfactor._io import SourceWalker, find_modules, resolve_sources
+from pyfactor._graph import cluster_invis_node
+from ._util import Parsed
+
+
+def make_tree(root: Path, files: list) -> None:
+    for file in files:
+        path = root / file
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text('')
+
+
+class TestResolveSources:
+    def test_package_names(self, tmp_path):
+        make_tree(tmp_path, ['pkg/__init__.py', 'pkg/a.py', 'pkg/sub/__init__.py'])
+        sources = resolve_sources([str(tmp_path / 'pkg')])
+        assert sorted(s.name for s in sources) == ['pkg', 'pkg.a', 'pkg.sub']
+
+    def test_plain_directory_in_package_skipped(self, tmp_path):
+        make_tree(tmp_path, ['pkg/__init__.py', 'pkg/notpkg/x.py'])
+        assert [s.name for s in resolve_sources([str(tmp_path / 'pkg')])] == ['pkg']
+        assert [s.name for s in resolve_sources([str(tmp_path)])] == ['pkg']
+
+    def test_subpackage_named_from_top(self, tmp_path):
+        make_tree(tmp_path, ['pkg/__init__.py', 'pkg/sub/__init__.py', 'pkg/sub/a.py'])
+        sources = resolve_sources([str(tmp_path / 'pkg' / 'sub')])
+        assert sorted(s.name for s in sources) == ['pkg.sub', 'pkg.sub.a']
+
+    def test_hidden_and_ignored_pruned(self, tmp_path):
+        make_tree(tmp_path, [
+            'pkg/__init__.py',
+            'pkg/.venv/__init__.py',
+            'pkg/build/__init__.py',
+            'pkg/a_pb2.py',
+        ])
+        sources = resolve_sources([str(tmp_path / 'pkg')], ['build', '*_pb2.py'])
+        assert [s.name for s in sources] == ['pkg']
+
+    def test_gitignore_pruned(self, tmp_path):
+        make_tree(tmp_path, [
+            'pkg/__init__.py',
+            'pkg/gen/__init__.py',
+            'pkg/sub/__init__.py',
+            'pkg/sub/gen.py',
+        ])
+        (tmp_path / 'pkg' / '.gitignore').write_text('# comment\ngen/\n/sub/gen.py\n')
+        sources = resolve_sources([str(tmp_path / 'pkg')])
+        assert sorted(s.name for s in sources) == ['pkg', 'pkg.sub']
+
+    def test_folder_ignores(self, tmp_path):
+        make_tree(tmp_path, ['a.py', 'venv/__init__.py', 'pkg/__init__.py'])
+        (tmp_path / '.gitignore').write_text('venv\n')
+        sources = resolve_sources([str(tmp_path)])
+        assert sorted(s.name for s in sources) == ['a', 'pkg']
+
+
+class TestSourceWalker:
+    def test_visited_counted(self, tmp_path):
+        make_tree(tmp_path, ['pkg/__init__.py', 'pkg/a.py', 'pkg/.git/config'])
+        walker = SourceWalker()
+        files = list(walker.walk(tmp_path / 'pkg'))
+        assert len(files) == 2
+        assert walker.visited == 3
+
+
+class TestArchiveSources:
+    files = {
+        'pkg/__init__.py': 'from pkg.a import f\n',
+        'pkg/a.py': 'def f():\n    pass\n',
+        'pkg/sub/__init__.py': '',
+        'tool.py': 'x = 1\n',
+        'docs/conf.py': 'y = 2\n',
+        'pkg-1.0.dist-info/fake.py': '',
+    }
+
+    def test_wheel(self, tmp_path):
+        path = tmp_path / 'pkg-1.0-py3-none-any.whl'
+        with zipfile.ZipFile(path, 'w') as archive:
+            for name, content in self.files.items():
+                archive.writestr(name, content)
+        sources = resolve_sources([str(path)])
+        names = sorted(s.name for s in sources)
+        assert names == ['pkg', 'pkg.a', 'pkg.sub', 'tool']
+        assert all(s.content is not None for s in sources)
+
+    def test_sdist(self, tmp_path):
+        path = tmp_path / 'pkg-1.0.tar.gz'
+        with tarfile.open(path, 'w:gz') as archive:
+            for name, content in self.files.items():
+                data = content.encode()
+                info = tarfile.TarInfo('pkg-1.0/src/' + name)
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+        sources = resolve_sources([str(path)])
+        assert sorted(s.name for s in sources) == ['pkg', 'pkg.a', 'pkg.sub']
+
+
+class TestSourceRoots:
+    def test_roots_in_different_directories(self, tmp_path):
+        make_tree(tmp_path, [
+            'libs/a/src/pkga/__init__.py',
+            'libs/b/src/pkgb/__init__.py',
+            'libs/b/src/pkgb/mod.py',
+        ])
+        roots = [str(tmp_path / 'libs' / lib / 'src') for lib in 'ab']
+        sources = resolve_sources(roots)
+        assert sorted(s.name for s in sources) == ['pkga', 'pkgb', 'pkgb.mod']
+
+    def test_namespace_packages(self, tmp_path):
+        make_tree(tmp_path, [
+            'a/src/company/liba/__init__.py',
+            'b/src/company/libb/__init__.py',
+            'b/src/company/util.py',
+        ])
+        roots = [str(tmp_path / lib / 'src') for lib in 'ab']
+        sources = resolve_sources(roots, namespaces=True)
+        names = sorted(s.name for s in sources)
+        assert names == ['company.liba', 'company.libb', 'company.util']
+
+    def test_namespace_skipped_by_default(self, tmp_path):
+        make_tree(tmp_path, ['src/company/liba/__init__.py'])
+        assert resolve_sources([str(tmp_path / 'src')]) == []
+
+    def test_duplicate_module_first_used(self, tmp_path):
+        make_tree(tmp_path, ['a/mod.py', 'b/mod.py'])
+        sources = resolve_sources([str(tmp_path / 'a'), str(tmp_path / 'b')])
+        assert [s.file for s in sources] == [tmp_path / 'a' / 'mod.py']
+
+
+class TestFilterPushdown:
+    files = {
+        'pkg/__init__.py': '',
+        'pkg/a.py': 'from pkg.b import g\n\n\ndef f():\n    return g()\n',
+        'pkg/b.py': 'def g():\n    pass\n',
+        'pkg/c.py': 'from pkg.a import f\nx = f()\n',
+        'pkg/gen/__init__.py': 'y = 1\n',
+    }
+
+    def make(self, root: Path) -> str:
+        for name, content in self.files.items():
+            path = root / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(content)
+        return str(root / 'pkg')
+
+    def test_excluded_package_not_parsed(self, tmp_path):
+        parsed = Parsed()
+        graph = _build_graph([self.make(tmp_path)], [parsed], exclude=['pkg.gen'])
+        assert 'pkg.gen' not in parsed.names
+        assert 'pkg.gen.y' not in graph
+
+    def test_root_parses_imported(self, tmp_path):
+        parsed = Parsed()
+        graph = _build_graph([self.make(tmp_path)], [parsed], root='pkg.a.f')
+        assert sorted(parsed.names) == ['pkg', 'pkg.a', 'pkg.b']
+        assert set(graph.nodes) == {'pkg.a.f', 'pkg.b.g'}
+
+    def test_unknown_root_module_parses_all(self, tmp_path):
+        parsed = Parsed()
+        _build_graph([self.make(tmp_path)], [parsed], root='f')
+        assert len(parsed.names) == len(self.files)
+
+    def test_excluded_name_not_module_excludes_node(self, tmp_path):
+        graph = _build_graph([self.make(tmp_path)], exclude=['pkg.c.x'])
+        assert 'pkg.c.x' not in graph
+        assert 'pkg.a.f' in graph
+
+    def test_root_with_waypoints_parses_all(self, tmp_path):
+        parsed = Parsed()
+        _build_graph(
+            [self.make(tmp_path)], [parsed], root='pkg.a.f', collapse_waypoints=True
+        )
+        assert len(parsed.names) == len(self.files)
+
+    def test_partial_run_keeps_cache(self, tmp_path):
+        cache = str(tmp_path / 'cache.json')
+        source = self.make(tmp_path)
+        _build_graph([source], parse_cache=cache)
+        _build_graph([source], parse_cache=cache, root='pkg.a.f')
+        assert len(read_cache(cache, {'commit': None, 'options': []})) == len(self.files)
+
+    def test_excluded_run_writes_cache(self, tmp_path):
+        cache = str(tmp_path / 'cache.json')
+        _build_graph([self.make(tmp_path)], parse_cache=cache, exclude=['pkg.gen'])
+        cached = read_cache(cache, {'commit': None, 'options': []})
+        assert 'pkg.a' in cached
+        assert not any(m.startswith('pkg.gen') for m in cached)
+
+
+class TestFollowImports:
+    files = {
+        'extpkg/__init__.py': '',
+        'extpkg/core.py': 'from extpkg.deep import d\n\n\ndef thing():\n    return d\n',
+        'extpkg/deep.py': 'd = 1\n',
+        'extpkg/unused.py': 'u = 1\n',
+    }
+
+    def make(self, root: Path, monkeypatch) -> str:
+        for name, content in self.files.items():
+            path = root / 'site' / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(content)
+        monkeypatch.syspath_prepend(str(root / 'site'))
+        source = root / 'src' / 'own.py'
+        source.parent.mkdir()
+        source.write_text('from extpkg.core import thing\nx = thing()\n')
+        return str(source)
+
+    def test_find_modules(self, tmp_path, monkeypatch):
+        self.make(tmp_path, monkeypatch)
+        found = find_modules({'extpkg.core.thing', 'sys'})
+        assert sorted(found) == ['extpkg', 'extpkg.core']
+
+    def test_depth(self, tmp_path, monkeypatch):
+        source = self.make(tmp_path, monkeypatch)
+        parsed = Parsed()
+        graph = _build_graph([source], [parsed], follow_imports=1)
+        assert sorted(parsed.names) == ['extpkg', 'extpkg.core', 'own']
+        assert 'extpkg.core.thing' in graph
+
+        parsed = Parsed()
+        _build_graph([source], [parsed], follow_imports=2)
+        assert sorted(parsed.names) == ['extpkg', 'extpkg.core', 'extpkg.deep', 'own']
+
+    def test_cached(self, tmp_path, monkeypatch):
+        source = self.make(tmp_path, monkeypatch)
+        cache = str(tmp_path / 'cache' / 'external.json')
+        _build_graph([source], follow_imports=1, external_cache=cache)
+
+        parsed = Parsed()
+        _build_graph([source], [parsed], follow_imports=1, external_cache=cache)
+        assert parsed.names == ['own']
+
+        core = tmp_path / 'site' / 'extpkg' / 'core.py'
+        core.write_text(core.read_text() + '\n\ny = 2\n')
+        parsed = Parsed()
+        _build_graph([source], [parsed], follow_imports=1, external_cache=cache)
+        assert parsed.names == ['own', 'extpkg.core']
+
+
+class TestFastPath:
+    def make(self, root: Path) -> str:
+        make_tree(root, ['pkg/__init__.py'])
+        (root / 'pkg' / 'gen_pb2.py').write_text('class M:\n    pass\n' * 50)
+        (root / 'pkg' / 'use.py').write_text(
+            'from pkg.gen_pb2 import M\n\n\ndef f():\n    return M\n'
+        )
+        return str(root / 'pkg')
+
+    def test_names_by_size(self, tmp_path):
+        parsed = Parsed()
+        graph = _build_graph([self.make(tmp_path)], [parsed], fast_path=['names:>500'])
+        assert 'pkg.gen_pb2.M' in graph
+        assert sorted(parsed.names) == ['pkg', 'pkg.gen_pb2', 'pkg.use']
+
+    def test_fold_by_pattern(self, tmp_path):
+        graph = _build_graph([self.make(tmp_path)], fast_path=['fold:*_pb2.py'])
+        folded = 'pkg.gen_pb2.' + cluster_invis_node
+        assert graph.nodes[folded]['type'] == 'M'
+        assert ('pkg.use.f', folded) in graph.edges
+        assert not any(n.startswith('pkg.gen_pb2.M') for n in graph)
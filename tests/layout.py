@@ -0,0 +1,109 @@
+import shutil
+import pytest
+import graphviz as gv
+from pyfactor._layout import (
+    cache_key, compose, layout_unit, render_clusters, top_source, unit_sources
+)
+from ._util import module_graph
+
+has_dot = shutil.which('dot') is not None
+graph = module_graph()
+sources = unit_sources(graph)
+top = str(top_source(graph, {'p.a': (72, 144), 'p.b': (36, 36)}))
+
+
+def unit_svg(width: int, height: int) -> str:
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n'
+        f'<svg width="{width}pt" height="{height}pt" '
+        f'viewBox="0.00 0.00 {width}.00 {height}.00" '
+        'xmlns="http://www.w3.org/2000/svg">'
+        '<g id="graph0" class="graph"><title>%3</title></g></svg>'
+    )
+
+
+top_svg = (
+    '<svg width="100pt" height="100pt" xmlns="http://www.w3.org/2000/svg">'
+    '<g id="graph0" class="graph">'
+    '<g id="node1" class="node"><title>p.a.cluster-layout</title>'
+    '<polygon stroke="transparent" points="30,-10 10,-10 10,-40 30,-40 30,-10"/>'
+    '</g>'
+    '<g id="node2" class="node"><title>other</title></g>'
+    '</g></svg>'
+)
+
+
+class TestUnitSources:
+    def test_source_per_module(self):
+        assert set(sources) == {'p.a', 'p.b'}
+
+    def test_only_internal_edges(self):
+        source = str(sources['p.a'])
+        assert '"p.a.f" -> "p.a.g"' in source
+        assert 'p.b.h' not in source
+        assert 'type=' not in source
+
+
+class TestTopSource:
+    def test_fixed_size_boxes(self):
+        assert 'fixedsize=true' in top
+        assert 'height=2.0' in top
+        assert 'cluster_p.a' in top
+
+    def test_edges_aggregated(self):
+        assert top.count('->') == 1
+        assert 'tooltip="3 edges"' in top
+
+
+class TestCompose:
+    def test_unit_nested_at_box(self):
+        svg = compose(top_svg, {'p.a': unit_svg(20, 30)})
+        assert 'x="10.0" y="-40.0"' in svg
+        assert 'width="20.0" height="30.0"' in svg
+        assert 'id="p.a:graph0"' in svg
+
+    def test_other_nodes_untouched(self):
+        svg = compose(top_svg, {'p.a': unit_svg(20, 30)})
+        assert '<title>other</title>' in svg
+        assert '<title>p.a.cluster-layout</title>' not in svg
+
+    def test_references_prefixed(self):
+        unit = unit_svg(20, 30).replace('<g id="graph0" class="graph">', (
+            '<defs><linearGradient id="l_1"><stop offset="0"/></linearGradient></defs>'
+            '<g id="graph0" class="graph"><polygon fill="url(#l_1)" points="0,0"/>'
+            '<a xlink:href="#graph0"/>'
+        )).replace('xmlns=', 'xmlns:xlink="http://www.w3.org/1999/xlink" xmlns=')
+        svg = compose(top_svg, {'p.a': unit})
+        assert 'id="p.a:l_1"' in svg
+        assert 'fill="url(#p.a:l_1)"' in svg
+        assert 'xlink:href="#p.a:graph0"' in svg
+
+
+def test_cached_layout_reused(tmp_path):
+    source = gv.Digraph()
+    source.node('a')
+    key = cache_key(str(source), {}, None)
+    (tmp_path / f'{key}.svg').write_text(unit_svg(10, 10))
+    assert layout_unit(source, {}, None, tmp_path) == unit_svg(10, 10)
+
+
+def test_cache_key_depends_on_settings():
+    assert cache_key('digraph {}', {}, None) != cache_key('digraph {}', {}, 'neato')
+
+
+@pytest.mark.skipif(not has_dot, reason='Graphviz is not installed')
+def test_truncated_layout_laid_out_again(tmp_path):
+    source = gv.Digraph()
+    source.node('a')
+    cached = tmp_path / f'{cache_key(str(source), {}, None)}.svg'
+    cached.write_text(unit_svg(10, 10)[:50])
+    svg = layout_unit(source, {}, None, tmp_path)
+    assert svg.rstrip().endswith('</svg>')
+    assert cached.read_text() == svg
+
+
+@pytest.mark.skipif(not has_dot, reason='Graphviz is not installed')
+def test_image_written(tmp_path):
+    out = render_clusters(graph, str(tmp_path / 'graph'), cache=str(tmp_path))
+    assert 'p.a:graph0' in (tmp_path / 'graph.svg').read_text()
+    assert out == str(tmp_path / 'graph.svg')
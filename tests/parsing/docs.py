@@ -1,3 +1,6 @@
+from pathlib import Path
+from pyfactor._visit import parse_lines
+from pyfactor._io import Source
 from ._util import docs_equal
 
 
@@ -55,3 +58,10 @@ class TestAssign:
         source = '{1 for _ in range(1)}'
         docs = []
         return source, docs
+
+
+class TestDisabled:
+    def test_docs_not_captured(self):
+        source = '"mod"\na = 1\n"a"\ndef foo():\n  """foo"""\nclass A:\n  """A"""'
+        lines = parse_lines(Source(Path('./nonfile'), '', source), docstrings=False)
+        assert [line.docstring for line in lines] == [None, None, None]
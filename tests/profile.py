@@ -0,0 +1,58 @@
+import json
+import tracemalloc
+import pytest
+import networkx as nx
+from pathlib import Path
+from pyfactor import pyfactor
+from pyfactor._hooks import stage
+from pyfactor._io import Source
+from pyfactor._profile import MemoryProfile, Timings
+
+
+class TestMemoryProfile:
+    def test_stages_recorded(self, tmp_path):
+        profile = MemoryProfile(top=3)
+        with stage([profile], 'first'):
+            data = [bytes(1000) for _ in range(100)]
+        with stage([profile], 'second'):
+            del data
+        path = tmp_path / 'profile.json'
+        profile.write(str(path))
+
+        stages = json.loads(path.read_text())['stages']
+        assert [s['stage'] for s in stages] == ['first', 'second']
+        assert stages[0]['peak'] >= 100 * 1000
+        assert len(stages[0]['top']) <= 3
+
+    def test_tracing_stopped_on_error(self, tmp_path):
+        source = tmp_path / 'invalid.py'
+        source.write_text('def (')
+        with pytest.raises(SyntaxError):
+            pyfactor(
+                [str(source)],
+                str(tmp_path / 'graph.gv'),
+                profile_memory=True,
+            )
+        assert not tracemalloc.is_tracing()
+
+
+class TestTimings:
+    def test_graph_counts(self):
+        timings = Timings()
+        graph = nx.DiGraph([('a', 'b')])
+        with stage([timings], 'first', graph):
+            graph.add_edge('b', 'c')
+        with stage([timings], 'second'):
+            pass
+
+        first, second = timings.report()['stages']
+        assert (first['nodes'], first['edges']) == (3, 2)
+        assert 'nodes' not in second
+
+    def test_slowest_files(self):
+        timings = Timings(slowest=2)
+        for i, seconds in enumerate([0.1, 0.3, 0.2]):
+            timings.on_file_parsed(Source(Path(), f'file{i}'), seconds, 1)
+        report = timings.report()
+        assert report['files'] == 3
+        assert [f['file'] for f in report['slowest_files']] == ['file1', 'file2']
@@ -0,0 +1,50 @@
+import networkx as nx
+from pyfactor import query_main
+from pyfactor._reach import ReachabilityIndex
+
+
+def make_index():
+    graph = nx.DiGraph([
+        ('a', 'b'), ('b', 'c'), ('c', 'b'), ('c', 'd'), ('e', 'd'),
+    ])
+    graph.add_node('f')
+    return ReachabilityIndex(graph)
+
+
+class TestReachability:
+    def test_dependencies(self):
+        index = make_index()
+        assert index.dependencies('a') == {'b', 'c', 'd'}
+        assert index.dependencies('d') == set()
+        assert index.dependencies('f') == set()
+
+    def test_dependents(self):
+        index = make_index()
+        assert index.dependents('d') == {'a', 'b', 'c', 'e'}
+        assert index.dependents('a') == set()
+
+    def test_cycle_members(self):
+        index = make_index()
+        assert index.dependencies('b') == {'c', 'd'}
+        assert index.dependents('b') == {'a', 'c'}
+        assert index.depends_on('b', 'b')
+        assert not index.depends_on('a', 'a')
+
+    def test_self_loop(self):
+        index = ReachabilityIndex(nx.DiGraph([('a', 'a'), ('a', 'b')]))
+        assert index.depends_on('a', 'a')
+        assert not index.depends_on('b', 'b')
+        assert index.dependencies('a') == {'b'}
+
+    def test_depends_on(self):
+        index = make_index()
+        assert index.depends_on('a', 'd')
+        assert not index.depends_on('d', 'a')
+        assert not index.depends_on('e', 'b')
+
+
+def test_query_cli(tmp_path, capsys):
+    source = tmp_path / 'mod.py'
+    source.write_text('def a():\n    pass\n\n\ndef b():\n    a()\n')
+    query_main([str(source), 'mod.a'])
+    assert capsys.readouterr().out.split() == ['mod.b']